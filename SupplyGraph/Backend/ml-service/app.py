@@ -10,7 +10,10 @@ import numpy as np
 from datetime import datetime
 from dotenv import load_dotenv
 from training.trainer import ModelTrainer
+from training.job_queue import TrainingJobQueue
 from prediction.predictor import DemandPredictor
+from utils.frames import numeric_frame, sort_by_date
+from utils.mongo import get_connection
 
 load_dotenv()
 
@@ -18,9 +21,48 @@ app = Flask(__name__)
 CORS(app)
 DEBUG_LOG = os.getenv('ML_DEBUG', '').lower() == '1'
 
-# Initialize ML components
-trainer = ModelTrainer()
-predictor = DemandPredictor()
+def run_fine_tune_job(job):
+    """Run one queued /fine-tune request on a training worker"""
+    payload = job.payload
+    fine_tune = training_pool.run if training_pool is not None else trainer.fine_tune_company_model
+    success = fine_tune(
+        job.company_id,
+        payload['nodes_path'],
+        payload['edges_path'],
+        payload['sales_path'],
+        payload['force_retrain'],
+        payload.get('incremental', False)
+    )
+    if not success:
+        status = trainer.training_status.get(job.company_id, {})
+        raise RuntimeError(status.get('error') or status.get('message') or "Fine-tuning failed")
+    return {
+        "success": True,
+        "company_id": job.company_id,
+        "model_path": f"atlas_model_{job.company_id}"
+    }
+
+def create_ml_components():
+    """Trainer, predictor, training process pool (or None) and training job queue of the serving process"""
+    trainer = ModelTrainer()
+    predictor = DemandPredictor()
+    # Retrained models must not be served from the predictor's model cache
+    trainer.add_model_saved_listener(predictor.invalidate_company_model)
+    
+    # TRAINING_EXECUTOR=process trains in worker processes (own torch threads, optional CPU pinning)
+    training_pool = None
+    if os.getenv('TRAINING_EXECUTOR', 'thread').lower() == 'process':
+        from training.process_pool import TrainingProcessPool
+        training_pool = TrainingProcessPool(trainer)
+    
+    # Training runs on background workers (TRAINING_WORKERS) instead of inside the request
+    training_jobs = TrainingJobQueue(run_fine_tune_job, workers=training_pool.workers if training_pool is not None else None)
+    return trainer, predictor, training_pool, training_jobs
+
+# Spawned training workers re-run the script that started the parent as __mp_main__;
+# only the serving process builds the ML components
+if __name__ != '__mp_main__':
+    trainer, predictor, training_pool, training_jobs = create_ml_components()
 
 # Simple data loader class
 class DataLoader:
@@ -215,14 +257,27 @@ def system_status():
         base_model_status = trainer.check_base_model_exists()
         
         # Check database connection
-        db_status = "connected" if trainer.db is not None else "disconnected"
+        db_status = "connected" if trainer.store.available else "disconnected"
         
         return jsonify({
             "status": "healthy",
             "service": "ML Service",
             "timestamp": datetime.now().isoformat(),
             "database": db_status,
-            "base_model": base_model_status
+            "base_model": base_model_status,
+            "caches": {
+                "model_cache": predictor.model_cache.stats(),
+                "input_cache": predictor.input_cache.stats(),
+                "result_cache": predictor.result_cache.stats(),
+                "artifact_cache": predictor.artifact_cache.stats()
+            },
+            "mongodb": get_connection().stats(),
+            "model_store": {
+                "trainer": trainer.store.stats(),
+                "predictor": predictor.store.stats()
+            },
+            "training_jobs": training_jobs.stats(),
+            "training_executor": training_pool.stats() if training_pool is not None else {"executor": "thread"}
         })
     except Exception as e:
         return jsonify({
@@ -232,6 +287,15 @@ def system_status():
             "error": str(e)
         }), 500
 
+@app.route('/cache/invalidate/<company_id>', methods=['POST'])
+def invalidate_company_cache(company_id):
+    try:
+        # Called after a re-upload so the next prediction rebuilds its inputs
+        removed = predictor.invalidate_company_inputs(company_id)
+        return jsonify({"success": True, "company_id": company_id, "invalidated": removed})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/fine-tune', methods=['POST'])
 def start_fine_tuning():
     try:
@@ -241,6 +305,7 @@ def start_fine_tuning():
         edges_path = data.get('edges')
         sales_path = data.get('sales') or data.get('demand')
         force_retrain = data.get('force_retrain', False)
+        incremental = data.get('incremental', False)
         
         if not company_id:
             return jsonify({"error": "company_id is required"}), 400
@@ -254,39 +319,22 @@ def start_fine_tuning():
         edges_full_path = os.path.join(backend_dir, edges_path)
         sales_full_path = os.path.join(backend_dir, sales_path)
         
-        # Start fine-tuning process with full paths
-        result = trainer.fine_tune_company_model(
+        # Queue the fine-tuning job; progress is reported by /jobs/<id> and /training-status
+        job, created = training_jobs.submit(
             company_id,
-            nodes_full_path,
-            edges_full_path,
-            sales_full_path,
-            force_retrain
+            nodes_path=nodes_full_path,
+            edges_path=edges_full_path,
+            sales_path=sales_full_path,
+            force_retrain=bool(force_retrain),
+            incremental=bool(incremental)
         )
-
-        # Normalise return payload from trainer (legacy versions return bool)
-        success = False
-        payload = {}
-        if isinstance(result, dict):
-            success = result.get("success", False)
-            payload = result
-        elif isinstance(result, bool):
-            success = result
-            payload = {
-                "success": success,
-                "company_id": company_id
-            } if success else {}
-
-        if success:
-            return jsonify({
-                **payload,
-                "success": True,
-                "message": payload.get("message", "Fine-tuning completed"),
-                "company_id": company_id,
-                "model_path": payload.get("model_path", f"atlas_model_{company_id}")
-            })
-        else:
-            error_message = payload.get("error", "Fine-tuning failed")
-            return jsonify({"error": error_message}), 500
+        
+        return jsonify({
+            **training_jobs.describe(job),
+            "success": True,
+            "message": "Fine-tuning queued" if created else "Fine-tuning already in progress",
+            "status_url": f"/jobs/{job.id}"
+        }), 202
     
     except Exception as e:
         print(f"Error in fine-tuning: {e}")
@@ -294,14 +342,41 @@ def start_fine_tuning():
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
 
+def _job_status(job):
+    """Queue info for a job plus the trainer's live progress while it runs"""
+    info = training_jobs.describe(job)
+    if job.status == 'queued':
+        info.update({"progress": 0, "message": f"Waiting for a training worker (position {info['queue_position']})"})
+    elif job.status == 'running':
+        live = trainer.training_status.get(job.company_id, {})
+        info.update({"stage": live.get('status'), "progress": live.get('progress', 0), "message": live.get('message', '')})
+    else:
+        info["progress"] = 100 if job.status == 'completed' else 0
+    return info
+
 @app.route('/training-status/<company_id>', methods=['GET'])
 def training_status(company_id):
     try:
         status = trainer.get_training_status(company_id)
+        job = training_jobs.latest_for_company(company_id)
+        if job is not None:
+            if job.status == 'queued':
+                # The trainer has not seen this run yet; don't report a previous run's state
+                status = {k: v for k, v in _job_status(job).items() if k in ('progress', 'message')}
+                status.update({"status": "queued", "timestamp": job.created_at})
+            status = {**status, "job_id": job.id, "job_status": job.status,
+                      "queue_position": training_jobs.position(job.id)}
         return jsonify(status)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = training_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(_job_status(job))
+
 @app.route('/model-info/<company_id>', methods=['GET'])
 def model_info(company_id):
     try:
@@ -310,6 +385,14 @@ def model_info(company_id):
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/execution-report/<company_id>', methods=['GET'])
+def execution_report(company_id):
+    try:
+        repeats = min(max(request.args.get('repeats', 5, type=int), 1), 50)
+        return jsonify(predictor.execution_report(company_id, repeats=repeats))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/validate-data/<company_id>', methods=['GET'])
 def validate_data(company_id):
     try:
@@ -341,6 +424,27 @@ def generate_prediction():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/predict-batch', methods=['POST'])
+def generate_batch_prediction():
+    try:
+        data = request.json
+        company_id = data.get('company_id')
+        products = data.get('products', 'all')
+        forecast_days = data.get('forecast_days', 1)
+        
+        if not company_id:
+            return jsonify({"error": "company_id is required"}), 400
+        
+        if products != 'all' and not isinstance(products, list):
+            return jsonify({"error": "products must be a list of product names or \"all\""}), 400
+        
+        # One model load and one forward pass for every requested product
+        batch = predictor.predict_many(company_id, products, forecast_days=forecast_days)
+        return jsonify(batch)
+    
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/diagnose-data', methods=['POST'])
 def diagnose_training_data():
     try:
@@ -452,6 +556,73 @@ def get_historical_data(company_id):
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+def _wide_product_metrics(sales_df, recent_window=10, naive_window=3):
+    """
+    Recent average, volatility and naive forecast for every product column of
+    Sales Order.csv format (Date + product columns) in one column-wise pass.
+    """
+    frame = sort_by_date(sales_df, 'Date')
+    
+    products = [c for c in frame.columns if c != 'Date']
+    values = numeric_frame(frame, products).to_numpy(dtype=float)
+    
+    # Recent average over the last `recent_window` positive sales of each product
+    positive = values > 0
+    positive_count = positive.sum(axis=0)
+    positive_rank_from_end = np.cumsum(positive[::-1], axis=0)[::-1]
+    recent_mask = positive & (positive_rank_from_end <= recent_window)
+    recent_sum = np.where(recent_mask, values, 0.0).sum(axis=0)
+    recent_count = np.minimum(positive_count, recent_window)
+    historical_avg = np.divide(recent_sum, recent_count, out=np.zeros(len(products)), where=recent_count > 0)
+    
+    # Volatility: population std of all positive sales
+    positive_values = np.where(positive, values, 0.0)
+    positive_mean = np.divide(positive_values.sum(axis=0), positive_count,
+                              out=np.zeros(len(products)), where=positive_count > 0)
+    squared_dev = np.where(positive, (values - positive_mean) ** 2, 0.0).sum(axis=0)
+    volatility = np.divide(squared_dev, positive_count, out=np.zeros(len(products)), where=positive_count > 1)
+    volatility = np.sqrt(volatility)
+    
+    # Naive forecast (used only when the model is unavailable): last few recorded values + 10%
+    valid = ~np.isnan(values)
+    valid_rank_from_end = np.cumsum(valid[::-1], axis=0)[::-1]
+    naive_mask = valid & (valid_rank_from_end <= naive_window)
+    naive_count = naive_mask.sum(axis=0)
+    naive_sum = np.where(naive_mask, values, 0.0).sum(axis=0)
+    naive_forecast = np.where(
+        naive_count > 0,
+        np.divide(naive_sum, naive_count, out=np.zeros(len(products)), where=naive_count > 0) * 1.1,
+        historical_avg
+    )
+    
+    return products, historical_avg, volatility, naive_forecast
+
+def _long_product_metrics(sales_df, recent_window=10, naive_window=3):
+    """Same metrics as _wide_product_metrics for long format (node_id, date, demand)"""
+    frame = sales_df
+    if 'date' in frame.columns:
+        frame = frame.sort_values('date', kind='stable')
+    grouped = frame.groupby('node_id', sort=False)['demand']
+    
+    products = list(grouped.size().index)
+    historical_avg = frame.groupby('node_id', sort=False).tail(recent_window).groupby('node_id', sort=False)['demand'].mean()
+    
+    demand = pd.to_numeric(frame['demand'], errors='coerce')
+    numeric_grouped = demand.groupby(frame['node_id'], sort=False)
+    volatility = numeric_grouped.std(ddof=0).where(numeric_grouped.count() > 1, 0.0)
+    
+    # Naive forecast uses the file order, as recorded
+    naive = sales_df.groupby('node_id', sort=False)
+    naive_forecast = naive.tail(naive_window).groupby('node_id', sort=False)['demand'].mean() * 1.1
+    naive_forecast = naive_forecast.where(naive.size() > 1, historical_avg)
+    
+    return (
+        products,
+        historical_avg.reindex(products).fillna(0.0).to_numpy(dtype=float),
+        volatility.reindex(products).fillna(0.0).to_numpy(dtype=float),
+        naive_forecast.reindex(products).fillna(0.0).to_numpy(dtype=float)
+    )
+
 @app.route('/inventory/trending/<company_id>', methods=['GET'])
 def get_trending_inventory(company_id):
     try:
@@ -477,155 +648,71 @@ def get_trending_inventory(company_id):
                 "error": "No sales data found"
             })
         
-        # Handle Sales Order.csv format (Date + product columns)
+        # Recent averages and volatility for all products at once
+        # Sales Order.csv format (Date + product columns), or long format (node_id, date, demand)
         if 'Date' in sales_df.columns:
-            product_cols = [c for c in sales_df.columns if c != 'Date']
-            products = product_cols  # Process all products, filter later
-        # Handle long format (node_id, date, demand)
-        elif 'node_id' in sales_df.columns:
-            products = sales_df['node_id'].unique()
-        elif 'product' in sales_df.columns:
-            products = sales_df['product'].unique()
+            products, historical_avgs, volatilities, naive_forecasts = _wide_product_metrics(sales_df)
+        elif 'node_id' in sales_df.columns and 'demand' in sales_df.columns:
+            products, historical_avgs, volatilities, naive_forecasts = _long_product_metrics(sales_df)
         else:
-            products = []
+            products, historical_avgs, volatilities, naive_forecasts = [], [], [], []
+        
+        # All model predictions from a single forward pass
+        predicted = {}
+        model_available = False
+        if len(products):
+            try:
+                batch = predictor.predict_many(company_id, [str(p) for p in products])
+                model_available = True
+                for item in batch['predictions']:
+                    # Skip products without a matched node to avoid using a generic fallback
+                    if item.get('matched_node') is not None and item.get('prediction'):
+                        predicted[item['requested_product']] = item['prediction'][0]
+            except Exception as pred_error:
+                if DEBUG_LOG:
+                    print(f"Batch prediction failed for {company_id}: {pred_error}")
         
         trending_items = []
         
-        for product in products:
-            try:
-                
-                # Initialize variables
-                sales_values = None
-                product_data = None
-                
-                # Get RECENT average (last 30 days or last 10 data points) for current demand
-                # This ensures we compare predictions against recent trends, not overall historical average
-                if 'Date' in sales_df.columns:
-                    if product in sales_df.columns:
-                        # Sort by date to get recent values
-                        df_sorted = sales_df.copy()
-                        df_sorted['Date'] = pd.to_datetime(df_sorted['Date'], errors='coerce')
-                        df_sorted = df_sorted.sort_values('Date')
-                        
-                        sales_values = pd.to_numeric(df_sorted[product], errors='coerce').dropna()
-                        sales_values = sales_values[sales_values > 0]
-                        
-                        # Use recent average (last 10 data points or last 30 days worth)
-                        recent_count = min(10, len(sales_values))
-                        if recent_count > 0:
-                            recent_values = sales_values.tail(recent_count)
-                            historical_avg = float(recent_values.mean())
-                        else:
-                            historical_avg = float(sales_values.mean()) if len(sales_values) > 0 else 0
-                    else:
-                        continue
-                # Handle long format
-                elif 'node_id' in sales_df.columns:
-                    product_data = sales_df[sales_df['node_id'] == product]
-                    if 'demand' in product_data.columns:
-                        # Sort by date if available
-                        if 'date' in product_data.columns:
-                            product_data = product_data.sort_values('date')
-                        # Use recent average
-                        recent_count = min(10, len(product_data))
-                        if recent_count > 0:
-                            historical_avg = float(product_data.tail(recent_count)['demand'].mean())
-                        else:
-                            historical_avg = float(product_data['demand'].mean())
-                    else:
-                        continue
-                else:
+        for product, historical_avg, volatility, naive_forecast in zip(products, historical_avgs, volatilities, naive_forecasts):
+            historical_avg = float(historical_avg)
+            volatility = float(volatility)
+            
+            if model_available:
+                if str(product) not in predicted:
                     continue
-                
-                # Get prediction for this product
-                try:
-                    prediction_result = predictor.predict(company_id, [{"node_type": "store", "company": company_id, "product": str(product)}])
-                    matched_node = prediction_result.get('matched_node')
-                    predicted_demand = prediction_result['prediction'][0] if prediction_result.get('prediction') else historical_avg
-                    # If no matched node, skip to avoid using a generic fallback
-                    if matched_node is None:
-                        continue
-                except Exception as pred_error:
-                    if DEBUG_LOG:
-                        print(f"Prediction failed for {product}: {pred_error}")
-                    # Use a simple trend estimation if prediction fails
-                    if 'Date' in sales_df.columns and product in sales_df.columns:
-                        # Sales Order.csv format: use recent values
-                        recent_values = pd.to_numeric(sales_df[product], errors='coerce').dropna().tail(3)
-                        if len(recent_values) > 0:
-                            recent_avg = float(recent_values.mean())
-                            predicted_demand = recent_avg * 1.1  # Simple 10% growth assumption
-                        else:
-                            predicted_demand = historical_avg
-                    elif 'node_id' in sales_df.columns:
-                        # Long format: use product_data
-                        product_data = sales_df[sales_df['node_id'] == product]
-                        if len(product_data) > 1 and 'demand' in product_data.columns:
-                            recent_avg = float(product_data.tail(3)['demand'].mean())
-                            predicted_demand = recent_avg * 1.1  # Simple 10% growth assumption
-                        else:
-                            predicted_demand = historical_avg
-                    else:
-                        predicted_demand = historical_avg
-                
-                # Calculate trend metrics
-                if historical_avg > 0:
-                    growth_rate = ((predicted_demand - historical_avg) / historical_avg) * 100
-                else:
-                    growth_rate = 0
-                
-                trend_direction = "up" if growth_rate > 5 else "down" if growth_rate < -5 else "stable"
-                
-                # Risk assessment based on volatility
-                try:
-                    # Calculate volatility from sales values
-                    if sales_values is not None and len(sales_values) > 1:
-                        # Sales Order.csv format: use the sales_values we already calculated
-                        volatility = float(np.std(sales_values))
-                        if historical_avg > 0:
-                            volatility_ratio = volatility / historical_avg
-                            risk_level = "high" if volatility_ratio > 0.5 else "medium" if volatility_ratio > 0.2 else "low"
-                        else:
-                            risk_level = "low"
-                    elif product_data is not None and 'demand' in product_data.columns and len(product_data) > 1:
-                        # Long format: calculate from demand column
-                        demand_values = pd.to_numeric(product_data['demand'], errors='coerce').dropna()
-                        if len(demand_values) > 1:
-                            volatility = float(np.std(demand_values))
-                            if historical_avg > 0:
-                                volatility_ratio = volatility / historical_avg
-                                risk_level = "high" if volatility_ratio > 0.5 else "medium" if volatility_ratio > 0.2 else "low"
-                            else:
-                                risk_level = "low"
-                        else:
-                            volatility = 0
-                            risk_level = "low"
-                    else:
-                        volatility = 0
-                        risk_level = "low"
-                except (TypeError, ValueError, NameError) as e:
-                    if DEBUG_LOG:
-                        print(f"Error calculating volatility for {product}: {e}")
-                    volatility = 0
-                    risk_level = "low"
-                
-                trending_items.append({
-                    'product': str(product),
-                    'current_demand': int(round(historical_avg)),  # Round to integer
-                    'predicted_demand': int(round(predicted_demand)),  # Round to integer
-                    'current_sales': int(round(historical_avg)),
-                    'predicted_sales': int(round(predicted_demand)),
-                    'growth_rate': round(growth_rate, 2),
-                    'trend_direction': trend_direction,
-                    'risk_level': risk_level,
-                    'volatility': round(volatility, 2),
-                    'recommendation': get_recommendation(growth_rate, risk_level)
-                })
-                
-            except Exception as e:
-                if DEBUG_LOG:
-                    print(f"Error processing product {product}: {e}")
-                continue
+                predicted_demand = predicted[str(product)]
+            else:
+                # Use a simple trend estimation if prediction fails
+                predicted_demand = float(naive_forecast)
+            
+            # Calculate trend metrics
+            if historical_avg > 0:
+                growth_rate = ((predicted_demand - historical_avg) / historical_avg) * 100
+            else:
+                growth_rate = 0
+            
+            trend_direction = "up" if growth_rate > 5 else "down" if growth_rate < -5 else "stable"
+            
+            # Risk assessment based on volatility
+            if historical_avg > 0:
+                volatility_ratio = volatility / historical_avg
+                risk_level = "high" if volatility_ratio > 0.5 else "medium" if volatility_ratio > 0.2 else "low"
+            else:
+                risk_level = "low"
+            
+            trending_items.append({
+                'product': str(product),
+                'current_demand': int(round(historical_avg)),  # Round to integer
+                'predicted_demand': int(round(predicted_demand)),  # Round to integer
+                'current_sales': int(round(historical_avg)),
+                'predicted_sales': int(round(predicted_demand)),
+                'growth_rate': round(growth_rate, 2),
+                'trend_direction': trend_direction,
+                'risk_level': risk_level,
+                'volatility': round(volatility, 2),
+                'recommendation': get_recommendation(growth_rate, risk_level)
+            })
         
         # Prioritize UP trends, but always return up to top 10 products overall
         up_trending = [item for item in trending_items if item['growth_rate'] > 0]
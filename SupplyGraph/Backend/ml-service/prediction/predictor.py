@@ -1,44 +1,178 @@
 import os
-import pickle
-import math
 import pandas as pd
 import numpy as np
 import torch
-from pymongo import MongoClient
-from sklearn.preprocessing import StandardScaler
+from utils.cache import LRUCache, file_fingerprint
+from utils.frames import find_date_column, numeric_frame, sort_by_date
+from utils.graph_builder import build_edge_index, self_loop_edge_index
+from utils.scalers import NodeScalers
+from utils.artifact_cache import ArtifactCache
+from utils.model_store import create_model_store
+from utils.execution import configure_execution, compare_execution_modes, median_ms
+from utils.quantization import quantization_enabled, quantize_model, quantize_checked, max_drift
+from utils import torchscript
+from prediction.product_lookup import ProductLookup
 
 class DemandPredictor:
     def __init__(self):
-        self.mongo_uri = os.getenv('MONGO_URI')
-        self.client = None
-        self.db = None
         self.debug = os.getenv('ML_DEBUG', '0').lower() == '1'
-        self._connect_mongo()
+        # eager (default), compile, bf16 or compile_bf16; see utils/execution.py
+        self.execution_mode = os.getenv('INFERENCE_EXECUTION_MODE', 'eager')
+        # Serve int8 dynamically quantized models when their drift is within QUANTIZATION_MAX_DRIFT
+        self.quantization = quantization_enabled()
+        # Serve the exported TorchScript graph stored with a model version, when there is one
+        self.torchscript = os.getenv('INFERENCE_TORCHSCRIPT', '1').lower() in ('1', 'true', 'yes')
+        # Resident eval() models, bounded by bytes rather than entry count
+        self.model_cache = LRUCache(
+            max_bytes=int(float(os.getenv('MODEL_CACHE_MAX_MB', '512')) * 1024 * 1024),
+            ttl_seconds=float(os.getenv('MODEL_CACHE_TTL_SECONDS', '3600')),
+            name='company_models'
+        )
+        # Prepared model inputs (x, edge_index, parsed sales), keyed by data fingerprint + model version
+        self.input_cache = LRUCache(
+            max_bytes=int(float(os.getenv('INPUT_CACHE_MAX_MB', '512')) * 1024 * 1024),
+            ttl_seconds=float(os.getenv('INPUT_CACHE_TTL_SECONDS', '3600')),
+            name='company_inputs'
+        )
+        # Finished /predict results, keyed by request + model version + data fingerprint
+        self.result_cache = LRUCache(
+            max_bytes=int(float(os.getenv('RESULT_CACHE_MAX_MB', '64')) * 1024 * 1024),
+            max_entries=int(os.getenv('RESULT_CACHE_MAX_ENTRIES', '10000')),
+            ttl_seconds=float(os.getenv('RESULT_CACHE_TTL_SECONDS', '300')),
+            name='prediction_results'
+        )
+        # Serialized model weights on local disk, keyed by sha256
+        self.artifact_cache = ArtifactCache()
+        # Company models: same backend as the trainer (MODEL_STORE), sharing its MongoDB client
+        self.store = create_model_store()
     
-    def _connect_mongo(self):
-        try:
-            if not self.mongo_uri:
-                raise ValueError("MONGO_URI environment variable not set")
-            self.client = MongoClient(self.mongo_uri, 
-                                    tls=True,
-                                    tlsAllowInvalidCertificates=True,
-                                    serverSelectionTimeoutMS=30000)
-            self.db = self.client.supplychain
-            if self.debug:
-                print("✓ Connected to MongoDB Atlas for prediction")
-        except Exception as e:
-            if self.debug:
-                print(f"✗ Failed to connect to MongoDB: {e}")
-            self.client = None
-            self.db = None
+    @staticmethod
+    def _model_version(model_doc):
+        """Version stamp of a company model document (legacy docs fall back to created_at)"""
+        version = model_doc.get('model_version')
+        if version is None:
+            version = str(model_doc.get('created_at', ''))
+        return version
+
+    def invalidate_company_model(self, company_id, version=None):
+        """
+        Drop a cached company model, unless it already is the given version.
+        A load in flight has an unknown version and is invalidated too, so it can't cache what it fetched.
+        """
+        removed = self.model_cache.invalidate(
+            predicate=lambda key, entry: key == company_id and (
+                version is None or entry is None or entry['version'] != version
+            )
+        )
+        # Results of any other version are dead even when no model was cached
+        self.result_cache.invalidate(
+            predicate=lambda key, result: key[0] == company_id and (version is None or key[3] != version)
+        )
+        if removed and self.debug:
+            print(f"✓ Invalidated cached model for company {company_id}")
+        return removed
+
+    def _company_model_entry(self, company_id):
+        """
+        Cached company model plus everything derived from its metadata once per load:
+        node list, scalers and the scaler mean/denominator vectors aligned with the node list.
+        """
+        # Concurrent cold requests for one company share a single load
+        return self.model_cache.get_or_compute(company_id, lambda: self._build_company_model_entry(company_id))
+    
+    def _build_company_model_entry(self, company_id):
+        # The exported graph is float32; int8 quantization, when enabled, applies to the eager model
+        model, model_doc = self._fetch_company_model(company_id, inference_graph=self.torchscript and not self.quantization)
+        
+        # The serialized weights are not needed once the model is built
+        model_doc.get('model_storage', {}).pop('model_bytes', None)
+        
+        node_list = model_doc.get('node_list', [])
+        if not node_list and model_doc.get('node_to_idx'):
+            node_list = list(model_doc['node_to_idx'].keys())
+        # Compact scaler vectors, or the per-node dict of older documents
+        scalers = NodeScalers.from_model_doc(model_doc, node_list)
+        
+        entry = {
+            'model': model,
+            'model_doc': model_doc,
+            'version': self._model_version(model_doc),
+            'node_list': node_list,
+            'lookup': ProductLookup(node_list),
+            'scalers': scalers,
+            'scaler_vectors': self._scaler_vectors(node_list, scalers) if scalers is not None else None,
+            'max_timesteps': model_doc.get('architecture', {}).get('max_timesteps', 5),
+            'variant': 'torchscript' if isinstance(model, torch.jit.ScriptModule) else 'float32',
+            'quantization': None
+        }
+        if self.quantization:
+            # The float model is dropped when the int8 variant is served
+            entry['model'], entry['quantization'] = self._quantized_variant(company_id, entry)
+            if entry['quantization']['accepted']:
+                entry['variant'] = 'int8'
+        if entry['variant'] == 'torchscript':
+            entry['execution_mode'] = 'torchscript'
+        else:
+            entry['execution_mode'] = configure_execution(entry['model'], self.execution_mode)
+        return entry
+    
+    def _quantized_variant(self, company_id, entry):
+        """
+        (model to serve, quantization report) for a freshly loaded company model.
+        Uses the drift measured when the model was saved; models saved without that
+        check are checked against the company's current inputs.
+        """
+        model = entry['model']
+        report = (entry['model_doc'].get('metrics') or {}).get('quantization')
+        if report is None:
+            try:
+                inputs = self._prepare_company_inputs(company_id, entry)
+            except Exception as e:
+                return model, {'accepted': False, 'reason': f"no company data to check drift on: {e}"}
+            model, report = quantize_checked(model, inputs['x'], inputs['edge_index'])
+        elif report.get('max_rel_diff') is not None and report['max_rel_diff'] <= max_drift():
+            try:
+                model, report = quantize_model(model), {**report, 'accepted': True}
+            except Exception as e:
+                report = {**report, 'accepted': False, 'reason': f"quantization failed: {e}"}
+        else:
+            reason = report.get('reason') or f"drift {report.get('max_rel_diff')} above {max_drift()}"
+            report = {**report, 'accepted': False, 'reason': reason}
+        
+        if self.debug:
+            if report['accepted']:
+                print(f"✓ Serving int8 model for company {company_id} (drift {report['max_rel_diff']:.4f})")
+            else:
+                print(f"⚠️ Serving float32 model for company {company_id}: {report.get('reason')}")
+        return model, report
     
     def _load_company_model(self, company_id):
-        """Load fine-tuned GAT+LSTM company model from MongoDB Atlas"""
+        """Load company model, served from the in-process cache when warm"""
+        entry = self._company_model_entry(company_id)
+        return entry['model'], entry['model_doc']
+    
+    @staticmethod
+    def _scaler_vectors(node_list, scalers):
+        """
+        Per-node scaler parameters as float32 (mean, denominator) vectors aligned with node_list.
+        Accepts NodeScalers or a legacy {node: {'mean_', 'scale_'}} dict.
+        Nodes without a scaler get mean 0 / denominator 1, i.e. are left unscaled.
+        """
+        if not isinstance(scalers, NodeScalers):
+            scalers = NodeScalers.from_legacy(scalers or {}, node_list)
+        return scalers.normalization_vectors()
+    
+    def _fetch_company_model(self, company_id, inference_graph=False):
+        """
+        Load fine-tuned GAT+LSTM company model from the model store.
+        inference_graph=True loads the version's exported TorchScript graph instead, when it has one.
+        """
         try:
-            if self.db is None:
-                raise Exception("MongoDB connection not available")
+            if not self.store.available:
+                raise Exception("Model store not available")
             
-            model_doc = self.db.company_models.find_one({'company_id': company_id})
+            # Embedded weights are only fetched on an artifact cache miss
+            model_doc = self.store.get('company', company_id)
             if not model_doc:
                 raise Exception(f"Company model not found for company {company_id}")
             
@@ -46,27 +180,17 @@ class DemandPredictor:
             if model_doc.get('model_type') != 'GAT-LSTM Hybrid':
                 raise Exception(f"Unsupported model type: {model_doc.get('model_type')}. Only GAT+LSTM models are supported.")
             
-            # Handle GridFS storage
-            if model_doc.get('model_storage', {}).get('type') == 'gridfs':
-                if self.debug:
-                    print("Loading company model from GridFS...")
-                import gridfs
-                fs = gridfs.GridFS(self.db)
-                file_id = model_doc['model_storage']['file_id']
-                
-                try:
-                    from bson import ObjectId
-                    grid_file = fs.get(ObjectId(file_id))
-                    model_bytes = grid_file.read()
-                    model_state = pickle.loads(model_bytes)
-                    if self.debug:
-                        print(f"✓ Loaded company model from GridFS: {len(model_bytes) / (1024*1024):.2f} MB")
-                except Exception as gridfs_error:
-                    print(f"✗ GridFS loading failed: {gridfs_error}")
-                    raise Exception("Failed to load company model from GridFS")
-            else:
-                # Handle embedded storage
-                model_state = pickle.loads(model_doc['model_storage']['model_bytes'])
+            if inference_graph:
+                graph = self._load_inference_graph(model_doc)
+                if graph is not None:
+                    return graph, model_doc
+            
+            # Weights come from the local artifact cache when this version was loaded before
+            try:
+                model_state = self.store.load_state('company', model_doc, self.artifact_cache)
+            except Exception as load_error:
+                print(f"✗ Model weights loading failed: {load_error}")
+                raise Exception("Failed to load company model weights")
             
             from training.trainer import HybridGATLSTM
             
@@ -82,7 +206,8 @@ class DemandPredictor:
                 lstm_hidden=architecture['lstm_hidden'],
                 dropout=architecture['dropout']
             )
-            model.load_state_dict(model_state)
+            # assign: serve straight from the (mmap-backed) loaded tensors instead of copying them
+            model.load_state_dict(model_state, assign=True)
             model.eval()
             
             if self.debug:
@@ -94,19 +219,48 @@ class DemandPredictor:
             print(f"✗ Error loading company model: {e}")
             raise
     
+    def _load_inference_graph(self, model_doc):
+        """The exported TorchScript graph of a model version, or None (no export, older export format, load failure)"""
+        export = (model_doc.get('artifacts') or {}).get(torchscript.ARTIFACT_NAME)
+        if not export or export.get('export_version') != torchscript.EXPORT_VERSION:
+            return None
+        try:
+            blob = self.store.load_artifact('company', model_doc, torchscript.ARTIFACT_NAME, self.artifact_cache)
+            graph = torchscript.load_inference_graph(blob)
+        except Exception as e:
+            print(f"⚠️ TorchScript graph unavailable, using the eager model: {e}")
+            return None
+        if self.debug:
+            print(f"✓ Loaded TorchScript inference graph (torch {export.get('torch_version')})")
+        return graph
+    
+    def _company_data_paths(self, company_id):
+        """Paths of the company's uploaded Sales Order, Edges (Plant) and nodes CSV files"""
+        backend_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        uploads_dir = os.path.join(backend_dir, 'uploads', company_id)
+        return (
+            os.path.join(uploads_dir, 'Sales Order.csv'),
+            os.path.join(uploads_dir, 'Edges (Plant).csv'),
+            os.path.join(uploads_dir, 'nodes.csv')
+        )
+    
+    def _data_fingerprint(self, company_id):
+        """Fingerprint of the company's uploaded files; changes whenever a file is re-uploaded"""
+        return tuple(file_fingerprint(path) for path in self._company_data_paths(company_id))
+    
+    def invalidate_company_inputs(self, company_id):
+        """Drop cached model inputs and prediction results for a company (e.g. after a re-upload)"""
+        self.result_cache.invalidate(predicate=lambda key, result: key[0] == company_id)
+        return self.input_cache.invalidate(predicate=lambda key, entry: key[0] == company_id)
+    
     def _load_company_data(self, company_id):
         """Load company's uploaded CSV files"""
         try:
-            backend_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-            uploads_dir = os.path.join(backend_dir, 'uploads', company_id)
+            # Load sales data (UPDATED: Sales Order.csv)
+            sales_path, edges_path, nodes_path = self._company_data_paths(company_id)
             
             if self.debug:
-                print(f"Loading data from: {uploads_dir}")
-            
-            # Load sales data (UPDATED: Sales Order.csv)
-            sales_path = os.path.join(uploads_dir, 'Sales Order.csv')
-            edges_path = os.path.join(uploads_dir, 'Edges (Plant).csv')
-            nodes_path = os.path.join(uploads_dir, 'nodes.csv')
+                print(f"Loading data from: {os.path.dirname(sales_path)}")
 
             if not os.path.exists(sales_path):
                 raise FileNotFoundError(f"Sales Order.csv not found at {sales_path}")
@@ -137,7 +291,8 @@ class DemandPredictor:
             print(f"✗ Error loading company data: {e}")
             raise
     
-    def _prepare_time_series_from_sales(self, sales_df, node_list, max_timesteps, scalers=None):
+    def _prepare_time_series_from_sales(self, sales_df, node_list, max_timesteps, scalers=None, scaler_vectors=None,
+                                        sorted_by_date=False):
         """
         Prepare time series input from Sales Order wide-format data (Date + product columns).
         
@@ -145,84 +300,65 @@ class DemandPredictor:
         - Date column + product columns (one per node/product)
         - Each row is a time period
         - Values are sales quantities for that period
+        
+        The last max_timesteps rows are reindexed to node_list order and scaled with
+        the training scalers in one broadcast; the float32 buffer is handed to torch
+        without a copy. scaler_vectors is the precomputed (mean, denominator) pair
+        from _scaler_vectors; it is derived from scalers when not given. Pass
+        sorted_by_date=True when sales_df was already sorted with sort_by_date.
         """
         try:
             if self.debug:
                 print(f"\n🔧 Preparing time series for {len(node_list)} nodes, {max_timesteps} timesteps")
             
-            # Initialize output
-            time_series_x = np.zeros((len(node_list), max_timesteps, 1))
-            
-            # Find date column (case-insensitive)
-            date_col = None
-            for col in sales_df.columns:
-                if col.lower() in ('date', 'timestamp'):
-                    date_col = col
-                    break
-            
-            # Sort by date
-            sales_copy = sales_df.copy()
-            if date_col:
-                try:
-                    sales_copy[date_col] = pd.to_datetime(sales_copy[date_col], errors='coerce')
-                    sales_copy = sales_copy.sort_values(date_col)
-                except Exception as e:
-                    if self.debug:
-                        print(f"  ⚠️  Could not parse dates: {e}")
+            # Sort by date and keep only the most recent periods
+            sales_sorted = sales_df if sorted_by_date else sort_by_date(sales_df)
+            recent = sales_sorted.iloc[-max_timesteps:] if max_timesteps > 0 else sales_sorted.iloc[:0]
             
-            # Extract time series for each node (product)
-            for i, node_id in enumerate(node_list):
-                # Check if this node/product exists as a column
-                if node_id not in sales_copy.columns:
-                    if self.debug:
-                        print(f"  ⚠️  Node {node_id} not found in Sales Order columns")
-                    continue
-                
-                # Get sales values for this product
-                values = pd.to_numeric(sales_copy[node_id], errors='coerce').fillna(0.0).values
-                
-                # Take last max_timesteps values
-                recent_values = values[-max_timesteps:]
-                
-                # Left-pad if shorter than max_timesteps
-                if len(recent_values) < max_timesteps:
-                    recent_values = np.pad(recent_values, (max_timesteps - len(recent_values), 0), 
-                                          mode='constant', constant_values=0)
-                
-                time_series_x[i, :, 0] = recent_values
-                
-                if self.debug and i < 3:
-                    print(f"  Node {node_id}: {recent_values.tolist()}")
+            if self.debug:
+                available = set(recent.columns)
+                missing = [node_id for node_id in node_list if node_id not in available]
+                if missing:
+                    print(f"  ⚠️  {len(missing)} nodes not found in Sales Order columns: {missing[:10]}")
+            
+            # (periods, nodes) in node_list order; absent products and non-numeric values become 0
+            block = recent.reindex(columns=node_list)
+            values = numeric_frame(block, block.columns).to_numpy(dtype=np.float32, na_value=0.0)
+            
+            # Left-pad if shorter than max_timesteps
+            time_series_x = np.zeros((len(node_list), max_timesteps, 1), dtype=np.float32)
+            if len(values):
+                time_series_x[:, max_timesteps - len(values):, 0] = values.T
+            
+            if self.debug:
+                for i, node_id in enumerate(node_list[:3]):
+                    print(f"  Node {node_id}: {time_series_x[i, :, 0].tolist()}")
             
             # Apply scalers if available (IMPORTANT: use SAME scalers as training)
-            if scalers:
+            if scaler_vectors is None and scalers:
+                scaler_vectors = self._scaler_vectors(node_list, scalers)
+            if scaler_vectors is not None:
                 if self.debug:
                     print("\n🔧 Applying scalers (same as training)...")
-                
-                for i, node_id in enumerate(node_list):
-                    if node_id in scalers:
-                        scaler_data = scalers[node_id]
-                        mean = np.array(scaler_data['mean_'])
-                        scale = np.array(scaler_data['scale_'])
-                        
-                        # Apply scaling: (x - mean) / scale
-                        time_series_x[i, :, 0] = (time_series_x[i, :, 0] - mean) / (scale + 1e-8)
-                        
-                        if self.debug and i < 3:
-                            print(f"  Scaled node {node_id}: mean={mean[0]:.2f}, scale={scale[0]:.2f}")
+                mean, denom = scaler_vectors
+                # Scaling: (x - mean) / (scale + 1e-8), broadcast over timesteps
+                series = time_series_x[:, :, 0]
+                series -= mean[:, None]
+                series /= denom[:, None]
             
             # Data quality checks
-            non_zero_nodes = np.sum(np.abs(time_series_x).sum(axis=(1, 2)) > 0)
+            non_zero_nodes = int(np.count_nonzero(np.abs(time_series_x).sum(axis=(1, 2)) > 0))
             if self.debug:
                 print(f"\n✓ Prepared time series: {time_series_x.shape}")
                 print(f"  Non-zero nodes: {non_zero_nodes}/{len(node_list)}")
-                print(f"  Value range: [{time_series_x.min():.2f}, {time_series_x.max():.2f}]")
-                print(f"  Mean: {time_series_x.mean():.2f}")
+                if time_series_x.size:
+                    print(f"  Value range: [{time_series_x.min():.2f}, {time_series_x.max():.2f}]")
+                    print(f"  Mean: {time_series_x.mean():.2f}")
             
             if non_zero_nodes == 0:
                 print("⚠️  WARNING: All time series are zero! Check your Sales Order data.")
             
-            return torch.tensor(time_series_x, dtype=torch.float)
+            return torch.from_numpy(time_series_x)
             
         except Exception as e:
             print(f"✗ Error preparing time series: {e}")
@@ -230,111 +366,146 @@ class DemandPredictor:
             traceback.print_exc()
             raise
 
-    def _recent_stats_for_product(self, sales_df, node_id, max_timesteps):
+    def _recent_stats_table(self, sales_sorted, max_timesteps):
         """
-        Compute recent raw stats (mean, max, trend) for calibration.
-        Uses Sales Order format: Date + product columns.
+        Recent raw stats used for calibration, for every product column in one vectorized pass.
+        Uses Sales Order format (Date + product columns), already sorted by date.
+        
+        Per product (missing values dropped):
+        - mean / max over the last max_timesteps values
+        - recent_mean over the last 2 * max_timesteps values (the trend lookback)
+        - first/last-third means of the lookback and whether the last 3 values are monotonic
+        - trend: 'down' / 'up' only for a >20% change with a consistent tail, else 'stable'
         """
-        try:
-            if node_id not in sales_df.columns:
-                return {'mean': 0.0, 'max': 0.0, 'trend': 'stable'}
-
-            # Sort by date if available
-            df = sales_df.copy()
-            date_col = None
-            for col in df.columns:
-                if col.lower() in ('date', 'timestamp'):
-                    date_col = col
-                    break
-            
-            if date_col:
-                try:
-                    df[date_col] = pd.to_datetime(df[date_col], errors='coerce')
-                    df = df.sort_values(date_col)
-                except Exception:
-                    pass
-            
-            # Get product values
-            vals = pd.to_numeric(df[node_id], errors='coerce').dropna().values
-            if len(vals) == 0:
-                return {'mean': 0.0, 'max': 0.0, 'trend': 'stable'}
-            
-            # Take recent values (use more for trend detection)
-            lookback = min(max_timesteps * 2, len(vals))
-            recent = vals[-lookback:]
-            
-            # Detect trend: require clear, sustained decline/increase
-            # Only mark as 'down' if there's a significant (>20%) and consistent decline
-            if len(recent) >= 6:
-                # Compare first third vs last third to avoid noise
-                first_third = recent[:len(recent)//3]
-                last_third = recent[-len(recent)//3:]
-                first_mean = float(np.mean(first_third))
-                last_mean = float(np.mean(last_third))
-                
-                # Also check if last 3 values are consistently declining
-                if len(recent) >= 3:
-                    last_3 = recent[-3:]
-                    is_consistently_declining = all(last_3[i] >= last_3[i+1] for i in range(len(last_3)-1))
-                    is_consistently_increasing = all(last_3[i] <= last_3[i+1] for i in range(len(last_3)-1))
-                else:
-                    is_consistently_declining = False
-                    is_consistently_increasing = False
-                
-                if first_mean > 0:
-                    change_pct = ((last_mean - first_mean) / first_mean) * 100
-                    # Require >20% change AND consistent pattern to mark as trend
-                    if change_pct < -20 and is_consistently_declining:
-                        trend = 'down'
-                    elif change_pct > 20 and is_consistently_increasing:
-                        trend = 'up'
-                    else:
-                        trend = 'stable'
-                else:
-                    trend = 'stable'
-            else:
-                trend = 'stable'
-            
-            # Use last max_timesteps for mean/max
-            recent_for_stats = vals[-max_timesteps:] if len(vals) >= max_timesteps else vals
-            
-            return {
-                'mean': float(np.mean(recent_for_stats)),
-                'max': float(np.max(recent_for_stats)),
-                'trend': trend,
-                'recent_mean': float(np.mean(recent))
-            }
-        except Exception:
+        date_col = find_date_column(sales_sorted.columns)
+        products = [col for col in sales_sorted.columns if col != date_col]
+        values = numeric_frame(sales_sorted, products).to_numpy(dtype=float)
+        
+        valid = ~np.isnan(values)
+        count = valid.sum(axis=0)
+        # 1 = most recent valid value of each product
+        rank_from_end = np.where(valid, np.cumsum(valid[::-1], axis=0)[::-1], 0)
+        
+        def masked_mean(mask):
+            n = mask.sum(axis=0)
+            total = np.where(mask, values, 0.0).sum(axis=0)
+            return np.divide(total, n, out=np.zeros(len(products)), where=n > 0)
+        
+        def value_at_rank(rank):
+            return np.where(valid & (rank_from_end == rank), values, 0.0).sum(axis=0)
+        
+        # Use last max_timesteps for mean/max
+        stats_mask = valid & (rank_from_end <= max_timesteps)
+        mean = masked_mean(stats_mask)
+        max_val = np.where(stats_mask, values, -np.inf).max(axis=0, initial=-np.inf)
+        max_val = np.where(count > 0, max_val, 0.0)
+        
+        # Take recent values (use more for trend detection)
+        lookback = np.minimum(max_timesteps * 2, count)
+        in_lookback = valid & (rank_from_end <= lookback)
+        recent_mean = masked_mean(in_lookback)
+        
+        # Compare first third vs last third to avoid noise (last third rounds up, as recent[-n//3:])
+        first_third_mean = masked_mean(in_lookback & (rank_from_end > lookback - lookback // 3))
+        last_third_mean = masked_mean(valid & (rank_from_end <= -(-lookback // 3)))
+        
+        # Also check if last 3 values are consistently declining / increasing
+        last_1, last_2, last_3 = value_at_rank(1), value_at_rank(2), value_at_rank(3)
+        declining_tail = (last_3 >= last_2) & (last_2 >= last_1)
+        increasing_tail = (last_3 <= last_2) & (last_2 <= last_1)
+        
+        # Require >20% change AND consistent pattern to mark as trend
+        change_pct = np.divide(last_third_mean - first_third_mean, first_third_mean,
+                               out=np.zeros(len(products)), where=first_third_mean > 0) * 100
+        has_trend = (lookback >= 6) & (first_third_mean > 0)
+        trend = np.full(len(products), 'stable', dtype=object)
+        trend[has_trend & (change_pct < -20) & declining_tail] = 'down'
+        trend[has_trend & (change_pct > 20) & increasing_tail] = 'up'
+        
+        return pd.DataFrame({
+            'mean': mean,
+            'max': max_val,
+            'recent_mean': recent_mean,
+            'first_third_mean': first_third_mean,
+            'last_third_mean': last_third_mean,
+            'declining_tail': declining_tail,
+            'increasing_tail': increasing_tail,
+            'trend': trend,
+            'count': count
+        }, index=pd.Index(products, dtype=object))
+    
+    @staticmethod
+    def _recent_stats_row(stats_rows, node_id):
+        """Calibration stats of one product from the precomputed table rows"""
+        row = stats_rows.get(node_id)
+        if row is None or not row['count']:
             return {'mean': 0.0, 'max': 0.0, 'trend': 'stable'}
+        return {
+            'mean': float(row['mean']),
+            'max': float(row['max']),
+            'trend': row['trend'],
+            'recent_mean': float(row['recent_mean'])
+        }
+    
+    TREND_CODES = {'stable': 0, 'up': 1, 'down': 2}
     
     def _generate_forecast_series(self, base_value, recent_stats, days):
         """
         Create a smooth multi-day forecast using the single-step prediction plus recent trends.
         This is a heuristic to provide the UI with a 30-day trajectory.
         """
-        if days <= 1:
-            return [round(max(0.0, base_value), 2)]
-        
         mean = recent_stats.get('mean', base_value) or base_value
-        max_val = max(recent_stats.get('max', base_value), base_value)
+        max_val = recent_stats.get('max', base_value)
         trend = recent_stats.get('trend', 'stable') or 'stable'
+        return self._generate_forecast_matrix([base_value], [mean], [max_val], [self.TREND_CODES.get(trend, 0)], days)[0]
+    
+    def _generate_forecast_matrix(self, base_values, means, maxes, trend_codes, days):
+        """
+        Vectorized _generate_forecast_series for many products at once.
         
-        amplitude = max(5.0, abs(mean) * 0.15, abs(max_val - mean) * 0.5, abs(base_value) * 0.1)
-        if amplitude == 0:
-            amplitude = max(1.0, base_value * 0.1)
-        
-        values = []
-        for day in range(days):
-            progress = day / max(1, days - 1)
-            if trend == 'up':
-                target = base_value + amplitude * (0.5 + progress)
-            elif trend == 'down':
-                target = max(0.0, base_value - amplitude * (0.5 + progress))
-            else:
-                target = mean + math.sin(progress * math.pi) * amplitude
-            blended = (base_value * 0.4) + (target * 0.6)
-            values.append(round(max(0.0, blended), 2))
-        return values
+        base_values, means, maxes: per-product floats; trend_codes: TREND_CODES values.
+        Returns a (products x days) list of lists, one trajectory per product.
+        """
+        base = np.asarray(base_values, dtype=np.float64).reshape(-1, 1)
+        if days <= 1:
+            return self._round2(np.fmax(base, 0.0)).tolist()
+        
+        mean = np.asarray(means, dtype=np.float64).reshape(-1, 1)
+        mean = np.where(mean == 0, base, mean)
+        max_val = np.maximum(np.asarray(maxes, dtype=np.float64).reshape(-1, 1), base)
+        trend = np.asarray(trend_codes).reshape(-1, 1)
+        
+        amplitude = np.fmax.reduce([
+            np.full_like(base, 5.0), np.abs(mean) * 0.15, np.abs(max_val - mean) * 0.5, np.abs(base) * 0.1
+        ])
+        amplitude = np.where(amplitude == 0, np.maximum(1.0, base * 0.1), amplitude)
+        
+        progress = np.arange(days, dtype=np.float64) / max(1, days - 1)
+        step = amplitude * (0.5 + progress)
+        target = np.where(
+            trend == self.TREND_CODES['up'], base + step,
+            np.where(
+                trend == self.TREND_CODES['down'], np.fmax(base - step, 0.0),
+                mean + np.sin(progress * np.pi) * amplitude
+            )
+        )
+        blended = (base * 0.4) + (target * 0.6)
+        return self._round2(np.fmax(blended, 0.0)).tolist()
+    
+    @staticmethod
+    def _round2(values):
+        """
+        Elementwise round(x, 2) with Python's exact semantics.
+        np.round scales by 100 first, which can flip values sitting next to a .xx5 tie,
+        so only those few are re-rounded in Python.
+        """
+        rounded = np.round(values, 2)
+        scaled = values * 100.0
+        near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+        if near_tie.any():
+            rounded[near_tie] = [round(v, 2) for v in values[near_tie].tolist()]
+        # + 0.0 turns -0.0 into 0.0, as max(0.0, x) does
+        return rounded + 0.0
     
     def _build_edge_index_from_edges(self, edges_df, node_list):
         """
@@ -345,64 +516,10 @@ class DemandPredictor:
         - Case-insensitive matching
         """
         try:
-            if edges_df is None or len(edges_df) == 0:
-                if self.debug:
-                    print("⚠️ No edges data, using self-loops")
-                return self._build_safe_edge_index(len(node_list))
-            
-            # Create case-insensitive node mapping
-            node_to_idx = {str(node).strip().upper(): i for i, node in enumerate(node_list)}
-            
-            if self.debug:
+            if self.debug and edges_df is not None:
                 print(f"\n🔧 Building edge index from {len(edges_df)} edge records...")
-                print(f"  Node mapping sample (first 5): {list(node_to_idx.items())[:5]}")
-            
-            edge_pairs = []
-            edges_created = 0
-            
-            for _, row in edges_df.iterrows():
-                plant = str(row.get('Plant', '')).strip().upper()
-                n1 = str(row.get('node1', '')).strip().upper()
-                n2 = str(row.get('node2', '')).strip().upper()
-                
-                # Skip empty nodes
-                if not plant and not n1 and not n2:
-                    continue
-                
-                # Create edges between all valid pairs
-                pairs_to_add = []
-                if plant and n1:
-                    pairs_to_add.append((plant, n1))
-                if plant and n2:
-                    pairs_to_add.append((plant, n2))
-                if n1 and n2:
-                    pairs_to_add.append((n1, n2))
-                
-                for src, dst in pairs_to_add:
-                    if src in node_to_idx and dst in node_to_idx:
-                        edge_pairs.append((node_to_idx[src], node_to_idx[dst]))
-                        edges_created += 1
-            
-            if self.debug:
-                print(f"  Created {edges_created} directed edges")
-            
-            # Add self-loops for isolated nodes
-            all_nodes = set(range(len(node_list)))
-            connected = {s for s, _ in edge_pairs} | {t for _, t in edge_pairs}
-            isolated = all_nodes - connected
             
-            for idx in isolated:
-                edge_pairs.append((idx, idx))
-            
-            if self.debug and isolated:
-                print(f"  Added {len(isolated)} self-loops for isolated nodes")
-            
-            if not edge_pairs:
-                if self.debug:
-                    print("  ⚠️ No valid edges created, using fallback")
-                return self._build_safe_edge_index(len(node_list))
-            
-            edge_index = torch.tensor(edge_pairs, dtype=torch.long).t().contiguous()
+            edge_index = build_edge_index(edges_df, node_list, verbose=self.debug)
             
             if self.debug:
                 print(f"✓ Built edge_index: {edge_index.shape}")
@@ -417,17 +534,299 @@ class DemandPredictor:
         
     def _build_safe_edge_index(self, num_nodes):
         """Create self-loop edge_index as fallback"""
-        if num_nodes <= 0:
-            return torch.empty((2, 0), dtype=torch.long)
-        
-        indices = torch.arange(num_nodes, dtype=torch.long)
-        edge_index = torch.stack([indices, indices], dim=0)
+        edge_index = self_loop_edge_index(num_nodes)
         
         if self.debug:
             print(f"  Created fallback edge_index with {num_nodes} self-loops")
         
         return edge_index
     
+    def _run_company_model(self, company_id):
+        """
+        Load the company model and data, prepare inputs and run one forward pass.
+        The forward pass covers every node, so the returned context serves any product.
+        """
+        # 1. Load model and metadata
+        entry = self._company_model_entry(company_id)
+        model = entry['model']
+        model_doc = entry['model_doc']
+        node_list = entry['node_list']
+        scalers = entry['scalers']
+        max_timesteps = entry['max_timesteps']
+        
+        if self.debug:
+            print(f"\n📊 Model Info:")
+            print(f"  Type: {model_doc.get('model_type')}")
+            print(f"  Nodes: {len(node_list)}")
+            print(f"  Max timesteps: {max_timesteps}")
+            print(f"  Has scalers: {scalers is not None}")
+            print(f"  Node list (first 10): {node_list[:10]}")
+        
+        # 2-4. Load company's REAL data and prepare model inputs (cached per data fingerprint)
+        inputs = self._prepare_company_inputs(company_id, entry)
+        sales_df = inputs['sales_df']
+        x = inputs['x']
+        edge_index = inputs['edge_index']
+        
+        if self.debug:
+            print(f"\n🔧 Prepared model inputs:")
+            print(f"  x shape: {x.shape}")
+            print(f"  edge_index shape: {edge_index.shape}")
+        
+        # 5. Make prediction
+        model.eval()
+        with torch.no_grad():
+            predictions = model(x, edge_index)
+            
+            if self.debug:
+                print(f"\n📈 Raw Predictions:")
+                print(f"  Shape: {predictions.shape}")
+                print(f"  Range: [{predictions.min().item():.4f}, {predictions.max().item():.4f}]")
+                print(f"  Mean: {predictions.mean().item():.4f}")
+                print(f"  Std: {predictions.std().item():.4f}")
+                
+                # Show first 5 predictions
+                print(f"\n  First 5 raw predictions:")
+                for i in range(min(5, len(predictions))):
+                    print(f"    {node_list[i]}: {predictions[i].item():.4f}")
+        
+        # Calculate confidence based on prediction variance
+        pred_std = predictions.std().item()
+        if pred_std < 0.01:
+            confidence = 60  # Low confidence for low variance
+        elif pred_std < 0.1:
+            confidence = 75
+        else:
+            confidence = 85
+        
+        return {
+            'company_id': company_id,
+            'node_list': node_list,
+            'lookup': entry['lookup'],
+            'scalers': scalers,
+            'max_timesteps': max_timesteps,
+            'sales_df': sales_df,
+            'recent_stats': inputs['recent_stats'],
+            'input_shape': list(x.shape),
+            'raw_predictions': predictions.view(-1).tolist(),
+            'confidence': confidence,
+            'prediction_stats': {
+                'min': round(float(predictions.min().item()), 4),
+                'max': round(float(predictions.max().item()), 4),
+                'mean': round(float(predictions.mean().item()), 4),
+                'std': round(float(pred_std), 4)
+            }
+        }
+    
+    def execution_report(self, company_id, repeats=5):
+        """Step time and output drift of each execution mode vs eager float32 on the company's current inputs"""
+        entry = self._company_model_entry(company_id)
+        inputs = self._prepare_company_inputs(company_id, entry)
+        # Execution modes apply to the eager float model; int8 and TorchScript ones can't be trained or compiled
+        served = entry['model']
+        model = served if entry['variant'] == 'float32' else self._fetch_company_model(company_id)[0]
+        report = compare_execution_modes(model, inputs['x'], inputs['edge_index'], repeats=repeats)
+        report['company_id'] = company_id
+        report['serving_mode'] = entry['execution_mode']
+        report['serving_variant'] = entry['variant']
+        report['quantization'] = entry['quantization']
+        if entry['variant'] != 'float32':
+            with torch.no_grad():
+                served_ms = median_ms(lambda: served(inputs['x'], inputs['edge_index']), max(1, int(repeats)))
+            eager_ms = report['modes']['eager']['inference_ms']
+            report['serving'] = {
+                'variant': entry['variant'],
+                'inference_ms': round(served_ms, 3),
+                'inference_speedup': round(eager_ms / served_ms, 3) if served_ms else None
+            }
+        return report
+    
+    def _prepare_company_inputs(self, company_id, model_entry):
+        """
+        Return x, edge_index, node index map and parsed sales for a company.
+        Entries are reused until the uploaded files or the model version change.
+        """
+        fingerprint = self._data_fingerprint(company_id)
+        key = (company_id, fingerprint, model_entry['version'])
+        # Concurrent cold requests for one company share a single parse of its CSVs
+        return self.input_cache.get_or_compute(
+            key, lambda: self._build_company_inputs(company_id, model_entry, fingerprint)
+        )
+    
+    def _build_company_inputs(self, company_id, model_entry, fingerprint):
+        node_list = model_entry['node_list']
+        
+        # 2. Load company's REAL data (parsed and sorted by date once)
+        sales_df, edges_df, nodes_df = self._load_company_data(company_id)
+        sales_df = sort_by_date(sales_df)
+        
+        # 3. Prepare REAL time series input from Sales Order data
+        x = self._prepare_time_series_from_sales(sales_df, node_list, model_entry['max_timesteps'],
+                                                 model_entry['scalers'], model_entry['scaler_vectors'],
+                                                 sorted_by_date=True)
+        
+        # 4. Build edge index from Edges (Plant).csv
+        edge_index = self._build_edge_index_from_edges(edges_df, node_list)
+        
+        inputs = {
+            'x': x,
+            'edge_index': edge_index,
+            'node_to_idx': {node: i for i, node in enumerate(node_list)},
+            'sales_df': sales_df,
+            # Calibration stats for every product, read row by row at prediction time
+            'recent_stats': self._recent_stats_table(sales_df, model_entry['max_timesteps']).to_dict('index')
+        }
+        # Entries for older uploads or model versions can never be hit again; results are
+        # keyed by fingerprint and version themselves and stay
+        version = model_entry['version']
+        self.input_cache.invalidate(
+            predicate=lambda key, entry: key[0] == company_id and (key[1] != fingerprint or key[2] != version)
+        )
+        return inputs
+    
+    def _match_product(self, lookup, requested_product):
+        """
+        Case-insensitive match of a requested product against the model's nodes.
+        Returns (index, match_type); exact names win over fuzzy substring matches.
+        """
+        product_idx, match_type = lookup.match(requested_product)
+        if self.debug and match_type == 'fuzzy':
+            print(f"  ⚠️ Fuzzy product match: '{requested_product}' → '{lookup.names[product_idx]}'")
+        return product_idx, match_type
+    
+    @staticmethod
+    def _normalize_forecast_days(forecast_days):
+        try:
+            forecast_days = int(forecast_days or 1)
+        except (TypeError, ValueError):
+            forecast_days = 1
+        return max(1, min(forecast_days, 30))
+    
+    def _product_prediction(self, context, product_idx, requested_product, forecast_days, match_type=None):
+        """Inverse-scale, calibrate and expand one node's raw output into a forecast result"""
+        final_prediction, recent_stats = self._calibrated_prediction(context, product_idx, requested_product)
+        
+        forecast_series = None
+        if forecast_days > 1:
+            forecast_series = self._generate_forecast_series(final_prediction, recent_stats, forecast_days)
+        
+        return self._format_product_result(
+            context, product_idx, requested_product, forecast_days, match_type, final_prediction, forecast_series
+        )
+    
+    def _calibrated_prediction(self, context, product_idx, requested_product):
+        """Inverse-scaled, calibrated single-step prediction and the recent stats it was calibrated against"""
+        node_list = context['node_list']
+        scalers = context['scalers']
+        stats_rows = context['recent_stats']
+        raw_predictions = context['raw_predictions']
+        
+        recent_stats = None
+        if product_idx is not None:
+            recent_stats = self._recent_stats_row(stats_rows, node_list[product_idx])
+        
+        if product_idx is not None:
+            final_prediction = float(raw_predictions[product_idx])
+            
+            if self.debug:
+                print(f"\n✓ Found product match:")
+                print(f"  Requested: {requested_product}")
+                print(f"  Matched: {node_list[product_idx]}")
+                print(f"  Index: {product_idx}")
+                print(f"  Raw prediction: {final_prediction:.4f}")
+            
+            # Inverse transform if scalers were used
+            if scalers is not None and scalers.has(product_idx):
+                # Inverse scaling: x_original = x_scaled * scale + mean
+                final_prediction = scalers.inverse(product_idx, final_prediction)
+                
+                if self.debug:
+                    print(f"  Inverse scaled: {final_prediction:.4f} "
+                          f"(mean={scalers.mean[product_idx]:.2f}, scale={scalers.scale[product_idx]:.2f})")
+                
+                # Calibration: adjust predictions based on recent trends
+                recent_mean = recent_stats.get('mean', 0.0) if recent_stats else 0.0
+                recent_max = recent_stats.get('max', 0.0) if recent_stats else 0.0
+                trend = recent_stats.get('trend', 'stable') if recent_stats else 'stable'
+                
+                # If prediction is way above recent max, cap it
+                upper_guard = max(recent_max * 1.5, recent_mean * 2.0, 100.0)
+                if upper_guard > 0 and final_prediction > upper_guard:
+                    if self.debug:
+                        print(f"  ⚠️ Calibrating high prediction {final_prediction:.2f} → {upper_guard:.2f}")
+                    final_prediction = upper_guard
+                
+                # Light adjustment based on trend - only if prediction is clearly wrong
+                if recent_mean > 0:
+                    if trend == 'down' and final_prediction > recent_mean * 1.2:
+                        adjusted = recent_mean * 0.95
+                        if self.debug:
+                            print(f"  📉 Downward trend: slight adjustment {final_prediction:.2f} → {adjusted:.2f}")
+                        final_prediction = adjusted
+                    elif trend == 'up' and final_prediction < recent_mean * 0.8:
+                        adjusted = recent_mean * 1.05
+                        if self.debug:
+                            print(f"  📈 Upward trend: slight adjustment {final_prediction:.2f} → {adjusted:.2f}")
+                        final_prediction = adjusted
+            
+            if final_prediction < 0:
+                final_prediction = 0.0
+        else:
+            if requested_product:
+                if self.debug:
+                    print(f"\n⚠️  Product '{requested_product}' not found in node list")
+                    print(f"  Available nodes: {node_list[:10]}...")
+            # Fallback to first node
+            final_prediction = float(raw_predictions[0])
+            if scalers is not None and scalers.has(0):
+                final_prediction = scalers.inverse(0, final_prediction)
+            final_prediction = max(0, final_prediction)
+            recent_stats = self._recent_stats_row(stats_rows, node_list[0])
+        
+        # Ensure prediction is positive
+        final_prediction = max(0, final_prediction)
+        
+        if not recent_stats:
+            recent_stats = {'mean': final_prediction, 'max': final_prediction, 'trend': 'stable'}
+        
+        return final_prediction, recent_stats
+    
+    def _format_product_result(self, context, product_idx, requested_product, forecast_days, match_type,
+                               final_prediction, forecast_series):
+        """Result dict for one product from its calibrated prediction and optional multi-day series"""
+        node_list = context['node_list']
+        result = {
+            'company_id': context['company_id'],
+            'confidence': context['confidence'],
+            'requested_product': requested_product,
+            'matched_node': node_list[product_idx] if product_idx is not None else None,
+            'match_type': match_type,
+            'model_type': 'GAT-LSTM Hybrid',
+            'input_shape': context['input_shape'],
+            'prediction_stats': dict(context['prediction_stats']),
+            'timestamp': pd.Timestamp.now().isoformat(),
+            'forecast_days': forecast_days
+        }
+        
+        if forecast_series:
+            total_forecast = sum(forecast_series)
+            result['prediction'] = [round(v, 2) for v in forecast_series]
+            result['average_daily'] = round(total_forecast / forecast_days, 2)
+            result['total_30_days'] = round(total_forecast, 2)
+            result['prediction_series'] = result['prediction']
+            result['rawPredicted'] = round(max(forecast_series), 2)
+        else:
+            result['prediction'] = [round(final_prediction, 2)]
+            result['average_daily'] = round(final_prediction, 2)
+            result['total_30_days'] = round(final_prediction * min(forecast_days, 30), 2)
+            result['rawPredicted'] = round(final_prediction, 2)
+        
+        if self.debug:
+            print(f"\n✅ FINAL PREDICTION: {final_prediction:.2f}")
+            print(f"   Confidence: {context['confidence']}%")
+        
+        return result
+    
     def predict(self, company_id, input_data, forecast_days=1):
         """Generate demand prediction for a company using REAL data"""
         try:
@@ -437,201 +836,120 @@ class DemandPredictor:
                 print(f"{'='*60}")
                 print(f"Input data: {input_data}")
             
-            # 1. Load model and metadata
-            model, model_doc = self._load_company_model(company_id)
-            node_list = model_doc.get('node_list', [])
-            if not node_list and model_doc.get('node_to_idx'):
-                node_list = list(model_doc['node_to_idx'].keys())
-            scalers = model_doc.get('scalers', {})
-            max_timesteps = model_doc.get('architecture', {}).get('max_timesteps', 5)
-            
-            if self.debug:
-                print(f"\n📊 Model Info:")
-                print(f"  Type: {model_doc.get('model_type')}")
-                print(f"  Nodes: {len(node_list)}")
-                print(f"  Max timesteps: {max_timesteps}")
-                print(f"  Has scalers: {len(scalers) > 0}")
-                print(f"  Node list (first 10): {node_list[:10]}")
-            
-            # 2. Load company's REAL data
-            sales_df, edges_df, nodes_df = self._load_company_data(company_id)
-            
-            # 3. Prepare REAL time series input from Sales Order data
-            x = self._prepare_time_series_from_sales(sales_df, node_list, max_timesteps, scalers)
-            
-            # 4. Build edge index from Edges (Plant).csv
-            edge_index = self._build_edge_index_from_edges(edges_df, node_list)
-            
-            if self.debug:
-                print(f"\n🔧 Prepared model inputs:")
-                print(f"  x shape: {x.shape}")
-                print(f"  edge_index shape: {edge_index.shape}")
-            
-            # 5. Make prediction
-            model.eval()
-            with torch.no_grad():
-                predictions = model(x, edge_index)
-                
-                if self.debug:
-                    print(f"\n📈 Raw Predictions:")
-                    print(f"  Shape: {predictions.shape}")
-                    print(f"  Range: [{predictions.min().item():.4f}, {predictions.max().item():.4f}]")
-                    print(f"  Mean: {predictions.mean().item():.4f}")
-                    print(f"  Std: {predictions.std().item():.4f}")
-                    
-                    # Show first 5 predictions
-                    print(f"\n  First 5 raw predictions:")
-                    for i in range(min(5, len(predictions))):
-                        print(f"    {node_list[i]}: {predictions[i].item():.4f}")
-            
             # 6. Find requested product
             requested_product = None
             if isinstance(input_data, list) and len(input_data) > 0:
                 requested_product = input_data[0].get('product', '')
+            forecast_days = self._normalize_forecast_days(forecast_days)
+            
+            # Identical requests against the same model version and data are served from the result cache
+            model_entry = self._company_model_entry(company_id)
+            cache_key = (
+                company_id,
+                str(requested_product or '').strip().upper(),
+                forecast_days,
+                model_entry['version'],
+                self._data_fingerprint(company_id)
+            )
+            result = self.result_cache.get_or_compute(
+                cache_key, lambda: self._predict_product(company_id, requested_product, forecast_days)
+            )
             
-            # 7. Extract and post-process specific prediction
-            product_idx = None
-            if requested_product:
-                # Case-insensitive matching
-                requested_upper = requested_product.strip().upper()
-                for i, node in enumerate(node_list):
-                    node_upper = node.strip().upper()
-                    if requested_upper == node_upper or requested_upper in node_upper or node_upper in requested_upper:
-                        product_idx = i
-                        break
-            
-            recent_stats = None
-            if product_idx is not None:
-                recent_stats = self._recent_stats_for_product(sales_df, node_list[product_idx], max_timesteps)
-            
-            if product_idx is not None:
-                final_prediction = float(predictions[product_idx].item())
-                
-                if self.debug:
-                    print(f"\n✓ Found product match:")
-                    print(f"  Requested: {requested_product}")
-                    print(f"  Matched: {node_list[product_idx]}")
-                    print(f"  Index: {product_idx}")
-                    print(f"  Raw prediction: {final_prediction:.4f}")
-                
-                # Inverse transform if scalers were used
-                if scalers and node_list[product_idx] in scalers:
-                    scaler_data = scalers[node_list[product_idx]]
-                    mean = np.array(scaler_data.get('mean_', [0.0]))
-                    scale = np.array(scaler_data.get('scale_', [1.0]))
-                    
-                    # Inverse scaling: x_original = x_scaled * scale + mean
-                    final_prediction = final_prediction * (scale[0] if scale.size else 1.0) + (mean[0] if mean.size else 0.0)
-                    
-                    if self.debug:
-                        print(f"  Inverse scaled: {final_prediction:.4f} (mean={mean[0]:.2f}, scale={scale[0]:.2f})")
-                    
-                    # Calibration: adjust predictions based on recent trends
-                    recent_mean = recent_stats.get('mean', 0.0) if recent_stats else 0.0
-                    recent_max = recent_stats.get('max', 0.0) if recent_stats else 0.0
-                    trend = recent_stats.get('trend', 'stable') if recent_stats else 'stable'
-                    
-                    # If prediction is way above recent max, cap it
-                    upper_guard = max(recent_max * 1.5, recent_mean * 2.0, 100.0)
-                    if upper_guard > 0 and final_prediction > upper_guard:
-                        if self.debug:
-                            print(f"  ⚠️ Calibrating high prediction {final_prediction:.2f} → {upper_guard:.2f}")
-                        final_prediction = upper_guard
-                    
-                    # Light adjustment based on trend - only if prediction is clearly wrong
-                    if recent_mean > 0:
-                        if trend == 'down' and final_prediction > recent_mean * 1.2:
-                            adjusted = recent_mean * 0.95
-                            if self.debug:
-                                print(f"  📉 Downward trend: slight adjustment {final_prediction:.2f} → {adjusted:.2f}")
-                            final_prediction = adjusted
-                        elif trend == 'up' and final_prediction < recent_mean * 0.8:
-                            adjusted = recent_mean * 1.05
-                            if self.debug:
-                                print(f"  📈 Upward trend: slight adjustment {final_prediction:.2f} → {adjusted:.2f}")
-                            final_prediction = adjusted
-                
-                if final_prediction < 0:
-                    final_prediction = 0.0
-            else:
-                if requested_product:
-                    if self.debug:
-                        print(f"\n⚠️  Product '{requested_product}' not found in node list")
-                        print(f"  Available nodes: {node_list[:10]}...")
-                # Fallback to first node
-                final_prediction = float(predictions[0].item())
-                if scalers and node_list[0] in scalers:
-                    scaler_data = scalers[node_list[0]]
-                    mean = np.array(scaler_data.get('mean_', [0.0]))
-                    scale = np.array(scaler_data.get('scale_', [1.0]))
-                    final_prediction = final_prediction * (scale[0] if scale.size else 1.0) + (mean[0] if mean.size else 0.0)
-                final_prediction = max(0, final_prediction)
-                recent_stats = self._recent_stats_for_product(sales_df, node_list[0], max_timesteps)
-            
-            # Ensure prediction is positive
-            final_prediction = max(0, final_prediction)
-            
-            if not recent_stats:
-                recent_stats = {'mean': final_prediction, 'max': final_prediction, 'trend': 'stable'}
+            if self.debug:
+                print(f"{'='*60}\n")
             
-            try:
-                forecast_days = int(forecast_days or 1)
-            except (TypeError, ValueError):
-                forecast_days = 1
-            forecast_days = max(1, min(forecast_days, 30))
-            
-            forecast_series = None
-            if forecast_days > 1:
-                forecast_series = self._generate_forecast_series(final_prediction, recent_stats, forecast_days)
-            
-            # Calculate confidence based on prediction variance
-            pred_std = predictions.std().item()
-            if pred_std < 0.01:
-                confidence = 60  # Low confidence for low variance
-            elif pred_std < 0.1:
-                confidence = 75
-            else:
-                confidence = 85
+            # Results are shared between requests; hand out a copy carrying this request's spelling and time
+            result = dict(result)
+            result['requested_product'] = requested_product
+            result['timestamp'] = pd.Timestamp.now().isoformat()
+            return result
             
-            result = {
-                'company_id': company_id,
-                'confidence': confidence,
-                'requested_product': requested_product,
-                'matched_node': node_list[product_idx] if product_idx is not None else None,
-                'model_type': 'GAT-LSTM Hybrid',
-                'input_shape': list(x.shape),
-                'prediction_stats': {
-                    'min': round(float(predictions.min().item()), 4),
-                    'max': round(float(predictions.max().item()), 4),
-                    'mean': round(float(predictions.mean().item()), 4),
-                    'std': round(float(predictions.std().item()), 4)
-                },
-                'timestamp': pd.Timestamp.now().isoformat(),
-                'forecast_days': forecast_days
-            }
+        except Exception as e:
+            print(f"\n✗ Error generating prediction: {e}")
+            import traceback
+            traceback.print_exc()
+            raise
+    
+    def _predict_product(self, company_id, requested_product, forecast_days):
+        """Full single-product pipeline behind predict()'s result cache"""
+        context = self._run_company_model(company_id)
+        
+        # 7. Extract and post-process specific prediction
+        product_idx, match_type = self._match_product(context['lookup'], requested_product)
+        return self._product_prediction(context, product_idx, requested_product, forecast_days, match_type)
+    
+    def predict_many(self, company_id, products='all', forecast_days=1):
+        """
+        Generate predictions for many products from a single model load,
+        input preparation and forward pass.
+        
+        products: list of product names, or 'all' for every product column
+        in the company's Sales Order data.
+        """
+        try:
+            if self.debug:
+                print(f"\n{'='*60}")
+                print(f"🔮 BATCH PREDICTION FOR COMPANY: {company_id}")
+                print(f"{'='*60}")
             
-            if forecast_series:
-                total_forecast = sum(forecast_series)
-                result['prediction'] = [round(v, 2) for v in forecast_series]
-                result['average_daily'] = round(total_forecast / forecast_days, 2)
-                result['total_30_days'] = round(total_forecast, 2)
-                result['prediction_series'] = result['prediction']
-                result['rawPredicted'] = round(max(forecast_series), 2)
-            else:
-                result['prediction'] = [round(final_prediction, 2)]
-                result['average_daily'] = round(final_prediction, 2)
-                result['total_30_days'] = round(final_prediction * min(forecast_days, 30), 2)
-                result['rawPredicted'] = round(final_prediction, 2)
+            context = self._run_company_model(company_id)
+            node_list = context['node_list']
+            forecast_days = self._normalize_forecast_days(forecast_days)
+            
+            if products == 'all' or products is None:
+                sales_columns = {str(col) for col in context['sales_df'].columns}
+                products = [node for node in node_list if node in sales_columns] or list(node_list)
+            
+            results = []
+            matched = []  # (position in results, product_idx, requested_product, match_type, prediction, recent_stats)
+            for product in products:
+                requested_product = str(product)
+                product_idx, match_type = self._match_product(context['lookup'], requested_product)
+                if product_idx is None:
+                    results.append({
+                        'requested_product': requested_product,
+                        'matched_node': None,
+                        'match_type': None,
+                        'error': f"Product '{requested_product}' not found in model"
+                    })
+                    continue
+                final_prediction, recent_stats = self._calibrated_prediction(context, product_idx, requested_product)
+                matched.append((len(results), product_idx, requested_product, match_type, final_prediction, recent_stats))
+                results.append(None)
+            
+            # One (products x days) forecast matrix for every matched product
+            series_rows = [None] * len(matched)
+            if matched and forecast_days > 1:
+                series_rows = self._generate_forecast_matrix(
+                    [m[4] for m in matched],
+                    [m[5].get('mean', m[4]) or m[4] for m in matched],
+                    [m[5].get('max', m[4]) for m in matched],
+                    [self.TREND_CODES.get(m[5].get('trend', 'stable') or 'stable', 0) for m in matched],
+                    forecast_days
+                )
+            
+            for (position, product_idx, requested_product, match_type, final_prediction, _), series in zip(matched, series_rows):
+                results[position] = self._format_product_result(
+                    context, product_idx, requested_product, forecast_days, match_type, final_prediction, series
+                )
             
             if self.debug:
-                print(f"\n✅ FINAL PREDICTION: {final_prediction:.2f}")
-                print(f"   Confidence: {confidence}%")
+                print(f"\n✅ Predicted {sum(1 for r in results if r.get('matched_node'))}/{len(results)} products")
                 print(f"{'='*60}\n")
             
-            return result
+            return {
+                'company_id': company_id,
+                'model_type': 'GAT-LSTM Hybrid',
+                'confidence': context['confidence'],
+                'input_shape': context['input_shape'],
+                'prediction_stats': context['prediction_stats'],
+                'forecast_days': forecast_days,
+                'predictions': results,
+                'timestamp': pd.Timestamp.now().isoformat()
+            }
             
         except Exception as e:
-            print(f"\n✗ Error generating prediction: {e}")
+            print(f"\n✗ Error generating batch prediction: {e}")
             import traceback
             traceback.print_exc()
-            raise
\ No newline at end of file
+            raise
@@ -0,0 +1,70 @@
+from bisect import bisect_right
+
+
+class ProductLookup:
+    """
+    Case-insensitive product -> node index lookup, built once per loaded model.
+
+    Resolution order:
+    1. exact match of the stripped, upper-cased name (hash map)
+    2. fuzzy: the first node (lowest index) whose name contains the request,
+       or whose name is contained in the request
+    """
+
+    SEPARATOR = '\x00'
+
+    def __init__(self, node_list):
+        self.names = [str(node).strip().upper() for node in node_list]
+
+        # First occurrence wins, matching a front-to-back scan of node_list
+        self._first_index = {}
+        for i, name in enumerate(self.names):
+            self._first_index.setdefault(name, i)
+
+        # All names in one string: a single C-level find() locates the first node containing a request
+        self._joined = self.SEPARATOR.join(self.names)
+        self._starts = []
+        offset = 0
+        for name in self.names:
+            self._starts.append(offset)
+            offset += len(name) + len(self.SEPARATOR)
+
+        # Only substrings of these lengths can be node names
+        self._name_lengths = sorted(set(len(name) for name in self.names))
+
+    def __len__(self):
+        return len(self.names)
+
+    def _first_containing(self, requested):
+        """Lowest index whose name contains requested, or None"""
+        pos = self._joined.find(requested)
+        if pos < 0:
+            return None
+        return bisect_right(self._starts, pos) - 1
+
+    def _first_contained(self, requested):
+        """Lowest index whose name is a substring of requested, or None"""
+        best = None
+        for length in self._name_lengths:
+            if length > len(requested):
+                break
+            for start in range(len(requested) - length + 1):
+                idx = self._first_index.get(requested[start:start + length])
+                if idx is not None and (best is None or idx < best):
+                    best = idx
+        return best
+
+    def match(self, requested_product):
+        """Return (index, match_type) with match_type 'exact' or 'fuzzy', or (None, None)"""
+        if not requested_product or not self.names:
+            return None, None
+        requested = str(requested_product).strip().upper().replace(self.SEPARATOR, '')
+
+        idx = self._first_index.get(requested)
+        if idx is not None:
+            return idx, 'exact'
+
+        candidates = [i for i in (self._first_containing(requested), self._first_contained(requested)) if i is not None]
+        if candidates:
+            return min(candidates), 'fuzzy'
+        return None, None
@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+import torch
+
+from prediction.predictor import DemandPredictor
+from training.trainer import HybridGATLSTM
+from utils import tensor_format
+from utils.scalers import NodeScalers
+
+NODES = ['PL1', 'Widget A', 'Widget B', 'Gadget', 'GADGET-XL', 'Gizmo', 'Spare Part']
+ARCHITECTURE = {'max_timesteps': 5, 'gat_hidden': 2, 'gat_heads': 2, 'lstm_hidden': 4, 'dropout': 0.0}
+
+
+def write_company_data(directory, seed=0, steps=12):
+    """Sales Order, Edges (Plant) and nodes CSVs for NODES; returns their paths in _company_data_paths order"""
+    rng = np.random.default_rng(seed)
+    sales = pd.DataFrame({
+        'Date': pd.date_range('2025-01-01', periods=steps, freq='D').strftime('%Y-%m-%d'),
+        **{node: rng.integers(0, 80, size=steps).astype(float) for node in NODES[1:]}
+    })
+    sales.loc[3, 'Gizmo'] = np.nan
+    edges = pd.DataFrame({'Plant': ['PL1'] * 3, 'node1': ['Widget A', 'Gadget', 'Gizmo'],
+                          'node2': ['Widget B', 'GADGET-XL', 'Widget A']})
+    nodes = pd.DataFrame({'Node': NODES, 'Plant': ['PL1'] * len(NODES)})
+
+    paths = (str(directory / 'Sales Order.csv'), str(directory / 'Edges (Plant).csv'), str(directory / 'nodes.csv'))
+    for frame, path in zip((sales, edges, nodes), paths):
+        frame.to_csv(path, index=False)
+    return paths
+
+
+def put_company_model(store, company_id, seed=0):
+    """Save a small randomly initialized company model for NODES; returns its version"""
+    torch.manual_seed(seed)
+    model = HybridGATLSTM(in_channels=1, **ARCHITECTURE)
+    scalers = NodeScalers.fit(np.random.default_rng(seed).normal(30, 10, size=(len(NODES), ARCHITECTURE['max_timesteps'])))
+    doc = {
+        'company_id': company_id,
+        'model_type': 'GAT-LSTM Hybrid',
+        'architecture': dict(ARCHITECTURE),
+        'node_list': list(NODES),
+        'scaler_params': scalers.to_doc(),
+        'created_at': pd.Timestamp('2026-01-01').to_pydatetime()
+    }
+    return store.put('company', company_id, doc, tensor_format.dumps(model.state_dict()))
+
+
+@pytest.fixture
+def predictor(tmp_path, monkeypatch):
+    """DemandPredictor on a local model store, reading company data from tmp_path/uploads/<company_id>"""
+    monkeypatch.setenv('MODEL_STORE', 'local')
+    monkeypatch.setenv('MODEL_STORE_DIR', str(tmp_path / 'model_store'))
+    monkeypatch.setenv('ARTIFACT_CACHE_DIR', str(tmp_path / 'artifact_cache'))
+    predictor = DemandPredictor()
+
+    def company_data_paths(company_id):
+        directory = tmp_path / 'uploads' / company_id
+        return (str(directory / 'Sales Order.csv'), str(directory / 'Edges (Plant).csv'), str(directory / 'nodes.csv'))
+
+    monkeypatch.setattr(predictor, '_company_data_paths', company_data_paths)
+    return predictor
+
+
+@pytest.fixture
+def company(predictor, tmp_path):
+    """Company id with a saved model and uploaded data"""
+    directory = tmp_path / 'uploads' / 'acme'
+    directory.mkdir(parents=True)
+    write_company_data(directory)
+    put_company_model(predictor.store, 'acme')
+    return 'acme'
@@ -0,0 +1,89 @@
+import os
+import hashlib
+
+from utils.artifact_cache import ArtifactCache, load_model_blob
+
+
+def _sha(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def test_put_and_open_round_trip(tmp_path):
+    cache = ArtifactCache(root=str(tmp_path), max_bytes=10 ** 6)
+    sha = cache.put(b'weights')
+
+    assert sha == _sha(b'weights')
+    assert bytes(cache.open(sha)) == b'weights'
+    assert cache.open(_sha(b'other')) is None
+
+
+def test_blob_evicted_between_lookup_and_open_is_a_miss(tmp_path):
+    cache = ArtifactCache(root=str(tmp_path), max_bytes=10 ** 6)
+    sha = cache.put(b'weights')
+    lookup = cache.path
+
+    def evicted_after_lookup(sha256):
+        path = lookup(sha256)
+        os.remove(path)  # another process evicts it here
+        return path
+
+    cache.path = evicted_after_lookup
+    assert cache.open(sha) is None
+    assert cache.stats()['misses'] == 1 and cache.stats()['hits'] == 0
+
+
+def test_load_model_blob_refetches_a_blob_evicted_right_after_put(tmp_path):
+    cache = ArtifactCache(root=str(tmp_path), max_bytes=10 ** 6)
+    store_put = cache.put
+
+    def put_then_evicted(chunks, expected_sha256=None):
+        sha = store_put(chunks, expected_sha256)
+        os.remove(cache._blob_path(sha))
+        return sha
+
+    cache.put = put_then_evicted
+    fetches = []
+
+    def fetch():
+        fetches.append(1)
+        return iter([b'wei', b'ghts'])  # a stream, consumed by the first put
+
+    blob, sha = load_model_blob(cache, _sha(b'weights'), None, fetch)
+    assert bytes(blob) == b'weights'
+    assert sha is None
+    assert len(fetches) == 2
+
+
+def test_hits_keep_one_verified_marker_per_blob(tmp_path):
+    cache = ArtifactCache(root=str(tmp_path), max_bytes=10 ** 6)
+    sha = cache.put(b'weights')
+    for _ in range(50):
+        assert cache.path(sha) is not None
+
+    assert len(cache._verified) == 1
+    cache.discard(sha)
+    assert not cache._verified
+
+
+def test_corrupt_blob_is_dropped(tmp_path):
+    cache = ArtifactCache(root=str(tmp_path), max_bytes=10 ** 6)
+    sha = cache.put(b'weights')
+    with open(cache._blob_path(sha), 'wb') as f:
+        f.write(b'tampered')
+    os.utime(cache._blob_path(sha), ns=(1, 1))
+
+    assert cache.open(sha) is None
+    assert cache.stats()['corrupt'] == 1
+    assert not os.path.exists(cache._blob_path(sha))
+
+
+def test_evicts_least_recently_used_blobs_over_budget(tmp_path):
+    cache = ArtifactCache(root=str(tmp_path), max_bytes=20)
+    first = cache.put(b'a' * 10)
+    os.utime(cache._blob_path(first), ns=(1, 1))
+    second = cache.put(b'b' * 10)
+    third = cache.put(b'c' * 10)
+
+    assert cache.open(first) is None
+    assert cache.open(second) is not None and cache.open(third) is not None
+    assert cache.stats()['evictions'] == 1
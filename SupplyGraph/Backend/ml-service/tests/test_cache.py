@@ -0,0 +1,201 @@
+import time
+import threading
+
+import pytest
+
+from utils import cache
+from utils.cache import LRUCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(cache, 'time', fake)
+    return fake
+
+
+def test_evicts_least_recently_used_over_byte_budget():
+    lru = LRUCache(max_bytes=100)
+    lru.put('a', 'A', nbytes=40)
+    lru.put('b', 'B', nbytes=40)
+    assert lru.get('a') == 'A'  # b is now the least recently used
+    lru.put('c', 'C', nbytes=40)
+
+    assert 'b' not in lru
+    assert lru.get('a') == 'A' and lru.get('c') == 'C'
+    assert lru.stats()['current_bytes'] == 80
+    assert lru.evictions == 1
+
+
+def test_never_stores_an_entry_larger_than_the_budget():
+    lru = LRUCache(max_bytes=100)
+    lru.put('a', 'A', nbytes=40)
+
+    assert lru.put('huge', 'H', nbytes=101) is False
+    assert 'huge' not in lru
+    assert lru.get('a') == 'A'
+
+
+def test_replacing_a_key_releases_its_bytes():
+    lru = LRUCache(max_bytes=100)
+    lru.put('a', 'A1', nbytes=60)
+    lru.put('a', 'A2', nbytes=30)
+
+    assert lru.get('a') == 'A2'
+    assert lru.stats()['current_bytes'] == 30
+
+
+def test_max_entries_bounds_the_entry_count():
+    lru = LRUCache(max_bytes=10 ** 6, max_entries=2)
+    for key in 'abc':
+        lru.put(key, key.upper(), nbytes=1)
+
+    assert len(lru) == 2
+    assert 'a' not in lru
+    assert lru.evictions == 1
+
+
+def test_entries_expire_after_ttl(clock):
+    lru = LRUCache(max_bytes=100, ttl_seconds=10)
+    lru.put('a', 'A', nbytes=1)
+
+    clock.now += 10
+    assert lru.get('a') == 'A'
+    clock.now += 0.5
+    assert lru.get('a') is None
+    assert 'a' not in lru
+    assert lru.expirations == 1
+    assert lru.stats()['current_bytes'] == 0
+
+
+def test_ttl_zero_or_none_never_expires(clock):
+    for ttl in (None, 0):
+        lru = LRUCache(max_bytes=100, ttl_seconds=ttl)
+        lru.put('a', 'A', nbytes=1)
+        clock.now += 10 ** 6
+        assert lru.get('a') == 'A'
+
+
+def test_get_or_compute_stores_the_computed_value():
+    lru = LRUCache(max_bytes=10 ** 6)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return 'value'
+
+    assert lru.get_or_compute('k', compute) == 'value'
+    assert lru.get_or_compute('k', compute) == 'value'
+    assert len(calls) == 1
+
+
+def _start_waiters(lru, key, compute, count):
+    results, errors = [], []
+
+    def call():
+        try:
+            results.append(lru.get_or_compute(key, compute))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+
+def _wait_for_misses(lru, count):
+    # Every caller has missed; give the last ones a moment to join the in-flight compute
+    deadline = time.monotonic() + 5
+    while lru.misses < count and time.monotonic() < deadline:
+        time.sleep(0.005)
+    time.sleep(0.05)
+
+
+def test_concurrent_misses_share_one_compute():
+    lru = LRUCache(max_bytes=10 ** 6)
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 'value'
+
+    threads, results, errors = _start_waiters(lru, 'k', compute, 8)
+    started.wait(5)
+    _wait_for_misses(lru, 8)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert results == ['value'] * 8 and not errors
+    assert lru.coalesced == 7
+
+
+def test_compute_error_reaches_every_waiter_and_is_not_cached():
+    lru = LRUCache(max_bytes=10 ** 6)
+    started, release = threading.Event(), threading.Event()
+
+    def compute():
+        started.set()
+        release.wait(5)
+        raise ValueError('load failed')
+
+    threads, results, errors = _start_waiters(lru, 'k', compute, 5)
+    started.wait(5)
+    _wait_for_misses(lru, 5)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert not results
+    assert len(errors) == 5 and all(isinstance(e, ValueError) for e in errors)
+    assert 'k' not in lru
+    assert lru.get_or_compute('k', lambda: 'retried') == 'retried'
+
+
+def test_invalidate_by_key_predicate_and_all():
+    lru = LRUCache(max_bytes=10 ** 6)
+    for key in [('c1', 1), ('c1', 2), ('c2', 1)]:
+        lru.put(key, key[1], nbytes=1)
+
+    assert lru.invalidate(key=('c1', 1)) == 1
+    assert lru.invalidate(predicate=lambda key, value: key[0] == 'c1') == 1
+    assert ('c2', 1) in lru
+    assert lru.invalidate() == 1
+    assert len(lru) == 0
+    assert lru.invalidations == 3
+
+
+def test_invalidated_compute_in_flight_is_not_stored():
+    lru = LRUCache(max_bytes=10 ** 6)
+    started, release = threading.Event(), threading.Event()
+
+    def stale_load():
+        started.set()
+        release.wait(5)
+        return 'version 1'
+
+    threads, results, _ = _start_waiters(lru, 'k', stale_load, 1)
+    started.wait(5)
+    # A new version was saved while version 1 was loading
+    lru.invalidate(predicate=lambda key, value: key == 'k' and (value is None or value != 'version 2'))
+    # Misses after the invalidation don't join the stale load
+    assert lru.get_or_compute('k', lambda: 'version 2') == 'version 2'
+    release.set()
+    threads[0].join(5)
+
+    assert results == ['version 1']
+    assert lru.get('k') == 'version 2'
+    assert lru.stale_discards == 1
@@ -0,0 +1,68 @@
+import pytest
+import torch
+from torch_geometric.data import Data
+
+from training.trainer import ModelTrainer, HybridGATLSTM
+
+
+@pytest.fixture
+def trainer(tmp_path, monkeypatch):
+    monkeypatch.setenv('MODEL_STORE', 'local')
+    monkeypatch.setenv('MODEL_STORE_DIR', str(tmp_path / 'model_store'))
+    monkeypatch.setenv('ARTIFACT_CACHE_DIR', str(tmp_path / 'artifact_cache'))
+    for name in ('TRAINING_VAL_FRACTION', 'TRAINING_SPLIT_SEED', 'TRAINING_EVAL_EVERY', 'TRAINING_MIN_DELTA',
+                 'TRAINING_TEMPORAL', 'TRAINING_EXECUTION_MODE'):
+        monkeypatch.delenv(name, raising=False)
+    return ModelTrainer()
+
+
+def test_validation_split_is_deterministic_and_disjoint(trainer, monkeypatch):
+    store_ids = torch.arange(3, 53)
+    train_ids, val_ids = trainer._validation_split(store_ids)
+    again = trainer._validation_split(store_ids)
+
+    assert torch.equal(train_ids, again[0]) and torch.equal(val_ids, again[1])
+    assert len(val_ids) == 10 and len(train_ids) == 40
+    assert not set(train_ids.tolist()) & set(val_ids.tolist())
+    assert sorted(train_ids.tolist() + val_ids.tolist()) == store_ids.tolist()
+
+    monkeypatch.setenv('TRAINING_SPLIT_SEED', '7')
+    assert not torch.equal(trainer._validation_split(store_ids)[1], val_ids)
+
+
+def test_no_validation_split_for_few_store_nodes_or_zero_fraction(trainer, monkeypatch):
+    train_ids, val_ids = trainer._validation_split(torch.arange(4))
+    assert val_ids is None and torch.equal(train_ids, torch.arange(4))
+
+    monkeypatch.setenv('TRAINING_VAL_FRACTION', '0')
+    assert trainer._validation_split(torch.arange(50))[1] is None
+
+
+def test_best_weights_are_restored_when_patience_runs_out(trainer, monkeypatch):
+    monkeypatch.setenv('TRAINING_PATIENCE', '2')
+    torch.manual_seed(0)
+    model = HybridGATLSTM(in_channels=1, max_timesteps=4, gat_hidden=2, gat_heads=2, lstm_hidden=4, dropout=0.0)
+    num_nodes = 12
+    data = Data(x=torch.rand(num_nodes, 4, 1), edge_index=torch.stack([torch.arange(num_nodes)] * 2),
+                y=torch.rand(num_nodes, 1) * 10)
+    data.y_store_ids = torch.arange(num_nodes)
+
+    # Validation improves until epoch 2, then stalls
+    scripted_losses = iter([5.0, 3.0, 4.0, 3.5, 1.0, 1.0])
+    states = []
+
+    def validation_loss(model, data, val_ids, sampler, criterion):
+        states.append({k: v.detach().clone() for k, v in model.state_dict().items()})
+        return next(scripted_losses)
+
+    monkeypatch.setattr(trainer, '_validation_loss', validation_loss)
+    losses = trainer._fine_tune_model(model, data, epochs=20, mode='full')
+
+    summary = trainer._run_state.training_summary
+    assert len(losses) == 4 and summary['epochs_run'] == 4
+    assert summary['best_epoch'] == 2 and summary['best_val_loss'] == 3.0
+    assert summary['stopped_early'] and summary['val_loss_history'] == [5.0, 3.0, 4.0, 3.5]
+    assert summary['validation_nodes'] == 2
+    for name, tensor in model.state_dict().items():
+        assert torch.equal(tensor, states[1][name]), name
+    assert any(not torch.equal(states[3][name], states[1][name]) for name in states[1])
@@ -0,0 +1,65 @@
+import pytest
+import torch
+
+from training.trainer import HybridGATLSTM
+from utils import execution
+from utils.execution import configure_execution
+from utils.graph_builder import self_loop_edge_index
+
+
+@pytest.fixture
+def model():
+    torch.manual_seed(0)
+    return HybridGATLSTM(in_channels=1, max_timesteps=4, gat_hidden=2, gat_heads=2, lstm_hidden=4, dropout=0.0).eval()
+
+
+def _is_eager(model):
+    return model.autocast_dtype is None and all(
+        module._compiled_call_impl is None for module in (model.lstm, model.lin)
+    )
+
+
+def _failing_probe(model, train):
+    raise RuntimeError("backend exploded")
+
+
+@pytest.mark.parametrize('mode', ['turbo', 'fp8', 'COMPILE_FAST'])
+def test_unknown_mode_falls_back_to_eager(model, mode):
+    assert configure_execution(model, mode) == 'eager'
+    assert _is_eager(model)
+
+
+@pytest.mark.parametrize('mode', ['compile', 'bf16', 'compile_bf16'])
+@pytest.mark.parametrize('train', [False, True])
+def test_failed_probe_falls_back_to_eager(model, monkeypatch, mode, train):
+    monkeypatch.setattr(execution, 'native_bf16_supported', lambda: True)
+    monkeypatch.setattr(execution, '_probe', _failing_probe)
+    x, edge_index = torch.rand(6, 4, 1), self_loop_edge_index(6)
+    with torch.no_grad():
+        expected = model(x, edge_index)
+
+    assert configure_execution(model, mode, train=train) == 'eager'
+    assert _is_eager(model) and not model.training
+    with torch.no_grad():
+        assert torch.equal(model(x, edge_index), expected)
+
+
+def test_bf16_without_native_support_is_skipped(model, monkeypatch):
+    monkeypatch.setattr(execution, 'native_bf16_supported', lambda: False)
+    probes = []
+    monkeypatch.setattr(execution, '_probe', lambda model, train: probes.append(train))
+
+    assert configure_execution(model, 'bf16') == 'eager' and not probes
+    assert configure_execution(model, 'compile_bf16') == 'compile' and model.autocast_dtype is None
+    configure_execution(model, 'eager')
+    assert _is_eager(model)
+
+
+def test_probed_mode_is_kept_until_switched_back(model, monkeypatch):
+    monkeypatch.setattr(execution, 'native_bf16_supported', lambda: True)
+    monkeypatch.setattr(execution, '_probe', lambda model, train: None)
+
+    assert configure_execution(model, 'bf16') == 'bf16'
+    assert model.autocast_dtype is torch.bfloat16
+    assert configure_execution(model, None) == 'eager'
+    assert _is_eager(model)
@@ -0,0 +1,84 @@
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+import torch
+
+from utils.graph_builder import build_edge_index
+
+
+def _legacy_edge_index(edges_df, node_list):
+    """The iterrows edge builder the predictor used before build_edge_index"""
+    node_to_idx = {str(node).strip().upper(): i for i, node in enumerate(node_list)}
+    edge_pairs = []
+    for _, row in edges_df.iterrows():
+        plant = str(row.get('Plant', '')).strip().upper()
+        n1 = str(row.get('node1', '')).strip().upper()
+        n2 = str(row.get('node2', '')).strip().upper()
+        pairs_to_add = []
+        if plant and n1:
+            pairs_to_add.append((plant, n1))
+        if plant and n2:
+            pairs_to_add.append((plant, n2))
+        if n1 and n2:
+            pairs_to_add.append((n1, n2))
+        for src, dst in pairs_to_add:
+            if src in node_to_idx and dst in node_to_idx:
+                edge_pairs.append((node_to_idx[src], node_to_idx[dst]))
+    connected = {s for s, _ in edge_pairs} | {t for _, t in edge_pairs}
+    for idx in sorted(set(range(len(node_list))) - connected):
+        edge_pairs.append((idx, idx))
+    return torch.tensor(edge_pairs, dtype=torch.long).t().contiguous()
+
+
+def _random_graph(seed):
+    rng = random.Random(seed)
+    names = [f'N{i}' for i in range(rng.randint(2, 30))] + ['PL1', 'PL2']
+    node_list = [rng.choice([name, name.lower(), f' {name} ']) for name in names]
+    unknown = ['PL9', 'GHOST', '']
+    rows = rng.randint(1, 40)
+    edges = pd.DataFrame({
+        'Plant': [rng.choice(['PL1', 'pl2 ', *unknown]) for _ in range(rows)],
+        'node1': [rng.choice(names + unknown).lower() for _ in range(rows)],
+        'node2': [rng.choice(names + unknown) for _ in range(rows)],
+    })
+    return edges, node_list
+
+
+@pytest.mark.parametrize('seed', range(25))
+def test_matches_the_row_loop(seed):
+    edges, node_list = _random_graph(seed)
+    assert torch.equal(build_edge_index(edges, node_list), _legacy_edge_index(edges, node_list))
+
+
+def test_plant_edges_precede_the_node_pair_of_each_row():
+    edges = pd.DataFrame({'Plant': ['PL1', 'PL1'], 'node1': ['A', 'B'], 'node2': ['B', 'C']})
+
+    edge_index = build_edge_index(edges, ['PL1', 'A', 'B', 'C'])
+
+    assert edge_index.t().tolist() == [[0, 1], [0, 2], [1, 2], [0, 2], [0, 3], [2, 3]]
+
+
+def test_matching_ignores_case_and_padding():
+    edges = pd.DataFrame({'Plant': [' pl1'], 'node1': ['widget '], 'node2': ['GADGET']})
+
+    edge_index = build_edge_index(edges, ['PL1', 'Widget', 'gadget'])
+
+    assert edge_index.t().tolist() == [[0, 1], [0, 2], [1, 2]]
+
+
+def test_isolated_and_unmatched_nodes_get_self_loops():
+    edges = pd.DataFrame({'Plant': [np.nan, 'PL9'], 'node1': ['A', 'A'], 'node2': ['B', np.nan]})
+
+    edge_index = build_edge_index(edges, ['A', 'B', 'C', 'NAN'])
+
+    # Missing values are skipped rather than matched as the string 'nan'
+    assert edge_index.t().tolist() == [[0, 1], [2, 2], [3, 3]]
+
+
+def test_graphs_without_edges_are_all_self_loops():
+    for edges in (None, pd.DataFrame(columns=['Plant', 'node1', 'node2']),
+                  pd.DataFrame({'node1': ['X'], 'node2': ['Y']})):
+        assert build_edge_index(edges, ['A', 'B', 'C']).t().tolist() == [[0, 0], [1, 1], [2, 2]]
+    assert build_edge_index(None, []).shape == (2, 0)
@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from training.trainer import ModelTrainer
+
+
+@pytest.fixture
+def trainer(tmp_path, monkeypatch):
+    monkeypatch.setenv('MODEL_STORE', 'local')
+    monkeypatch.setenv('MODEL_STORE_DIR', str(tmp_path / 'model_store'))
+    monkeypatch.setenv('ARTIFACT_CACHE_DIR', str(tmp_path / 'artifact_cache'))
+    monkeypatch.delenv('TRAINING_TEMPORAL', raising=False)
+    return ModelTrainer()
+
+
+def _sales(steps=30, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'Date': pd.date_range('2025-01-01', periods=steps, freq='D').strftime('%Y-%m-%d'),
+        'A': rng.integers(0, 40, size=steps).astype(float),
+        'B': rng.integers(0, 40, size=steps).astype(float),
+    })
+
+
+def _write(directory, sales, nodes=('PL1', 'A', 'B', 'C'), edges=(('A', 'B'), ('B', 'C'))):
+    directory.mkdir(exist_ok=True)
+    pd.DataFrame({'Node': list(nodes), 'Plant': ['PL1'] * len(nodes)}).to_csv(directory / 'nodes.csv', index=False)
+    pd.DataFrame({'Plant': ['PL1'] * len(edges), 'node1': [a for a, _ in edges], 'node2': [b for _, b in edges]}).to_csv(
+        directory / 'edges.csv', index=False)
+    sales.to_csv(directory / 'sales.csv', index=False)
+    return [str(directory / name) for name in ('nodes.csv', 'edges.csv', 'sales.csv')]
+
+
+def _previous_model_doc(trainer, paths):
+    """Document of a model trained on paths, as save_company_model_to_atlas writes it"""
+    trainer._run_state.previous_model_doc = None
+    trainer._prepare_training_data(*paths)
+    return {
+        'model_version': 3,
+        'node_list': list(trainer._run_state.node_to_idx),
+        'scaler_params': trainer._run_state.scalers.to_doc(),
+        'training_fingerprint': trainer._run_state.data_fingerprint
+    }
+
+
+def _delta(trainer, previous_doc, paths):
+    trainer._run_state.previous_model_doc = previous_doc
+    trainer._prepare_training_data(*paths)
+    return trainer._run_state.data_delta
+
+
+def test_appended_rows_are_a_delta_on_the_previous_data(trainer, tmp_path):
+    sales = _sales()
+    previous_doc = _previous_model_doc(trainer, _write(tmp_path / 'v1', sales.iloc[:24]))
+
+    delta = _delta(trainer, previous_doc, _write(tmp_path / 'v2', sales))
+
+    assert delta == {'from_version': 3, 'new_rows': 6, 'new_columns': 0, 'new_nodes': 0, 'graph_changed': False}
+
+
+def test_appended_rows_in_shuffled_file_order_are_still_a_delta(trainer, tmp_path):
+    sales = _sales()
+    previous_doc = _previous_model_doc(trainer, _write(tmp_path / 'v1', sales.iloc[:24]))
+
+    delta = _delta(trainer, previous_doc, _write(tmp_path / 'v2', sales.sample(frac=1, random_state=0)))
+
+    assert delta['new_rows'] == 6
+
+
+def test_new_column_and_node_are_counted(trainer, tmp_path):
+    sales = _sales()
+    edges = (('A', 'B'),)
+    previous_doc = _previous_model_doc(trainer, _write(tmp_path / 'v1', sales.iloc[:24], nodes=('PL1', 'A', 'B'), edges=edges))
+
+    grown = sales.assign(C=np.arange(len(sales), dtype=float))
+    delta = _delta(trainer, previous_doc, _write(tmp_path / 'v2', grown, edges=edges))
+
+    assert (delta['new_rows'], delta['new_columns'], delta['new_nodes']) == (6, 1, 1)
+    assert delta['graph_changed']
+
+
+@pytest.mark.parametrize('edit', ['value', 'date', 'dropped_row', 'dropped_column'])
+def test_edited_history_is_not_a_delta(trainer, tmp_path, edit):
+    sales = _sales()
+    previous_doc = _previous_model_doc(trainer, _write(tmp_path / 'v1', sales.iloc[:24]))
+
+    changed = sales.copy()
+    if edit == 'value':
+        changed.loc[10, 'A'] += 1
+    elif edit == 'date':
+        changed.loc[0, 'Date'] = '2024-12-31'
+    elif edit == 'dropped_row':
+        changed = changed.drop(index=5)
+    else:
+        changed = changed.drop(columns='B')
+
+    assert _delta(trainer, previous_doc, _write(tmp_path / 'v2', changed)) is None
+
+
+def test_fewer_rows_than_before_is_not_a_delta(trainer, tmp_path):
+    sales = _sales()
+    previous_doc = _previous_model_doc(trainer, _write(tmp_path / 'v1', sales))
+
+    assert _delta(trainer, previous_doc, _write(tmp_path / 'v2', sales.iloc[:20])) is None
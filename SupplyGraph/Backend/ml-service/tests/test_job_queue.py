@@ -0,0 +1,90 @@
+import threading
+import time
+
+from training.job_queue import TrainingJobQueue
+
+
+class GatedRunner:
+    """run_job that records the order jobs start in and holds each one until released"""
+
+    def __init__(self, fail=()):
+        self.started = []
+        self.fail = set(fail)
+        self.release = threading.Event()
+
+    def __call__(self, job):
+        self.started.append(job.company_id)
+        self.release.wait(10)
+        if job.company_id in self.fail:
+            raise RuntimeError(f"training {job.company_id} failed")
+        return {'company_id': job.company_id}
+
+
+def _wait_until(condition, timeout=10):
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() > deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.01)
+
+
+def test_jobs_run_in_submission_order():
+    runner = GatedRunner()
+    queue = TrainingJobQueue(runner, workers=1)
+    jobs = [queue.submit(company)[0] for company in ('a', 'b', 'c')]
+
+    _wait_until(lambda: runner.started == ['a'])
+    assert [queue.position(job.id) for job in jobs] == [0, 1, 2]
+    runner.release.set()
+    _wait_until(lambda: all(job.finished for job in jobs))
+
+    assert runner.started == ['a', 'b', 'c']
+    assert [job.status for job in jobs] == ['completed'] * 3
+    assert jobs[1].result == {'company_id': 'b'}
+
+
+def test_company_has_one_pending_job():
+    runner = GatedRunner()
+    queue = TrainingJobQueue(runner, workers=1)
+    first, created = queue.submit('a', force_retrain=False)
+    again, created_again = queue.submit('a', force_retrain=True)
+
+    assert created and not created_again
+    assert again is first and first.payload == {'force_retrain': False}
+    assert queue.latest_for_company('a') is first
+
+    runner.release.set()
+    _wait_until(lambda: first.finished)
+    # Once finished, the company can queue a new job
+    second, created = queue.submit('a')
+    assert created and second is not first
+    _wait_until(lambda: second.finished)
+    assert runner.started == ['a', 'a']
+
+
+def test_failed_job_records_its_error():
+    runner = GatedRunner(fail={'a'})
+    runner.release.set()
+    queue = TrainingJobQueue(runner, workers=1)
+    job, _ = queue.submit('a')
+
+    _wait_until(lambda: job.finished)
+    assert job.status == 'failed' and 'training a failed' in job.error
+    assert queue.stats()['failed'] == 1
+
+
+def test_history_keeps_the_most_recent_finished_jobs():
+    runner = GatedRunner()
+    runner.release.set()
+    queue = TrainingJobQueue(runner, workers=1, max_history=2)
+    jobs = []
+    for company in ('a', 'b', 'c', 'd'):
+        job, _ = queue.submit(company)
+        _wait_until(lambda: job.finished)
+        jobs.append(job)
+
+    # Pruning runs on submit: the three finished before 'd' was queued are cut down to two
+    assert queue.get(jobs[0].id) is None
+    assert [queue.get(job.id) is not None for job in jobs[1:]] == [True, True, True]
+    assert queue.latest_for_company('a') is None
+    assert queue.position(jobs[0].id) is None
@@ -0,0 +1,171 @@
+import datetime
+import threading
+
+import pytest
+import torch
+from bson import ObjectId, Decimal128
+
+from utils import tensor_format
+from utils.model_store import LocalModelStore, MongoModelStore, copy_model
+
+mongomock = pytest.importorskip('mongomock')
+import mongomock.gridfs  # noqa: E402
+
+mongomock.gridfs.enable_gridfs_integration()
+
+
+def _state(seed=0, size=(4, 3)):
+    generator = torch.Generator().manual_seed(seed)
+    return {'lin.weight': torch.randn(size, generator=generator), 'lin.bias': torch.zeros(size[0])}
+
+
+def _doc(**extra):
+    return dict({'model_type': 'GAT-LSTM Hybrid', 'node_list': ['a', 'b'],
+                 'created_at': datetime.datetime(2026, 1, 2, 3, 4, 5)}, **extra)
+
+
+@pytest.fixture
+def mongo_db():
+    return mongomock.MongoClient().supplychain
+
+
+@pytest.fixture(params=['local', 'mongodb'])
+def store(request, tmp_path):
+    if request.param == 'local':
+        return LocalModelStore(root=str(tmp_path / 'model_store'))
+    return MongoModelStore(db=mongomock.MongoClient().supplychain)
+
+
+def _assert_state_equal(loaded, state):
+    assert set(loaded) == set(state)
+    for name, tensor in state.items():
+        assert torch.equal(loaded[name], tensor), name
+
+
+def test_put_get_and_load_latest_version(store):
+    assert store.get('company', 'c1') is None
+    assert store.version('company', 'c1') is None and not store.exists('company', 'c1')
+
+    first, second = _state(0), _state(1)
+    assert store.put('company', 'c1', _doc(), tensor_format.dumps(first)) == 1
+    assert store.put('company', 'c1', _doc(node_list=['a', 'b', 'c']), tensor_format.dumps(second)) == 2
+
+    doc = store.get('company', 'c1')
+    assert doc['model_version'] == 2 and store.version('company', 'c1') == 2
+    assert doc['node_list'] == ['a', 'b', 'c']
+    assert doc['created_at'] == datetime.datetime(2026, 1, 2, 3, 4, 5)
+    assert doc['model_storage']['format'] == 'tensors'
+    # Metadata reads leave the weights out
+    assert 'model_bytes' not in doc['model_storage'] and 'artifact_blobs' not in doc
+    _assert_state_equal(store.load_state('company', doc), second)
+    assert store.exists('company', 'c1')
+    assert [entry['key'] for entry in store.list('company')] == ['c1']
+
+
+def test_kinds_are_separate(store):
+    store.put('base', 'base_model', _doc(), tensor_format.dumps(_state(0)))
+    store.put('company', 'base_model', _doc(), tensor_format.dumps(_state(1)))
+
+    _assert_state_equal(store.load_state('base', store.get('base', 'base_model')), _state(0))
+    _assert_state_equal(store.load_state('company', store.get('company', 'base_model')), _state(1))
+
+
+def test_artifacts_belong_to_their_version(store):
+    blob = tensor_format.dumps(_state())
+    store.put('company', 'c1', _doc(), blob, artifacts={'torchscript': (b'graph-v1', {'export_version': 1})})
+    doc = store.get('company', 'c1')
+
+    assert doc['artifacts']['torchscript']['export_version'] == 1
+    assert bytes(store.load_artifact('company', doc, 'torchscript')) == b'graph-v1'
+
+    store.put('company', 'c1', _doc(), blob)
+    doc = store.get('company', 'c1')
+    assert store.load_artifact('company', doc, 'torchscript') is None
+
+
+def test_concurrent_puts_get_distinct_versions(store):
+    blob = tensor_format.dumps(_state())
+    versions, errors = [], []
+    lock = threading.Lock()
+
+    def save():
+        try:
+            version = store.put('company', 'c1', _doc(), blob)
+            with lock:
+                versions.append(version)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=save) for _ in range(12)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert sorted(versions) == list(range(1, 13))
+    assert store.version('company', 'c1') in versions
+
+
+def test_large_payloads_leave_the_document(store, monkeypatch):
+    state = _state(size=(256, 64))
+    artifact = bytes(range(256)) * 64
+    if isinstance(store, MongoModelStore):
+        monkeypatch.setattr(store, 'GRIDFS_THRESHOLD_MB', 0.01)
+    store.put('company', 'big', _doc(), tensor_format.dumps(state), artifacts={'torchscript': (artifact, {})})
+    doc = store.get('company', 'big')
+
+    expected_type = 'gridfs' if isinstance(store, MongoModelStore) else 'local'
+    assert doc['model_storage']['type'] == expected_type
+    assert doc['artifacts']['torchscript']['type'] == expected_type
+    _assert_state_equal(store.load_state('company', doc), state)
+    assert bytes(store.load_artifact('company', doc, 'torchscript')) == artifact
+
+
+def test_mongo_version_continues_from_documents_saved_before_the_counter(mongo_db):
+    mongo_db.company_models.insert_one({'company_id': 'c1', 'model_version': 7})
+    store = MongoModelStore(db=mongo_db)
+
+    assert store.put('company', 'c1', _doc(), tensor_format.dumps(_state())) == 8
+    assert store.version('company', 'c1') == 8
+
+
+def test_mongo_new_version_is_invisible_until_written(mongo_db):
+    store = MongoModelStore(db=mongo_db)
+    store.put('company', 'c1', _doc(), tensor_format.dumps(_state()))
+    store._next_version('company', 'c1')
+
+    assert store.version('company', 'c1') == 1
+    assert store.put('company', 'c1', _doc(), tensor_format.dumps(_state())) == 3
+
+
+def test_local_store_keeps_bson_types(tmp_path):
+    store = LocalModelStore(root=str(tmp_path))
+    oid = ObjectId()
+    store.put('company', 'c1', _doc(source_id=oid, price=Decimal128('1.25')), tensor_format.dumps(_state()))
+    doc = store.get('company', 'c1')
+
+    assert doc['source_id'] == oid and isinstance(doc['source_id'], ObjectId)
+    assert doc['price'] == Decimal128('1.25')
+
+
+def test_local_store_refuses_types_it_cant_round_trip(tmp_path):
+    store = LocalModelStore(root=str(tmp_path))
+
+    with pytest.raises(TypeError):
+        store.put('company', 'c1', _doc(custom=object()), tensor_format.dumps(_state()))
+    assert store.get('company', 'c1') is None
+
+
+def test_copy_model_from_mongodb_to_local(mongo_db, tmp_path):
+    source = MongoModelStore(db=mongo_db)
+    target = LocalModelStore(root=str(tmp_path))
+    state = _state()
+    source.put('company', 'c1', _doc(), tensor_format.dumps(state), artifacts={'torchscript': (b'graph', {'export_version': 1})})
+
+    assert copy_model(source, target, 'company', 'c1') == 1
+    doc = target.get('company', 'c1')
+    assert doc['node_list'] == ['a', 'b']
+    _assert_state_equal(target.load_state('company', doc), state)
+    assert bytes(target.load_artifact('company', doc, 'torchscript')) == b'graph'
+    assert copy_model(source, target, 'company', 'missing') is None
@@ -0,0 +1,76 @@
+import os
+import types
+
+import pytest
+
+from utils.mongo import MongoConnection, _PoolMetrics
+
+
+def _event(**fields):
+    return types.SimpleNamespace(**fields)
+
+
+def test_pool_metrics_record_connect_and_wait_durations():
+    metrics = _PoolMetrics()
+    metrics.connection_created(_event())
+    metrics.connection_ready(_event(duration=0.02))
+    metrics.connection_checked_out(_event(duration=0.001))
+    metrics.connection_checked_out(_event(duration=0.003))
+    metrics.connection_checked_in(_event())
+    stats = metrics.stats()
+
+    assert stats['connections_created'] == 1
+    assert stats['connections_in_use'] == 1
+    assert stats['connect'] == {'count': 1, 'mean_ms': 20.0, 'max_ms': 20.0}
+    assert stats['pool_wait'] == {'count': 2, 'mean_ms': 2.0, 'max_ms': 3.0}
+
+
+def test_pool_metrics_skip_timings_when_events_have_no_duration():
+    # pymongo before 4.7
+    metrics = _PoolMetrics()
+    metrics.connection_ready(_event())
+    metrics.connection_checked_out(_event())
+    metrics.connection_check_out_failed(_event())
+    stats = metrics.stats()
+
+    assert 'connect' not in stats and 'pool_wait' not in stats
+    assert stats['connections_in_use'] == 1
+    assert stats['checkout_failures'] == 1
+
+
+def test_client_is_created_lazily_and_without_connecting(monkeypatch):
+    monkeypatch.setenv('MONGO_URI', 'mongodb://127.0.0.1:1/')
+    monkeypatch.setenv('MONGO_TLS', '0')
+    connection = MongoConnection(server_selection_timeout_ms=100)
+
+    assert connection.configured and not connection.stats()['client_created']
+    client = connection.client()
+    assert connection.client() is client
+    assert connection.stats()['clients_created'] == 1
+    connection.close()
+
+
+def test_missing_uri_raises(monkeypatch):
+    monkeypatch.delenv('MONGO_URI', raising=False)
+    connection = MongoConnection()
+
+    assert not connection.configured
+    with pytest.raises(ValueError):
+        connection.db()
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='needs fork')
+def test_forked_child_does_not_reuse_the_parent_client(monkeypatch):
+    monkeypatch.setenv('MONGO_URI', 'mongodb://127.0.0.1:1/')
+    monkeypatch.setenv('MONGO_TLS', '0')
+    connection = MongoConnection(server_selection_timeout_ms=100)
+    parent_client = connection.client()
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        reused = connection.client() is parent_client
+        os.write(write_fd, b'1' if reused else b'0')
+        os._exit(0)
+    os.waitpid(pid, 0)
+    assert os.read(read_fd, 1) == b'0'
+    connection.close()
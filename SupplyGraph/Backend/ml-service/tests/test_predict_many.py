@@ -0,0 +1,59 @@
+import pytest
+
+from conftest import NODES
+
+
+def _comparable(result):
+    return {key: value for key, value in result.items() if key != 'timestamp'}
+
+
+def _single(predictor, company_id, product, forecast_days):
+    return predictor.predict(company_id, [{'node_type': 'store', 'company': company_id, 'product': product}],
+                             forecast_days=forecast_days)
+
+
+@pytest.mark.parametrize('forecast_days', [1, 7, 30])
+def test_predict_many_matches_predict_per_product(predictor, company, forecast_days):
+    # Exact (any case / padding), fuzzy and unknown requests
+    products = ['Widget A', ' widget b ', 'gadget', 'GADGET-XL', 'Gizmo', 'widget', 'xl', 'Spare Part 2', 'nothing-like-it']
+
+    batch = predictor.predict_many(company, products, forecast_days=forecast_days)
+
+    assert [item['requested_product'] for item in batch['predictions']] == products
+    for product, item in zip(products, batch['predictions']):
+        single = _single(predictor, company, product, forecast_days)
+        if item['matched_node'] is None:
+            # predict() falls back to the first node; predict_many reports the miss instead
+            assert single['matched_node'] is None and 'error' in item
+            continue
+        assert _comparable(item) == _comparable(single), product
+
+
+def test_fuzzy_requests_report_the_matched_node(predictor, company):
+    items = {item['requested_product']: item for item in predictor.predict_many(company, ['widget', 'xl'])['predictions']}
+
+    assert (items['widget']['matched_node'], items['widget']['match_type']) == ('Widget A', 'fuzzy')
+    assert (items['xl']['matched_node'], items['xl']['match_type']) == ('GADGET-XL', 'fuzzy')
+
+
+def test_predict_many_all_covers_every_sales_product(predictor, company):
+    batch = predictor.predict_many(company, 'all', forecast_days=7)
+
+    # Nodes with a sales column, in node order; the plant has none
+    assert [item['matched_node'] for item in batch['predictions']] == NODES[1:]
+    for item in batch['predictions']:
+        assert _comparable(item) == _comparable(_single(predictor, company, item['requested_product'], 7))
+
+
+def test_predict_many_runs_the_model_once(predictor, company, monkeypatch):
+    runs = []
+    run_company_model = predictor._run_company_model
+
+    def counting(company_id):
+        runs.append(company_id)
+        return run_company_model(company_id)
+
+    monkeypatch.setattr(predictor, '_run_company_model', counting)
+    predictor.predict_many(company, 'all', forecast_days=30)
+
+    assert runs == [company]
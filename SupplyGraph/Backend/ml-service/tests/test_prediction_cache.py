@@ -0,0 +1,87 @@
+import os
+
+import pandas as pd
+
+from conftest import put_company_model
+
+
+def _predict(predictor, company_id, product='Widget A'):
+    return predictor.predict(company_id, [{'product': product}], forecast_days=7)
+
+
+def _count_calls(monkeypatch, obj, name):
+    calls = []
+    original = getattr(obj, name)
+
+    def counting(*args, **kwargs):
+        calls.append(args)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(obj, name, counting)
+    return calls
+
+
+def _reupload_sales(predictor, company_id, rows=3):
+    """Rewrite the company's Sales Order.csv with extra rows and a later mtime"""
+    sales_path = predictor._company_data_paths(company_id)[0]
+    sales = pd.read_csv(sales_path)
+    extra = sales.tail(rows).assign(Date=pd.date_range('2026-01-01', periods=rows, freq='D').strftime('%Y-%m-%d'))
+    pd.concat([sales, extra]).to_csv(sales_path, index=False)
+    stat = os.stat(sales_path)
+    os.utime(sales_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+
+def test_repeated_request_is_served_from_the_caches(predictor, company, monkeypatch):
+    predictions = _count_calls(monkeypatch, predictor, '_predict_product')
+    input_builds = _count_calls(monkeypatch, predictor, '_build_company_inputs')
+
+    first = _predict(predictor, company)
+    # Same product in another spelling shares the result key
+    second = _predict(predictor, company, ' widget a ')
+
+    assert len(predictions) == 1 and len(input_builds) == 1
+    assert second['prediction'] == first['prediction']
+    assert second['requested_product'] == ' widget a '
+
+
+def test_reupload_changes_result_and_input_keys(predictor, company, monkeypatch):
+    predictions = _count_calls(monkeypatch, predictor, '_predict_product')
+    input_builds = _count_calls(monkeypatch, predictor, '_build_company_inputs')
+    _predict(predictor, company)
+    old_fingerprint = predictor._data_fingerprint(company)
+
+    _reupload_sales(predictor, company)
+    new_fingerprint = predictor._data_fingerprint(company)
+    _predict(predictor, company)
+
+    assert new_fingerprint != old_fingerprint
+    assert len(predictions) == 2 and len(input_builds) == 2
+    assert {key[4] for key in predictor.result_cache._entries} == {old_fingerprint, new_fingerprint}
+    # Inputs of the old upload are dropped once the new ones are built
+    assert [key[1] for key in predictor.input_cache._entries] == [new_fingerprint]
+
+
+def test_new_model_version_changes_result_and_input_keys(predictor, company, monkeypatch):
+    predictions = _count_calls(monkeypatch, predictor, '_predict_product')
+    input_builds = _count_calls(monkeypatch, predictor, '_build_company_inputs')
+    _predict(predictor, company)
+
+    version = put_company_model(predictor.store, company, seed=1)
+    predictor.invalidate_company_model(company, version)
+    _predict(predictor, company)
+
+    assert version == 2
+    assert len(predictions) == 2 and len(input_builds) == 2
+    # Results of the replaced version are dropped with its model
+    assert [key[3] for key in predictor.result_cache._entries] == [2]
+    assert [key[2] for key in predictor.input_cache._entries] == [2]
+
+
+def test_invalidate_company_inputs_forces_a_rebuild(predictor, company, monkeypatch):
+    input_builds = _count_calls(monkeypatch, predictor, '_build_company_inputs')
+    _predict(predictor, company)
+
+    predictor.invalidate_company_inputs(company)
+    _predict(predictor, company)
+
+    assert len(input_builds) == 2
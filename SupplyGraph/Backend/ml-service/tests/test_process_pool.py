@@ -0,0 +1,101 @@
+import os
+import json
+import time
+import threading
+
+from training.process_pool import TrainingProcessPool
+
+
+class SleepingTrainer:
+    """Stands in for ModelTrainer in worker processes: each job sleeps and logs when it ran"""
+
+    def add_status_listener(self, callback):
+        pass
+
+    def add_model_saved_listener(self, callback):
+        pass
+
+    def preload_base_model(self):
+        pass
+
+    def fine_tune_company_model(self, company_id, nodes_path, edges_path, sales_path, force_retrain=False, incremental=False):
+        started = time.time()
+        time.sleep(float(edges_path))
+        with open(nodes_path, 'w') as f:
+            json.dump({'pid': os.getpid(), 'started': started, 'finished': time.time()}, f)
+        return True
+
+
+class ParentTrainer:
+    def __init__(self):
+        self.training_status = {}
+
+    def _update_training_status(self, company_id, status, progress, message, error=None):
+        self.training_status[company_id] = {'status': status, 'error': error}
+
+    def _notify_model_saved(self, company_id, version):
+        pass
+
+
+def _companies_with_same_home(pool, count):
+    companies = {}
+    for n in range(1000):
+        companies.setdefault(pool.worker_for(f'company-{n}'), []).append(f'company-{n}')
+    return next(names[:count] for names in companies.values() if len(names) >= count)
+
+
+def _run_concurrently(pool, jobs):
+    results = {}
+
+    def run(company_id, log_path, seconds):
+        results[company_id] = pool.run(company_id, log_path, str(seconds), '')
+
+    threads = [threading.Thread(target=run, args=job) for job in jobs]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(120)
+    return results
+
+
+def test_two_companies_with_one_home_worker_train_at_the_same_time(tmp_path):
+    pool = TrainingProcessPool(ParentTrainer(), workers=2, threads_per_worker=1, pin_cpus=False,
+                               trainer_factory=SleepingTrainer)
+    try:
+        first, second = _companies_with_same_home(pool, 2)
+        logs = [str(tmp_path / f'{name}.json') for name in (first, second)]
+        results = _run_concurrently(pool, [(first, logs[0], 2.0), (second, logs[1], 2.0)])
+        runs = [json.load(open(path)) for path in logs]
+    finally:
+        pool.shutdown()
+
+    assert results == {first: True, second: True}
+    assert runs[0]['pid'] != runs[1]['pid']
+    # The two jobs overlapped instead of queueing behind each other on the home worker
+    assert max(run['started'] for run in runs) < min(run['finished'] for run in runs)
+    assert pool.stats()['load'] == [0, 0]
+
+
+def test_company_with_a_running_job_stays_on_its_worker(tmp_path):
+    pool = TrainingProcessPool(ParentTrainer(), workers=2, threads_per_worker=1, pin_cpus=False,
+                               trainer_factory=SleepingTrainer)
+    try:
+        logs = [str(tmp_path / f'run{n}.json') for n in range(2)]
+        _run_concurrently(pool, [('company-a', logs[0], 1.0), ('company-a', logs[1], 0.1)])
+        runs = [json.load(open(path)) for path in logs]
+    finally:
+        pool.shutdown()
+
+    assert runs[0]['pid'] == runs[1]['pid']
+
+
+def test_idle_company_goes_to_its_home_worker():
+    pool = TrainingProcessPool(ParentTrainer(), workers=4, threads_per_worker=1, pin_cpus=False)
+    for company_id in ('a', 'b', 'c'):
+        assert pool._choose_worker(company_id) == pool.worker_for(company_id)
+
+    home = pool.worker_for('a')
+    pool._load[home] = 1
+    assert pool._choose_worker('a') != home
+    pool._company_jobs['a'] = (home, 1)
+    assert pool._choose_worker('a') == home
@@ -0,0 +1,85 @@
+import random
+
+import pytest
+
+from prediction.product_lookup import ProductLookup
+
+
+def _legacy_match(node_list, requested_product):
+    """The front-to-back scan _match_product did before ProductLookup"""
+    if not requested_product:
+        return None
+    requested_upper = requested_product.strip().upper()
+    for i, node in enumerate(node_list):
+        node_upper = node.strip().upper()
+        if requested_upper == node_upper or requested_upper in node_upper or node_upper in requested_upper:
+            return i
+    return None
+
+
+def _random_case(rng, name):
+    return ''.join(c.upper() if rng.random() < 0.5 else c.lower() for c in name)
+
+
+def _random_nodes(rng):
+    names = [''.join(rng.choice('ABC_1') for _ in range(rng.randint(1, 6))) for _ in range(rng.randint(1, 25))]
+    names += rng.sample(names, min(3, len(names)))                     # duplicates
+    names = [_random_case(rng, name) for name in names]                # case variants
+    names = [' ' + name if rng.random() < 0.1 else name for name in names]
+    rng.shuffle(names)
+    return names
+
+
+def _random_requests(rng, node_list):
+    requests = ['', None, 'not there at all']
+    for node in rng.sample(node_list, min(10, len(node_list))):
+        name = node.strip()
+        start = rng.randint(0, len(name) - 1)
+        requests += [
+            ' ' + _random_case(rng, name) + ' ',            # exact
+            name[start:start + rng.randint(1, len(name))],  # part of a node name
+            'X' + name + '1',                               # contains a node name
+        ]
+    requests += [''.join(rng.choice('ABC_1') for _ in range(rng.randint(1, 8))) for _ in range(20)]
+    return requests
+
+
+@pytest.mark.parametrize('seed', range(30))
+def test_lookup_matches_the_scan_unless_an_exact_name_exists(seed):
+    rng = random.Random(seed)
+    node_list = _random_nodes(rng)
+    lookup = ProductLookup(node_list)
+    upper = [node.strip().upper() for node in node_list]
+
+    for requested in _random_requests(rng, node_list):
+        idx, match_type = lookup.match(requested)
+        key = str(requested or '').strip().upper()
+        if requested and key in upper:
+            assert (idx, match_type) == (upper.index(key), 'exact'), requested
+        else:
+            assert idx == _legacy_match(node_list, requested), requested
+            assert match_type == (None if idx is None else 'fuzzy'), requested
+
+
+def test_exact_match_beats_an_earlier_fuzzy_hit():
+    node_list = ['PROD_01', 'PROD_010', 'prod_0']
+    lookup = ProductLookup(node_list)
+
+    assert _legacy_match(node_list, 'PROD_010') == 0
+    assert lookup.match('prod_010') == (1, 'exact')
+    assert lookup.match('PROD_0') == (2, 'exact')
+    assert lookup.match('PROD_0100') == (0, 'fuzzy')
+
+
+def test_duplicates_resolve_to_the_first_node():
+    lookup = ProductLookup(['Widget', 'Gadget', ' widget ', 'GADGET'])
+
+    assert lookup.match('WIDGET') == (0, 'exact')
+    assert lookup.match('gadget ') == (1, 'exact')
+    assert lookup.match('adge') == (1, 'fuzzy')
+
+
+@pytest.mark.parametrize('requested', ['', None])
+def test_empty_requests_and_empty_models_do_not_match(requested):
+    assert ProductLookup(['Widget']).match(requested) == (None, None)
+    assert ProductLookup([]).match('Widget') == (None, None)
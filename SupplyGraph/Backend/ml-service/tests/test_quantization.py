@@ -0,0 +1,63 @@
+import pytest
+import torch
+
+from training.trainer import HybridGATLSTM
+from utils import quantization
+from utils.quantization import quantize_checked
+
+
+@pytest.fixture
+def model():
+    torch.manual_seed(0)
+    return HybridGATLSTM(in_channels=1, max_timesteps=5, gat_hidden=2, gat_heads=2, lstm_hidden=8, dropout=0.0).eval()
+
+
+@pytest.fixture
+def inputs():
+    torch.manual_seed(1)
+    num_nodes = 10
+    return torch.randn(num_nodes, 5, 1), torch.stack([torch.arange(num_nodes), torch.arange(num_nodes).roll(1)])
+
+
+def test_model_above_the_drift_threshold_is_rejected(model, inputs):
+    served, report = quantize_checked(model, *inputs, threshold=0.0)
+
+    assert served is model
+    assert report['max_rel_diff'] > 0.0
+    assert not report['accepted'] and 'above 0.0' in report['reason']
+    assert isinstance(served.lstm, torch.nn.LSTM)
+
+
+def test_model_within_the_threshold_is_served_as_int8(model, inputs):
+    served, report = quantize_checked(model, *inputs, threshold=10.0)
+
+    assert served is not model and report['accepted']
+    assert type(served.lstm) is not torch.nn.LSTM and type(model.lstm) is torch.nn.LSTM
+    assert report['quantized_nbytes'] < report['float_nbytes']
+
+
+def test_threshold_defaults_to_quantization_max_drift(model, inputs, monkeypatch):
+    monkeypatch.setenv('QUANTIZATION_MAX_DRIFT', '-1')
+    served, report = quantize_checked(model, *inputs)
+
+    assert served is model and report['threshold'] == -1.0 and not report['accepted']
+
+
+def test_failed_quantization_serves_the_float_model(model, inputs, monkeypatch):
+    def fail(model):
+        raise RuntimeError("no quantized engine")
+
+    monkeypatch.setattr(quantization, 'quantize_model', fail)
+    served, report = quantize_checked(model, *inputs)
+
+    assert served is model and not report['accepted'] and 'no quantized engine' in report['reason']
+
+
+def test_predictor_keeps_float32_when_the_company_model_drifts(predictor, company, monkeypatch):
+    monkeypatch.setenv('QUANTIZATION_MAX_DRIFT', '-1')
+    predictor.quantization = True
+
+    entry = predictor._company_model_entry(company)
+
+    assert entry['variant'] == 'float32' and not entry['quantization']['accepted']
+    assert isinstance(entry['model'], HybridGATLSTM) and type(entry['model'].lstm) is torch.nn.LSTM
@@ -0,0 +1,147 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from prediction.predictor import DemandPredictor
+
+
+def _legacy_recent_stats(sales_df, node_id, max_timesteps):
+    """The per-product _recent_stats_for_product from before the stats table, frozen here for comparison"""
+    if node_id not in sales_df.columns:
+        return {'mean': 0.0, 'max': 0.0, 'trend': 'stable'}
+    df = sales_df.copy()
+    df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
+    df = df.sort_values('Date')
+
+    vals = pd.to_numeric(df[node_id], errors='coerce').dropna().values
+    if len(vals) == 0:
+        return {'mean': 0.0, 'max': 0.0, 'trend': 'stable'}
+
+    lookback = min(max_timesteps * 2, len(vals))
+    recent = vals[-lookback:]
+    trend = 'stable'
+    if len(recent) >= 6:
+        first_mean = float(np.mean(recent[:len(recent) // 3]))
+        last_mean = float(np.mean(recent[-len(recent) // 3:]))
+        last_3 = recent[-3:]
+        declining = all(last_3[i] >= last_3[i + 1] for i in range(len(last_3) - 1))
+        increasing = all(last_3[i] <= last_3[i + 1] for i in range(len(last_3) - 1))
+        if first_mean > 0:
+            change_pct = ((last_mean - first_mean) / first_mean) * 100
+            if change_pct < -20 and declining:
+                trend = 'down'
+            elif change_pct > 20 and increasing:
+                trend = 'up'
+
+    recent_for_stats = vals[-max_timesteps:] if len(vals) >= max_timesteps else vals
+    return {
+        'mean': float(np.mean(recent_for_stats)),
+        'max': float(np.max(recent_for_stats)),
+        'trend': trend,
+        'recent_mean': float(np.mean(recent))
+    }
+
+
+def _legacy_forecast_series(base_value, recent_stats, days):
+    """The per-day _generate_forecast_series loop from before the forecast matrix"""
+    if days <= 1:
+        return [round(max(0.0, base_value), 2)]
+    mean = recent_stats.get('mean', base_value) or base_value
+    max_val = max(recent_stats.get('max', base_value), base_value)
+    trend = recent_stats.get('trend', 'stable') or 'stable'
+
+    amplitude = max(5.0, abs(mean) * 0.15, abs(max_val - mean) * 0.5, abs(base_value) * 0.1)
+    if amplitude == 0:
+        amplitude = max(1.0, base_value * 0.1)
+
+    values = []
+    for day in range(days):
+        progress = day / max(1, days - 1)
+        if trend == 'up':
+            target = base_value + amplitude * (0.5 + progress)
+        elif trend == 'down':
+            target = max(0.0, base_value - amplitude * (0.5 + progress))
+        else:
+            target = mean + math.sin(progress * math.pi) * amplitude
+        blended = (base_value * 0.4) + (target * 0.6)
+        values.append(round(max(0.0, blended), 2))
+    return values
+
+
+def _random_sales(seed):
+    """Wide sales frame (unsorted dates) with NaN gaps, non-numeric cells, all-zero and short histories and trends"""
+    rng = np.random.default_rng(seed)
+    steps = int(rng.integers(1, 60))
+    columns = {}
+    for n in range(8):
+        values = rng.normal(40, 15, size=steps).round(int(rng.integers(0, 3)))
+        values[rng.random(steps) < 0.15] = np.nan
+        columns[f'P{n}'] = values
+    columns['zeros'] = np.zeros(steps)
+    columns['short'] = np.where(np.arange(steps) >= steps - 4, rng.integers(1, 9, size=steps), np.nan)
+    columns['empty'] = np.full(steps, np.nan)
+    columns['rising'] = np.linspace(1, 100, steps)
+    columns['falling'] = np.linspace(100, 1, steps)
+    frame = pd.DataFrame(columns).astype(object)
+    frame.loc[rng.random(steps) < 0.1, 'P0'] = 'n/a'
+    frame.insert(0, 'Date', pd.date_range('2025-01-01', periods=steps, freq='D').strftime('%Y-%m-%d'))
+    return frame.iloc[rng.permutation(steps)].reset_index(drop=True)
+
+
+@pytest.fixture
+def predictor(tmp_path, monkeypatch):
+    monkeypatch.setenv('MODEL_STORE', 'local')
+    monkeypatch.setenv('MODEL_STORE_DIR', str(tmp_path / 'model_store'))
+    monkeypatch.setenv('ARTIFACT_CACHE_DIR', str(tmp_path / 'artifact_cache'))
+    return DemandPredictor()
+
+
+@pytest.mark.parametrize('seed', range(20))
+@pytest.mark.parametrize('max_timesteps', [1, 5, 20])
+def test_recent_stats_table_matches_per_product_stats(predictor, seed, max_timesteps):
+    sales = _random_sales(seed)
+    sales_sorted = sales.assign(Date=pd.to_datetime(sales['Date'])).sort_values('Date')
+
+    rows = predictor._recent_stats_table(sales_sorted, max_timesteps).to_dict('index')
+
+    for product in [col for col in sales.columns if col != 'Date'] + ['not-a-product']:
+        expected = _legacy_recent_stats(sales, product, max_timesteps)
+        actual = predictor._recent_stats_row(rows, product)
+        assert actual['trend'] == expected['trend'], product
+        assert set(actual) == set(expected), product
+        for key in ('mean', 'max', 'recent_mean'):
+            if key in expected:
+                assert actual[key] == pytest.approx(expected[key], rel=1e-12, abs=1e-12), (product, key)
+
+
+@pytest.mark.parametrize('seed', range(20))
+@pytest.mark.parametrize('days', [1, 2, 7, 30])
+def test_forecast_matrix_matches_per_day_loop(predictor, seed, days):
+    rng = np.random.default_rng(seed)
+    count = 40
+    bases = np.concatenate([rng.normal(20, 30, size=count - 8), [0.0, -3.0, 0.125, 2.675, 1.005, 0.0, 10.0, 5e-3]])
+    means = np.concatenate([rng.normal(20, 30, size=count - 8), [0.0, 0.0, 0.0, 2.675, 1.0, 3.0, 0.0, 0.0]])
+    maxes = means + np.abs(rng.normal(0, 10, size=count))
+    trends = rng.choice(['stable', 'up', 'down'], size=count)
+
+    matrix = predictor._generate_forecast_matrix(
+        bases, means, maxes, [DemandPredictor.TREND_CODES[t] for t in trends], days
+    )
+
+    for i in range(count):
+        stats = {'mean': float(means[i]), 'max': float(maxes[i]), 'trend': trends[i]}
+        expected = _legacy_forecast_series(float(bases[i]), stats, days)
+        assert matrix[i] == expected, i
+        assert predictor._generate_forecast_series(float(bases[i]), stats, days) == expected
+
+
+def test_round2_matches_python_round_on_ties():
+    values = np.array([0.125, 0.375, 2.675, 1.005, 1.015, 0.045, 1234.565, 0.5, -0.004, 0.0, 1e-9])
+    values = np.concatenate([values, np.arange(0, 10, 0.005)])
+
+    rounded = DemandPredictor._round2(values.copy())
+
+    assert rounded.tolist() == [round(v, 2) + 0.0 for v in values.tolist()]
+    assert not np.signbit(rounded).any()
@@ -0,0 +1,70 @@
+from collections import Counter
+
+import numpy as np
+import pytest
+import torch
+
+from training.sampling import NeighborSampler
+
+
+def _random_graph(seed, num_nodes=60, num_edges=400):
+    rng = np.random.default_rng(seed)
+    edge_index = torch.from_numpy(rng.integers(0, num_nodes, size=(2, num_edges)))
+    return edge_index, num_nodes
+
+
+def _global_edges(n_id, edge_index):
+    """Sampled edges mapped back from local to global node ids"""
+    return list(zip(n_id[edge_index[0]].tolist(), n_id[edge_index[1]].tolist()))
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_subgraph_keeps_fanout_bounded_in_edges_of_each_seed(seed):
+    edge_index, num_nodes = _random_graph(seed)
+    sampler = NeighborSampler(edge_index, num_nodes, fanouts=(3, 2), seed=seed)
+    seeds = [5, 1, 17, 5, 40]
+
+    n_id, sub_edges = sampler.sample(seeds)
+    edges = _global_edges(n_id, sub_edges)
+
+    assert n_id[:4].tolist() == [1, 5, 17, 40]
+    assert len(set(n_id.tolist())) == len(n_id)
+    # Every sampled edge is a real edge, used no more often than the graph has it
+    available = Counter(zip(edge_index[0].tolist(), edge_index[1].tolist()))
+    assert not Counter(edges) - available
+
+    in_degree = np.bincount(edge_index[1].numpy(), minlength=num_nodes)
+    into = Counter(dst for _, dst in edges)
+    for node in (1, 5, 17, 40):
+        assert into[node] == min(in_degree[node], 3)
+    for node in n_id[4:].tolist():
+        # Second-hop nodes get at most fanouts[1] in-edges and no third hop is taken
+        assert into[node] <= 2
+    # Scratch relabelling is reset for the next batch
+    assert (sampler._local == -1).all()
+
+
+def test_unbounded_fanout_keeps_every_in_edge():
+    edge_index, num_nodes = _random_graph(0)
+    sampler = NeighborSampler(edge_index, num_nodes, fanouts=(-1,), seed=0)
+
+    n_id, sub_edges = sampler.sample([3, 9])
+    edges = Counter(_global_edges(n_id, sub_edges))
+
+    expected = Counter((src, dst) for src, dst in zip(edge_index[0].tolist(), edge_index[1].tolist()) if dst in (3, 9))
+    assert edges == expected
+
+
+def test_batches_visit_every_seed_once():
+    edge_index, num_nodes = _random_graph(1)
+    sampler = NeighborSampler(edge_index, num_nodes, fanouts=(4, 4), batch_size=7, seed=1)
+    seed_nodes = torch.arange(0, num_nodes, 2)
+
+    visited = []
+    for seeds, n_id, sub_edges in sampler.batches(seed_nodes):
+        assert len(seeds) <= 7
+        assert torch.equal(n_id[:len(seeds)], seeds)
+        assert sub_edges.numel() == 0 or int(sub_edges.max()) < len(n_id)
+        visited.extend(seeds.tolist())
+
+    assert sorted(visited) == seed_nodes.tolist()
@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+from sklearn.preprocessing import StandardScaler
+
+from utils.scalers import NodeScalers
+
+
+def _series(seed=0):
+    rng = np.random.default_rng(seed)
+    series = rng.normal(50, 20, size=(12, 20))
+    series[3] = 0.0                 # all zero
+    series[5] = 7.25                # constant
+    series[7, :15] = 0.0            # short history, left-padded with zeros
+    series[9] = 1e9 + rng.integers(0, 2, size=20)
+    return series
+
+
+def _legacy_scalers(node_list, series):
+    """Per-node dicts as training wrote them before NodeScalers (one StandardScaler per node)"""
+    scalers = {}
+    for i, node_id in enumerate(node_list):
+        scaler = StandardScaler().fit(series[i].reshape(-1, 1))
+        scalers[node_id] = {'mean_': scaler.mean_.tolist(), 'scale_': scaler.scale_.tolist()}
+    return scalers
+
+
+def _legacy_inverse(scalers, node_id, value):
+    """The per-node inverse transform the predictor applied to legacy dicts"""
+    scaler_data = scalers[node_id]
+    mean = np.array(scaler_data.get('mean_', [0.0]))
+    scale = np.array(scaler_data.get('scale_', [1.0]))
+    return value * (scale[0] if scale.size else 1.0) + (mean[0] if mean.size else 0.0)
+
+
+def test_fit_matches_standard_scaler_per_node():
+    series = _series()
+    scalers = NodeScalers.fit(series)
+
+    for i in range(len(series)):
+        expected = StandardScaler().fit(series[i].reshape(-1, 1))
+        np.testing.assert_allclose(scalers.mean[i], np.float32(expected.mean_[0]), rtol=1e-6)
+        np.testing.assert_allclose(scalers.scale[i], np.float32(expected.scale_[0]), rtol=1e-6)
+    assert scalers.scale[3] == 1.0 and scalers.scale[5] == 1.0
+
+
+def test_doc_round_trip():
+    scalers = NodeScalers.fit(_series())
+    doc = scalers.to_doc()
+    loaded = NodeScalers.from_doc(doc)
+
+    assert doc['count'] == len(scalers) and isinstance(doc['mean'], bytes)
+    assert np.array_equal(loaded.mean, scalers.mean) and np.array_equal(loaded.scale, scalers.scale)
+    assert loaded.present.all()
+
+
+def test_legacy_scalers_only_document():
+    series = _series()
+    node_list = [f'N{i}' for i in range(len(series))]
+    legacy = _legacy_scalers(node_list, series)
+    del legacy['N4']
+
+    scalers = NodeScalers.from_model_doc({'scalers': legacy}, node_list)
+
+    assert not scalers.has(4) and scalers.has(0)
+    np.testing.assert_allclose(scalers.mean[0], legacy['N0']['mean_'][0], rtol=1e-6)
+    # Nodes without a legacy entry are left unscaled
+    mean, denom = scalers.normalization_vectors()
+    assert mean[4] == 0.0 and denom[4] == 1.0
+    np.testing.assert_allclose(denom[0], np.float32(legacy['N0']['scale_'][0] + 1e-8))
+
+
+def test_compact_params_win_unless_their_length_is_stale():
+    series = _series()
+    node_list = [f'N{i}' for i in range(len(series))]
+    fitted = NodeScalers.fit(series)
+    legacy = _legacy_scalers(node_list, series * 2)
+
+    doc = {'scaler_params': fitted.to_doc(), 'scalers': legacy}
+    assert np.array_equal(NodeScalers.from_model_doc(doc, node_list).mean, fitted.mean)
+
+    stale = NodeScalers.from_model_doc(doc, node_list + ['extra'])
+    assert stale.has(0) and not stale.has(len(node_list))
+    np.testing.assert_allclose(stale.mean[0], legacy['N0']['mean_'][0], rtol=1e-6)
+
+    assert NodeScalers.from_model_doc({}, node_list) is None
+
+
+@pytest.mark.parametrize('value', [0.0, -1.5, 0.37, 1234.5])
+def test_inverse_matches_legacy_per_node_inverse(value):
+    scalers = NodeScalers.fit(_series())
+    node_list = [f'N{i}' for i in range(len(scalers))]
+    # Legacy dict holding the same (float32) parameters
+    legacy = {node_id: {'mean_': [float(scalers.mean[i])], 'scale_': [float(scalers.scale[i])]}
+              for i, node_id in enumerate(node_list)}
+
+    for i, node_id in enumerate(node_list):
+        assert scalers.inverse(i, value) == _legacy_inverse(legacy, node_id, value)
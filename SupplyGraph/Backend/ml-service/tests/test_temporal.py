@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from training.temporal import TemporalSnapshots
+from training.trainer import ModelTrainer
+
+
+def _matrix(steps=40, columns=5, seed=0):
+    return np.random.default_rng(seed).normal(20, 5, size=(steps, columns))
+
+
+@pytest.mark.parametrize('window,stride', [(1, 1), (5, 1), (8, 3), (39, 1)])
+def test_each_snapshot_is_the_matching_sales_matrix_slice(window, stride):
+    values = _matrix()
+    columns, nodes = np.array([0, 2, 3, 4]), np.array([6, 1, 0, 3])
+    snapshots = TemporalSnapshots(values, columns, nodes, num_nodes=8, window=window, stride=stride)
+
+    assert snapshots.ends.tolist() == list(range(window, len(values), stride))
+    for end in snapshots.ends.tolist():
+        x, y = snapshots.snapshot(end)
+        assert x.shape == (8, window, 1) and y.shape == (8, 1)
+        for column, node in zip(columns, nodes):
+            np.testing.assert_array_equal(x[node, :, 0].numpy(), values[end - window:end, column].astype(np.float32))
+            assert y[node, 0].item() == np.float32(values[end, column])
+        # Nodes without a sales column stay zero
+        unmapped = [n for n in range(8) if n not in nodes]
+        assert not x[unmapped].any() and not y[unmapped].any()
+
+
+def test_first_end_and_per_epoch_pick_the_snapshots():
+    values = _matrix()
+    snapshots = TemporalSnapshots(values, [0], [0], num_nodes=1, window=4, first_end=30, per_epoch=5,
+                                  validation_snapshots=3, seed=0)
+
+    assert snapshots.ends.tolist() == list(range(30, 40))
+    targets = [y[0, 0].item() for _, y in snapshots.epoch()]
+    assert len(targets) == len(set(targets)) == 5
+    assert set(targets) <= {np.float32(values[end, 0]) for end in range(30, 40)}
+    assert [y[0, 0].item() for _, y in snapshots.validation()] == [np.float32(values[end, 0]) for end in (37, 38, 39)]
+
+
+def test_training_data_snapshots_follow_the_date_sorted_sales(tmp_path, monkeypatch):
+    monkeypatch.setenv('MODEL_STORE', 'local')
+    monkeypatch.setenv('MODEL_STORE_DIR', str(tmp_path / 'model_store'))
+    monkeypatch.setenv('ARTIFACT_CACHE_DIR', str(tmp_path / 'artifact_cache'))
+    monkeypatch.setenv('TRAINING_TEMPORAL', '1')
+    monkeypatch.setenv('TRAINING_WINDOW', '6')
+    monkeypatch.setenv('TRAINING_TEMPORAL_STRIDE', '2')
+
+    steps = 30
+    rng = np.random.default_rng(0)
+    sales = pd.DataFrame({
+        'Date': pd.date_range('2025-01-01', periods=steps, freq='D').strftime('%Y-%m-%d'),
+        'B': rng.integers(1, 50, size=steps).astype(float),
+        'A': rng.integers(1, 50, size=steps).astype(float),
+    })
+    pd.DataFrame({'Node': ['PL1', 'A', 'B', 'C'], 'Plant': ['PL1'] * 4}).to_csv(tmp_path / 'nodes.csv', index=False)
+    pd.DataFrame({'Plant': ['PL1'], 'node1': ['A'], 'node2': ['B']}).to_csv(tmp_path / 'edges.csv', index=False)
+    sales.sample(frac=1, random_state=1).to_csv(tmp_path / 'sales.csv', index=False)
+
+    trainer = ModelTrainer()
+    data, _ = trainer._prepare_training_data(*(str(tmp_path / name) for name in ('nodes.csv', 'edges.csv', 'sales.csv')))
+    node_to_idx = trainer._run_state.node_to_idx
+
+    assert data.max_timesteps == 6 and data.snapshots.ends.tolist() == list(range(6, steps, 2))
+    for end in data.snapshots.ends.tolist():
+        x, y = data.snapshots.snapshot(end)
+        for product in ('A', 'B'):
+            np.testing.assert_array_equal(x[node_to_idx[product], :, 0].numpy(),
+                                          sales[product].to_numpy(dtype=np.float32)[end - 6:end])
+            assert y[node_to_idx[product], 0].item() == sales[product].iloc[end]
+        assert not x[node_to_idx['C']].any()
@@ -0,0 +1,174 @@
+import os
+import json
+import pickle
+import collections
+
+import pytest
+import torch
+
+from utils import tensor_format
+from utils.tensor_format import ALIGNMENT
+
+
+def _state():
+    state = collections.OrderedDict()
+    for name, dtype in tensor_format._DTYPES.items():
+        state[f'{name.lower()}.weight'] = (torch.arange(12) % 5).reshape(3, 4).to(dtype)
+    state['scalar'] = torch.tensor(2.5)
+    state['empty'] = torch.empty(0, 7)
+    state['odd'] = torch.randn(3, generator=torch.Generator().manual_seed(0), dtype=torch.float64)
+    return state
+
+
+def _assert_same_state(loaded, state):
+    assert list(loaded) == list(state)
+    for name, tensor in state.items():
+        assert loaded[name].dtype == tensor.dtype, name
+        assert loaded[name].shape == tensor.shape, name
+        assert torch.equal(loaded[name], tensor), name
+
+
+def _with_header(blob, edit):
+    header, data_start = tensor_format.read_header(blob)
+    header = edit(header) or header
+    raw = json.dumps(header).encode('utf-8')
+    raw += b' ' * (-(tensor_format._PREFIX.size + len(raw)) % ALIGNMENT)
+    return tensor_format._PREFIX.pack(tensor_format.MAGIC, len(raw)) + raw + bytes(blob[data_start:])
+
+
+@pytest.mark.parametrize('buffer', [bytes, bytearray], ids=['readonly', 'writable'])
+def test_round_trip_keeps_names_dtypes_shapes_and_values(buffer):
+    state = _state()
+    blob = tensor_format.dumps(state, metadata={'source': 'test'})
+
+    assert tensor_format.is_tensor_container(blob)
+    _assert_same_state(tensor_format.loads(buffer(blob)), state)
+
+
+def test_zero_dim_and_empty_tensors():
+    state = {'scalar': torch.tensor(7, dtype=torch.int64), 'empty': torch.empty(0, dtype=torch.bool)}
+    loaded = tensor_format.loads(tensor_format.dumps(state))
+
+    assert loaded['scalar'].dim() == 0 and loaded['scalar'].item() == 7
+    assert loaded['empty'].shape == (0,) and loaded['empty'].dtype == torch.bool
+
+
+def test_data_section_and_every_tensor_are_aligned():
+    blob = tensor_format.dumps(_state())
+    header, data_start = tensor_format.read_header(blob)
+
+    assert data_start % ALIGNMENT == 0
+    for name, entry in header.items():
+        if name != '__metadata__':
+            assert entry['offsets'][0] % ALIGNMENT == 0, name
+    assert (len(blob) - data_start) % ALIGNMENT == 0
+
+
+def test_metadata_is_kept_in_the_header_but_not_loaded():
+    blob = tensor_format.dumps({'w': torch.ones(2)}, metadata={'version': 3})
+    header, _ = tensor_format.read_header(blob)
+
+    assert header['__metadata__'] == {'version': '3'}
+    assert list(tensor_format.loads(blob)) == ['w']
+
+
+def test_writable_buffer_is_loaded_without_copying():
+    buffer = bytearray(tensor_format.dumps({'w': torch.zeros(4)}))
+    loaded = tensor_format.loads(buffer)
+    _, data_start = tensor_format.read_header(buffer)
+
+    buffer[data_start:data_start + 4] = torch.tensor([1.5]).view(torch.uint8).numpy().tobytes()
+    assert loaded['w'][0].item() == 1.5
+
+
+def test_readonly_buffer_gives_writable_tensors():
+    loaded = tensor_format.loads(tensor_format.dumps({'w': torch.zeros(4)}))
+    loaded['w'].add_(1)
+
+    assert torch.equal(loaded['w'], torch.ones(4))
+
+
+def test_unsupported_dtype_is_refused():
+    with pytest.raises(TypeError):
+        tensor_format.dumps({'c': torch.zeros(2, dtype=torch.complex64)})
+
+
+def _corruptions():
+    blob = tensor_format.dumps({'w': torch.randn(3, 4), 'b': torch.arange(5), 'e': torch.empty(0, 3)})
+    _, data_start = tensor_format.read_header(blob)
+
+    def entry(name, key, value):
+        return lambda header: header[name].__setitem__(key, value)
+
+    return {
+        'shorter than the prefix': blob[:5],
+        'wrong magic': b'NOTATENS' + blob[8:],
+        'truncated header': blob[:data_start - 10],
+        'truncated data': blob[:data_start + 20],
+        'missing trailing padding': blob[:-10],
+        'header length past the end': tensor_format._PREFIX.pack(tensor_format.MAGIC, 10 ** 9) + b'{}',
+        'header not a mapping': _with_header(blob, lambda header: [header]),
+        'entry not a mapping': _with_header(blob, lambda header: header.update({'w': [1, 2]})),
+        'unknown dtype': _with_header(blob, entry('w', 'dtype', 'F128')),
+        'missing offsets': _with_header(blob, lambda header: header['w'].pop('offsets')),
+        'negative offsets': _with_header(blob, entry('w', 'offsets', [64, 0])),
+        'offsets past the data': _with_header(blob, entry('w', 'offsets', [0, 10 ** 6])),
+        'shape larger than the data': _with_header(blob, entry('w', 'shape', [5, 5])),
+        'negative shape': _with_header(blob, entry('e', 'shape', [-1, 0]))
+    }
+
+
+@pytest.mark.parametrize('name', list(_corruptions()))
+def test_corrupt_containers_raise_value_error(name):
+    with pytest.raises(ValueError):
+        tensor_format.loads(_corruptions()[name])
+
+
+def test_load_state_reads_both_formats():
+    state = _state()
+    legacy = pickle.dumps(collections.OrderedDict((name, tensor.clone()) for name, tensor in state.items()))
+
+    _assert_same_state(tensor_format.load_state(tensor_format.dumps(state)), state)
+    _assert_same_state(tensor_format.load_state(legacy), state)
+
+
+def test_legacy_pickle_with_parameters_loads():
+    module = torch.nn.Linear(3, 2)
+    legacy = pickle.dumps({'weight': module.weight, 'bias': module.bias})
+    loaded = tensor_format.load_state(legacy)
+
+    assert torch.equal(loaded['weight'], module.weight.detach())
+    assert torch.equal(loaded['bias'], module.bias.detach())
+
+
+class _OpensFile:
+    def __init__(self, path):
+        self.path = path
+
+    def __reduce__(self):
+        return (open, (self.path, 'w'))
+
+
+def test_legacy_pickle_with_other_globals_is_refused(tmp_path, monkeypatch):
+    monkeypatch.delenv('MODEL_PICKLE_SAFE_LOAD', raising=False)
+    marker = tmp_path / 'created'
+    payloads = [
+        pickle.dumps({'w': torch.ones(1), 'x': _OpensFile(str(marker))}),
+        pickle.dumps(os.system),
+        pickle.dumps(collections.Counter('ab'))
+    ]
+
+    for payload in payloads:
+        with pytest.raises(pickle.UnpicklingError, match='Refusing to load'):
+            tensor_format.load_state(payload)
+    assert not marker.exists()
+
+
+def test_unrestricted_pickle_only_when_safe_load_is_off(monkeypatch):
+    payload = pickle.dumps({'counts': collections.Counter('ab')})
+
+    monkeypatch.setenv('MODEL_PICKLE_SAFE_LOAD', '0')
+    assert tensor_format.load_state(payload)['counts'] == collections.Counter('ab')
+    monkeypatch.setenv('MODEL_PICKLE_SAFE_LOAD', '1')
+    with pytest.raises(pickle.UnpicklingError):
+        tensor_format.load_state(payload)
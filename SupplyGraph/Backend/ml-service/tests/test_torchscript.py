@@ -0,0 +1,84 @@
+import pytest
+import torch
+
+from training.trainer import HybridGATLSTM
+from utils import torchscript
+
+
+def _graph(num_nodes, timesteps=5, seed=0):
+    generator = torch.Generator().manual_seed(seed)
+    x = torch.randn(num_nodes, timesteps, 1, generator=generator)
+    ring = torch.arange(num_nodes)
+    chords = torch.randint(0, num_nodes, (num_nodes,), generator=generator)
+    edge_index = torch.stack([torch.cat([ring, ring]), torch.cat([(ring + 1) % num_nodes, chords])])
+    return x, edge_index
+
+
+@pytest.fixture(scope='module')
+def model():
+    torch.manual_seed(0)
+    return HybridGATLSTM(max_timesteps=5, lstm_hidden=16).eval()
+
+
+@pytest.fixture(scope='module')
+def exported(model):
+    x, edge_index = _graph(12)
+    _, blob = torchscript.export_inference_graph(model, x, edge_index)
+    return torchscript.load_inference_graph(blob)
+
+
+@pytest.mark.parametrize('num_nodes, seed', [(12, 0), (31, 1), (3, 2)], ids=['example', 'larger', 'smaller'])
+def test_reloaded_graph_matches_eager(model, exported, num_nodes, seed):
+    x, edge_index = _graph(num_nodes, seed=seed)
+    with torch.no_grad():
+        expected = model(x, edge_index)
+        actual = exported(x, edge_index)
+
+    assert actual.shape == expected.shape == (num_nodes, 1)
+    torch.testing.assert_close(actual, expected, rtol=1e-4, atol=1e-5)
+
+
+def test_reloaded_graph_is_frozen_for_inference(exported):
+    assert isinstance(exported, torch.jit.ScriptModule)
+    assert not list(exported.parameters())
+
+
+def test_check_equivalence_covers_a_differently_sized_probe(model, exported):
+    x, edge_index = _graph(12)
+    report = torchscript.check_equivalence(model, exported, x, edge_index, tolerance_value=1e-4)
+
+    assert report['equivalent']
+    assert report['example_nodes'] == 12
+    assert report['probe_nodes'] != report['example_nodes']
+    assert report['example_max_rel_diff'] <= 1e-4 and report['probe_max_rel_diff'] <= 1e-4
+
+
+def test_check_equivalence_keeps_the_model_in_training_mode(exported):
+    torch.manual_seed(0)
+    training_model = HybridGATLSTM(max_timesteps=5, lstm_hidden=16).train()
+    x, edge_index = _graph(12)
+    torchscript.check_equivalence(training_model, exported, x, edge_index)
+
+    assert training_model.training
+
+
+def test_export_checked_returns_the_artifact_and_its_metadata(model):
+    x, edge_index = _graph(12)
+    blob, metadata = torchscript.export_checked(model, x, edge_index)
+
+    assert blob is not None
+    assert metadata['format'] == 'torchscript'
+    assert metadata['export_version'] == torchscript.EXPORT_VERSION
+    assert metadata['timesteps'] == 5
+    assert metadata['equivalence']['equivalent']
+    reloaded = torchscript.load_inference_graph(blob)
+    with torch.no_grad():
+        torch.testing.assert_close(reloaded(x, edge_index), model(x, edge_index), rtol=1e-4, atol=1e-5)
+
+
+def test_export_checked_drops_a_graph_outside_the_tolerance(model, monkeypatch):
+    monkeypatch.setenv('TORCHSCRIPT_TOLERANCE', '-1')
+    blob, metadata = torchscript.export_checked(model, *_graph(12))
+
+    assert blob is None
+    assert not metadata['equivalence']['equivalent']
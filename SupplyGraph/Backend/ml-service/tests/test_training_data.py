@@ -0,0 +1,141 @@
+import numpy as np
+import pandas as pd
+import pytest
+import torch
+
+from training.trainer import ModelTrainer
+from utils.graph_builder import build_edge_index
+
+
+def _legacy_prepare(nodes_path, edges_path, sales_path):
+    """
+    The row-by-row _prepare_training_data from before vectorization, frozen here for comparison.
+    Only change: missing edge nodes are added in order of first appearance (they used to follow set order).
+    """
+    nodes_df = pd.read_csv(nodes_path)
+    edges_df = pd.read_csv(edges_path)
+    sales_df = pd.read_csv(sales_path)
+
+    node_ids = set(str(n) for n in nodes_df['Node'].dropna())
+    edge_nodes = []
+    for _, row in edges_df.iterrows():
+        for n in (row['node1'], row['node2']):
+            if pd.notna(n) and str(n).strip() != '' and str(n) not in node_ids and str(n) not in edge_nodes:
+                edge_nodes.append(str(n))
+    if edge_nodes:
+        new_nodes = []
+        for node in edge_nodes:
+            node_str = str(node).strip()
+            new_node = {'Node': node_str}
+            if 'Plant' in nodes_df.columns:
+                plant_val = ''
+                if 'Plant' in edges_df.columns:
+                    plant_rows = edges_df[
+                        (edges_df['node1'].astype(str).str.strip() == node_str) |
+                        (edges_df['node2'].astype(str).str.strip() == node_str)
+                    ]
+                    if len(plant_rows) > 0:
+                        plant_val = str(plant_rows.iloc[0].get('Plant', '')).strip()
+                new_node['Plant'] = plant_val if plant_val else ''
+            new_nodes.append(new_node)
+        nodes_df = pd.concat([nodes_df, pd.DataFrame(new_nodes)], ignore_index=True)
+
+    node_list = [str(node).strip() for node in nodes_df['Node'].tolist()]
+    node_to_idx = {node: idx for idx, node in enumerate(node_list)}
+    edge_index = build_edge_index(edges_df, node_list)
+
+    product_columns = [col for col in sales_df.columns if col != 'Date']
+    sales_df['Date'] = pd.to_datetime(sales_df['Date'])
+    sales_df = sales_df.sort_values('Date')
+    max_timesteps = min(len(sales_df), 20)
+
+    time_series_x = np.zeros((len(node_list), max_timesteps, 1))
+    for product in product_columns:
+        product_str = str(product).strip()
+        if product_str in node_to_idx:
+            sales_values = sales_df[product].values[-max_timesteps:]
+            if len(sales_values) < max_timesteps:
+                sales_values = np.pad(sales_values, (max_timesteps - len(sales_values), 0), mode='constant')
+            time_series_x[node_to_idx[product_str], :, 0] = sales_values
+
+    y = np.zeros(len(node_list))
+    for product in product_columns:
+        product_str = str(product).strip()
+        if product_str in node_to_idx:
+            sales_values = sales_df[product].values
+            non_zero_sales = sales_values[sales_values > 0]
+            if len(non_zero_sales) > 0:
+                y[node_to_idx[product_str]] = non_zero_sales.mean()
+
+    return node_to_idx, edge_index, torch.tensor(time_series_x, dtype=torch.float), \
+        torch.tensor(y, dtype=torch.float).unsqueeze(1)
+
+
+def _write_random_csvs(directory, seed):
+    """Seeded nodes/edges/sales CSVs with duplicate nodes, whitespace and case variants and unknown edge endpoints"""
+    rng = np.random.default_rng(seed)
+    names = [f'S{n}' for n in range(int(rng.integers(4, 12)))]
+    plants = ['PL1', 'PL2', np.nan]
+
+    node_names = list(names) + ['PL1', 'PL2']
+    node_names += list(rng.choice(names, size=2))                        # exact duplicates
+    node_names += [' ' + names[1], names[2] + ' ', names[3].lower()]     # whitespace / case variants
+    rng.shuffle(node_names)
+    nodes = pd.DataFrame({'Node': node_names, 'Plant': rng.choice(plants, size=len(node_names))})
+
+    missing = [f'X{n}' for n in range(int(rng.integers(1, 4)))]
+    endpoints = node_names + missing + ['', np.nan]
+    rows = int(rng.integers(5, 30))
+    edges = pd.DataFrame({
+        'Plant': rng.choice(plants + ['PL3'], size=rows),
+        'node1': rng.choice(np.array(endpoints, dtype=object), size=rows),
+        'node2': rng.choice(np.array(endpoints, dtype=object), size=rows),
+    })
+    # Keep only endpoints validation accepts (known nodes or unknown names that get auto-added)
+    known = set(node_names) | set(missing)
+    edges = edges[edges['node1'].isin(known) & edges['node2'].isin(known)]
+
+    steps = int(rng.integers(3, 40))
+    dates = pd.date_range('2025-01-01', periods=steps, freq='D')[rng.permutation(steps)]
+    products = [name for name in dict.fromkeys(node_names) if rng.random() < 0.7 and not name.startswith('PL')]
+    values = rng.integers(-2, 6, size=(steps, len(products))).astype(float)
+    values[rng.random(values.shape) < 0.05] = np.nan
+    sales = pd.DataFrame(values, columns=products)
+    sales.insert(0, 'Date', dates.strftime('%Y-%m-%d'))
+
+    paths = [str(directory / name) for name in ('nodes.csv', 'edges.csv', 'sales.csv')]
+    for frame, path in zip((nodes, edges, sales), paths):
+        frame.to_csv(path, index=False)
+    return paths
+
+
+@pytest.fixture
+def trainer(tmp_path, monkeypatch):
+    monkeypatch.setenv('MODEL_STORE', 'local')
+    monkeypatch.setenv('MODEL_STORE_DIR', str(tmp_path / 'model_store'))
+    monkeypatch.setenv('ARTIFACT_CACHE_DIR', str(tmp_path / 'artifact_cache'))
+    monkeypatch.delenv('TRAINING_TEMPORAL', raising=False)
+    return ModelTrainer()
+
+
+@pytest.mark.parametrize('seed', range(25))
+def test_prepare_training_data_matches_row_loop_version(trainer, tmp_path, seed):
+    paths = _write_random_csvs(tmp_path, seed)
+    node_to_idx, edge_index, x, y = _legacy_prepare(*paths)
+
+    data, _ = trainer._prepare_training_data(*paths)
+
+    assert trainer._run_state.node_to_idx == node_to_idx
+    assert torch.equal(data.edge_index, edge_index)
+    torch.testing.assert_close(data.x, x, rtol=0, atol=0, equal_nan=True)
+    torch.testing.assert_close(data.y, y, rtol=0, atol=0, equal_nan=True)
+
+
+def test_missing_edge_nodes_are_added_in_first_appearance_order_with_their_first_plant(trainer):
+    nodes = pd.DataFrame({'Node': ['A', 'B'], 'Plant': ['PL1', 'PL1']})
+    edges = pd.DataFrame({'Plant': ['PL2', np.nan, 'PL3'], 'node1': ['A', 'Z', ' Y'], 'node2': ['Z', 'B', 'Y']})
+
+    nodes = trainer._add_missing_edge_nodes(nodes, edges)
+
+    assert nodes['Node'].tolist() == ['A', 'B', 'Z', 'Y', 'Y']
+    assert nodes['Plant'].tolist() == ['PL1', 'PL1', 'PL2', 'PL3', 'PL3']
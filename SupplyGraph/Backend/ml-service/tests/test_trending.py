@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+
+@pytest.fixture(scope='module')
+def app_module(tmp_path_factory):
+    """app.py builds its trainer and predictor at import; point them at a throwaway local store"""
+    root = tmp_path_factory.mktemp('app')
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv('MODEL_STORE', 'local')
+        mp.setenv('MODEL_STORE_DIR', str(root / 'model_store'))
+        mp.setenv('ARTIFACT_CACHE_DIR', str(root / 'artifact_cache'))
+        mp.setenv('TRAINING_EXECUTOR', 'thread')
+        import app
+        yield app
+
+
+def _legacy_metrics(sales_df, product):
+    """Per-product recent average and volatility of /inventory/trending before the column-wise pass"""
+    df_sorted = sales_df.copy()
+    df_sorted['Date'] = pd.to_datetime(df_sorted['Date'], errors='coerce')
+    df_sorted = df_sorted.sort_values('Date')
+    sales_values = pd.to_numeric(df_sorted[product], errors='coerce').dropna()
+    sales_values = sales_values[sales_values > 0]
+    recent_count = min(10, len(sales_values))
+    historical_avg = float(sales_values.tail(recent_count).mean()) if recent_count > 0 else 0
+    volatility = float(np.std(sales_values)) if len(sales_values) > 1 else 0.0
+    return historical_avg, volatility
+
+
+def _sales(seed, steps=25):
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame({
+        'A': rng.integers(0, 50, size=steps).astype(float),
+        'B': np.where(rng.random(steps) < 0.3, np.nan, rng.normal(30, 10, size=steps)),
+        'C': np.zeros(steps),
+        'D': np.where(np.arange(steps) == 4, 7.0, np.nan),
+    })
+    frame.insert(0, 'Date', pd.date_range('2025-01-01', periods=steps, freq='D').strftime('%Y-%m-%d'))
+    return frame.iloc[rng.permutation(steps)].reset_index(drop=True)
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_wide_metrics_match_per_product_loop(app_module, seed):
+    sales = _sales(seed)
+    products, historical_avg, volatility, _ = app_module._wide_product_metrics(sales)
+
+    assert products == ['A', 'B', 'C', 'D']
+    for i, product in enumerate(products):
+        expected_avg, expected_volatility = _legacy_metrics(sales, product)
+        assert historical_avg[i] == pytest.approx(expected_avg, rel=1e-12)
+        assert volatility[i] == pytest.approx(expected_volatility, rel=1e-12, abs=1e-12)
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_naive_forecast_uses_the_latest_dates(app_module, seed):
+    sales = _sales(seed)
+    products, historical_avg, _, naive = app_module._wide_product_metrics(sales)
+
+    by_date = sales.assign(Date=pd.to_datetime(sales['Date'])).sort_values('Date')
+    for i, product in enumerate(products):
+        recent = pd.to_numeric(by_date[product], errors='coerce').dropna().tail(3)
+        expected = float(recent.mean()) * 1.1 if len(recent) else historical_avg[i]
+        assert naive[i] == pytest.approx(expected, rel=1e-12)
+
+
+def test_naive_forecast_of_sorted_file_matches_file_order(app_module):
+    """On a file already in date order the fallback is the old last-3-rows-of-the-file value"""
+    sales = _sales(0).assign(Date=lambda f: pd.to_datetime(f['Date'])).sort_values('Date').reset_index(drop=True)
+    products, _, _, naive = app_module._wide_product_metrics(sales)
+
+    for i, product in enumerate(products[:3]):
+        recent = pd.to_numeric(sales[product], errors='coerce').dropna().tail(3)
+        assert naive[i] == pytest.approx(float(recent.mean()) * 1.1, rel=1e-12)
@@ -0,0 +1,153 @@
+import os
+import threading
+import traceback
+import uuid
+from collections import OrderedDict, deque
+
+import pandas as pd
+
+
+class TrainingJob:
+    """One queued training run and its outcome"""
+
+    def __init__(self, company_id, payload):
+        self.id = uuid.uuid4().hex
+        self.company_id = company_id
+        self.payload = payload
+        self.status = 'queued'  # queued -> running -> completed | failed
+        self.result = None
+        self.error = None
+        self.created_at = pd.Timestamp.now().isoformat()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def finished(self):
+        return self.status in ('completed', 'failed')
+
+    def to_dict(self):
+        return {
+            'job_id': self.id,
+            'company_id': self.company_id,
+            'status': self.status,
+            'result': self.result,
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at
+        }
+
+
+class TrainingJobQueue:
+    """
+    FIFO queue of training jobs run by a bounded pool of background threads.
+
+    run_job(job) does the work and returns a JSON-serializable result; an
+    exception marks the job failed. A company has at most one pending job:
+    submitting again while one is queued or running returns that job.
+    Worker threads start lazily on the first submit.
+    """
+
+    def __init__(self, run_job, workers=None, max_history=None):
+        self.run_job = run_job
+        self.workers = max(1, int(workers if workers is not None else os.getenv('TRAINING_WORKERS', '1')))
+        self.max_history = int(max_history if max_history is not None else os.getenv('TRAINING_JOB_HISTORY', '500'))
+        self._jobs = OrderedDict()  # job_id -> TrainingJob, oldest first
+        self._pending = deque()  # job ids waiting for a worker
+        self._active_by_company = {}  # company_id -> job_id of its queued/running job
+        self._cond = threading.Condition()
+        self._threads = []
+
+    def _ensure_workers(self):
+        self._threads = [t for t in self._threads if t.is_alive()]
+        for i in range(len(self._threads), self.workers):
+            thread = threading.Thread(target=self._worker, name=f"training-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, company_id, **payload):
+        """Queue a job for company_id; returns (job, created)"""
+        with self._cond:
+            active_id = self._active_by_company.get(company_id)
+            if active_id is not None:
+                return self._jobs[active_id], False
+
+            job = TrainingJob(company_id, payload)
+            self._jobs[job.id] = job
+            self._pending.append(job.id)
+            self._active_by_company[company_id] = job.id
+            self._prune_history()
+            self._ensure_workers()
+            self._cond.notify()
+            return job, True
+
+    def _prune_history(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.max_history)]:
+            del self._jobs[job_id]
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                job = self._jobs[self._pending.popleft()]
+                job.status = 'running'
+                job.started_at = pd.Timestamp.now().isoformat()
+
+            try:
+                result = self.run_job(job)
+                status, error = 'completed', None
+            except Exception as e:
+                print(f"Training job {job.id} for company {job.company_id} failed: {e}")
+                traceback.print_exc()
+                result, status, error = None, 'failed', str(e)
+
+            with self._cond:
+                job.result = result
+                job.error = error
+                job.status = status
+                job.finished_at = pd.Timestamp.now().isoformat()
+                if self._active_by_company.get(job.company_id) == job.id:
+                    del self._active_by_company[job.company_id]
+
+    def get(self, job_id):
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def latest_for_company(self, company_id):
+        """The company's queued/running job, else its most recent finished one, else None"""
+        with self._cond:
+            active_id = self._active_by_company.get(company_id)
+            if active_id is not None:
+                return self._jobs[active_id]
+            for job in reversed(self._jobs.values()):
+                if job.company_id == company_id:
+                    return job
+            return None
+
+    def position(self, job_id):
+        """1-based place in the waiting line, 0 once a worker has picked the job up, None if unknown"""
+        with self._cond:
+            try:
+                return self._pending.index(job_id) + 1
+            except ValueError:
+                return 0 if job_id in self._jobs else None
+
+    def describe(self, job):
+        info = job.to_dict()
+        info['queue_position'] = self.position(job.id)
+        return info
+
+    def stats(self):
+        with self._cond:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            return {
+                'workers': self.workers,
+                'queued': len(self._pending),
+                'running': counts.get('running', 0),
+                'completed': counts.get('completed', 0),
+                'failed': counts.get('failed', 0)
+            }
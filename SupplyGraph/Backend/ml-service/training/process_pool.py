@@ -0,0 +1,236 @@
+import os
+import queue
+import threading
+import traceback
+import uuid
+import zlib
+import multiprocessing as mp
+
+import torch
+
+from training.trainer import ModelTrainer
+
+
+def _available_cpus():
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def _worker_main(index, tasks, events, num_threads, cpus, trainer_factory):
+    """
+    Training worker process: pins itself, sizes torch's thread pool, loads the
+    base model once and then runs fine-tunes from its task queue until it gets None.
+    Status updates and model-saved events are relayed to the parent over events.
+    """
+    if cpus and hasattr(os, 'sched_setaffinity'):
+        try:
+            os.sched_setaffinity(0, cpus)
+        except OSError as e:
+            print(f"Training worker {index}: could not pin to CPUs {cpus}: {e}")
+    torch.set_num_threads(num_threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass
+
+    trainer = trainer_factory() if trainer_factory is not None else ModelTrainer()
+    trainer.add_status_listener(lambda company_id, status: events.put(('status', company_id, dict(status))))
+    trainer.add_model_saved_listener(lambda company_id, version: events.put(('model_saved', company_id, version)))
+    try:
+        trainer.preload_base_model()
+    except Exception as e:
+        print(f"Training worker {index}: base model preload failed, loading per job: {e}")
+
+    events.put(('ready', index, os.getpid()))
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        task_id, args = task
+        try:
+            success, error = bool(trainer.fine_tune_company_model(*args)), None
+        except Exception as e:
+            traceback.print_exc()
+            success, error = False, str(e)
+        events.put(('done', task_id, (success, error)))
+
+
+class _PendingTask:
+    def __init__(self, worker):
+        self.worker = worker
+        self.event = threading.Event()
+        self.success = False
+        self.error = None
+
+
+class TrainingProcessPool:
+    """
+    Runs ModelTrainer.fine_tune_company_model in a pool of worker processes.
+
+    - workers: number of processes (TRAINING_WORKERS)
+    - threads_per_worker: torch intra-op threads per process
+      (TRAINING_THREADS_PER_WORKER, default: available CPUs / workers)
+    - pin_cpus: pin each worker to its own slice of the available CPUs (TRAINING_PIN_CPUS=1)
+
+    Each worker keeps the base model loaded and trains a copy per job. A company goes to
+    its home worker (stable hash of company_id) when that worker is among the least
+    loaded, else to the least-loaded worker; while a company has a job running, its next
+    job goes to that same worker. Status updates and
+    model-saved events from the workers are applied to the parent's trainer, so
+    /training-status and the predictor cache invalidation work as with in-process training.
+    Processes start lazily on the first job; a worker that dies is replaced and its
+    in-flight jobs fail.
+    """
+
+    def __init__(self, trainer, workers=None, threads_per_worker=None, pin_cpus=None,
+                 trainer_factory=None, start_method=None):
+        self.trainer = trainer
+        self.workers = max(1, int(workers if workers is not None else os.getenv('TRAINING_WORKERS', '1')))
+        cpus = _available_cpus()
+        if threads_per_worker is None:
+            threads_per_worker = os.getenv('TRAINING_THREADS_PER_WORKER') or max(1, len(cpus) // self.workers)
+        self.threads_per_worker = max(1, int(threads_per_worker))
+        if pin_cpus is None:
+            pin_cpus = os.getenv('TRAINING_PIN_CPUS', '0') == '1'
+        self.cpu_sets = [self._cpu_slice(cpus, i) for i in range(self.workers)] if pin_cpus else [None] * self.workers
+        self.trainer_factory = trainer_factory
+        # spawn: workers must not inherit the parent's torch thread pools or MongoDB sockets
+        self._ctx = mp.get_context(start_method or os.getenv('TRAINING_MP_START', 'spawn'))
+        self._lock = threading.Lock()
+        self._procs = [None] * self.workers
+        self._tasks = [None] * self.workers
+        self._events = None
+        self._pending = {}  # task_id -> _PendingTask
+        self._load = [0] * self.workers  # jobs dispatched to each worker and not yet done
+        self._company_jobs = {}  # company_id -> (worker, jobs running there)
+        self._relay_thread = None
+        self.jobs_dispatched = 0
+        self.worker_restarts = 0
+
+    def _cpu_slice(self, cpus, index):
+        start = (index * self.threads_per_worker) % len(cpus)
+        return [cpus[(start + k) % len(cpus)] for k in range(min(self.threads_per_worker, len(cpus)))]
+
+    def worker_for(self, company_id):
+        """Home worker of a company (stable hash of company_id)"""
+        return zlib.crc32(str(company_id).encode('utf-8')) % self.workers
+
+    def _choose_worker(self, company_id):
+        # Caller holds self._lock
+        running = self._company_jobs.get(company_id)
+        if running is not None:
+            return running[0]
+        home = self.worker_for(company_id)
+        least = min(self._load)
+        if self._load[home] == least:
+            return home
+        return self._load.index(least)
+
+    def _start_worker(self, index):
+        tasks = self._ctx.Queue()
+        proc = self._ctx.Process(
+            target=_worker_main,
+            args=(index, tasks, self._events, self.threads_per_worker, self.cpu_sets[index], self.trainer_factory),
+            name=f"training-process-{index}",
+            daemon=True
+        )
+        proc.start()
+        self._tasks[index] = tasks
+        self._procs[index] = proc
+
+    def _ensure_started(self):
+        if self._events is None:
+            self._events = self._ctx.Queue()
+            self._relay_thread = threading.Thread(target=self._relay, name="training-process-relay", daemon=True)
+            self._relay_thread.start()
+        for index, proc in enumerate(self._procs):
+            if proc is None:
+                self._start_worker(index)
+
+    def run(self, company_id, nodes_path, edges_path, sales_path, force_retrain=False, incremental=False):
+        """Fine-tune on the company's worker process; blocks until done and returns True on success"""
+        task_id = uuid.uuid4().hex
+        with self._lock:
+            self._ensure_started()
+            index = self._choose_worker(company_id)
+            pending = self._pending[task_id] = _PendingTask(index)
+            self._load[index] += 1
+            self._company_jobs[company_id] = (index, self._company_jobs.get(company_id, (index, 0))[1] + 1)
+            self._tasks[index].put((task_id, (company_id, nodes_path, edges_path, sales_path, force_retrain, incremental)))
+            self.jobs_dispatched += 1
+        pending.event.wait()
+        with self._lock:
+            self._pending.pop(task_id, None)
+            self._load[index] -= 1
+            worker, jobs = self._company_jobs.pop(company_id)
+            if jobs > 1:
+                self._company_jobs[company_id] = (worker, jobs - 1)
+        if pending.error and not self.trainer.training_status.get(company_id, {}).get('error'):
+            self.trainer._update_training_status(company_id, "failed", 0, "Training failed", pending.error)
+        return pending.success
+
+    def _relay(self):
+        """Apply worker events in the parent process and watch for dead workers"""
+        while True:
+            try:
+                kind, key, value = self._events.get(timeout=1.0)
+            except queue.Empty:
+                self._reap_dead_workers()
+                continue
+            except (EOFError, OSError):
+                return
+            try:
+                if kind == 'status':
+                    self.trainer.training_status[key] = value
+                elif kind == 'model_saved':
+                    self.trainer._notify_model_saved(key, value)
+                elif kind == 'done':
+                    with self._lock:
+                        pending = self._pending.get(key)
+                    if pending is not None:
+                        pending.success, pending.error = value
+                        pending.event.set()
+                elif kind == 'ready':
+                    print(f"Training worker {key} ready (pid {value})")
+            except Exception as e:
+                print(f"Training event relay failed: {e}")
+
+    def _reap_dead_workers(self):
+        with self._lock:
+            for index, proc in enumerate(self._procs):
+                if proc is None or proc.is_alive():
+                    continue
+                print(f"Training worker {index} exited with code {proc.exitcode}; restarting")
+                for pending in self._pending.values():
+                    if pending.worker == index and not pending.event.is_set():
+                        pending.error = f"Training worker exited with code {proc.exitcode}"
+                        pending.event.set()
+                self.worker_restarts += 1
+                self._start_worker(index)
+
+    def shutdown(self, timeout=5.0):
+        with self._lock:
+            for index, proc in enumerate(self._procs):
+                if proc is not None and proc.is_alive():
+                    self._tasks[index].put(None)
+            for index, proc in enumerate(self._procs):
+                if proc is not None:
+                    proc.join(timeout)
+                    if proc.is_alive():
+                        proc.terminate()
+                self._procs[index] = None
+
+    def stats(self):
+        with self._lock:
+            return {
+                'executor': 'process',
+                'workers': self.workers,
+                'threads_per_worker': self.threads_per_worker,
+                'cpu_sets': self.cpu_sets,
+                'alive': sum(1 for proc in self._procs if proc is not None and proc.is_alive()),
+                'in_flight': len(self._pending),
+                'load': list(self._load),
+                'jobs_dispatched': self.jobs_dispatched,
+                'worker_restarts': self.worker_restarts
+            }
@@ -0,0 +1,102 @@
+import numpy as np
+import torch
+
+
+class NeighborSampler:
+    """
+    Fan-out neighbor sampling for mini-batch GNN training, in the spirit of
+    torch_geometric's NeighborLoader but without its optional compiled backends
+    (pyg-lib / torch-sparse).
+
+    For each batch of seed nodes, up to fanouts[0] incoming neighbors are sampled
+    per seed, then up to fanouts[1] per newly reached node, and so on. The batch
+    subgraph holds only the sampled edges, relabelled to local indices with the
+    seeds first, so model(x[n_id], edge_index)[:len(seeds)] are the seed outputs.
+    Peak memory is bounded by batch_size * (1 + f1 + f1*f2 + ...) nodes,
+    independent of the full graph size.
+    """
+
+    def __init__(self, edge_index, num_nodes, fanouts=(10, 10), batch_size=512, shuffle=True, seed=None):
+        self.num_nodes = int(num_nodes)
+        self.fanouts = [int(f) for f in fanouts]
+        self.batch_size = max(1, int(batch_size))
+        self.shuffle = shuffle
+        self.rng = np.random.default_rng(seed)
+
+        # CSC layout: incoming edges of node v are src[ptr[v]:ptr[v + 1]] (GATConv aggregates src -> dst)
+        edge_index = edge_index.cpu().numpy() if isinstance(edge_index, torch.Tensor) else np.asarray(edge_index)
+        src, dst = edge_index[0].astype(np.int64), edge_index[1].astype(np.int64)
+        order = np.argsort(dst, kind='stable')
+        self._src = src[order]
+        self._dst = dst[order]
+        self._ptr = np.zeros(self.num_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(dst, minlength=self.num_nodes), out=self._ptr[1:])
+
+        # Global -> local relabelling scratch space, reset after every batch
+        self._local = np.full(self.num_nodes, -1, dtype=np.int64)
+
+    def _sample_edges(self, frontier, fanout):
+        """Positions (into the CSC arrays) of up to fanout random incoming edges per frontier node"""
+        starts = self._ptr[frontier]
+        degrees = self._ptr[frontier + 1] - starts
+        total = int(degrees.sum())
+        if total == 0:
+            return np.empty(0, dtype=np.int64)
+
+        # All incoming edge positions of the frontier, grouped by frontier node
+        group = np.repeat(np.arange(len(frontier)), degrees)
+        offsets = np.arange(total) - np.repeat(np.cumsum(degrees) - degrees, degrees)
+        positions = np.repeat(starts, degrees) + offsets
+        if fanout < 0 or int(degrees.max()) <= fanout:
+            return positions
+
+        # Keep a random fanout-sized subset per node: rank random keys within each group
+        keys = self.rng.random(total)
+        order = np.lexsort((keys, group))
+        rank = np.empty(total, dtype=np.int64)
+        rank[order] = offsets
+        return positions[rank < fanout]
+
+    def sample(self, seeds):
+        """(n_id, edge_index) of the sampled subgraph around seeds; n_id[:len(seeds)] == seeds"""
+        seeds = np.unique(np.asarray(seeds, dtype=np.int64))
+        n_id = [seeds]
+        self._local[seeds] = np.arange(len(seeds))
+        count = len(seeds)
+        frontier = seeds
+        edge_src, edge_dst = [], []
+
+        for fanout in self.fanouts:
+            if len(frontier) == 0:
+                break
+            positions = self._sample_edges(frontier, fanout)
+            src = self._src[positions]
+            edge_src.append(src)
+            edge_dst.append(self._dst[positions])
+
+            # Newly reached nodes become the next frontier
+            new_nodes = np.unique(src[self._local[src] < 0])
+            self._local[new_nodes] = np.arange(count, count + len(new_nodes))
+            count += len(new_nodes)
+            n_id.append(new_nodes)
+            frontier = new_nodes
+
+        n_id = np.concatenate(n_id)
+        if edge_src:
+            src = self._local[np.concatenate(edge_src)]
+            dst = self._local[np.concatenate(edge_dst)]
+        else:
+            src = dst = np.empty(0, dtype=np.int64)
+        self._local[n_id] = -1
+
+        return torch.from_numpy(n_id), torch.from_numpy(np.stack([src, dst]))
+
+    def batches(self, seed_nodes):
+        """Yield (seeds, n_id, edge_index) for one pass over seed_nodes"""
+        seed_nodes = seed_nodes.cpu().numpy() if isinstance(seed_nodes, torch.Tensor) else np.asarray(seed_nodes)
+        seed_nodes = np.unique(seed_nodes.astype(np.int64))
+        if self.shuffle:
+            seed_nodes = self.rng.permutation(seed_nodes)
+        for start in range(0, len(seed_nodes), self.batch_size):
+            n_id, edge_index = self.sample(seed_nodes[start:start + self.batch_size])
+            yield n_id[:min(self.batch_size, len(seed_nodes) - start)], n_id, edge_index
@@ -0,0 +1,61 @@
+import numpy as np
+import torch
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+class TemporalSnapshots:
+    """
+    (window -> next value) training samples over the whole sales history, as graph snapshots.
+
+    Snapshot k holds, for every node with a sales column, the `window` rows before
+    row ends[k] as input and row ends[k] as target; other nodes get zeros. Windows
+    are strided views into the (timesteps x columns) sales matrix, so only the
+    snapshot being trained on is ever materialized, one at a time.
+
+    - columns / nodes: which sales-matrix columns feed which node indices
+    - stride: rows between consecutive snapshot targets
+    - per_epoch: snapshots drawn (without replacement) per training epoch, 0 = all
+    - first_end: earliest target row, e.g. to train only on newly appended rows
+    - validation_snapshots: most recent snapshots used for validation loss
+    """
+
+    def __init__(self, sales_matrix, columns, nodes, num_nodes, window, stride=1, per_epoch=0,
+                 first_end=None, validation_snapshots=8, seed=None):
+        self.values = np.asarray(sales_matrix)
+        self.columns = np.asarray(columns, dtype=np.int64)
+        self.nodes = np.asarray(nodes, dtype=np.int64)
+        self.num_nodes = int(num_nodes)
+        self.window = int(window)
+        self.per_epoch = max(0, int(per_epoch))
+        self.validation_snapshots = max(1, int(validation_snapshots))
+        self.rng = np.random.default_rng(seed)
+
+        # (timesteps - window + 1, columns, window) view: windows[i] covers rows i .. i + window - 1
+        self.windows = sliding_window_view(self.values, self.window, axis=0)
+        self.ends = np.arange(self.window, len(self.values), max(1, int(stride)), dtype=np.int64)
+        if first_end is not None and (self.ends >= first_end).any():
+            self.ends = self.ends[self.ends >= first_end]
+
+    def __len__(self):
+        return len(self.ends)
+
+    def snapshot(self, end):
+        """(x, y) tensors for the snapshot whose target is row `end`: (num_nodes, window, 1), (num_nodes, 1)"""
+        x = np.zeros((self.num_nodes, self.window, 1), dtype=np.float32)
+        x[self.nodes, :, 0] = self.windows[end - self.window][self.columns]
+        y = np.zeros((self.num_nodes, 1), dtype=np.float32)
+        y[self.nodes, 0] = self.values[end, self.columns]
+        return torch.from_numpy(x), torch.from_numpy(y)
+
+    def epoch(self):
+        """Yield (x, y) for one training epoch, in random order"""
+        ends = self.rng.permutation(self.ends)
+        if self.per_epoch:
+            ends = ends[:self.per_epoch]
+        for end in ends:
+            yield self.snapshot(int(end))
+
+    def validation(self):
+        """Yield (x, y) for the most recent snapshots"""
+        for end in self.ends[-self.validation_snapshots:]:
+            yield self.snapshot(int(end))
@@ -0,0 +1,292 @@
+import os
+import mmap
+import uuid
+import hashlib
+import threading
+
+from utils import tensor_format
+
+# GridFS reads and hashing happen in pieces of this size
+STREAM_CHUNK_BYTES = 4 * 1024 * 1024
+
+
+class ArtifactCache:
+    """
+    Local on-disk cache of model blobs, keyed by their sha256.
+
+    - blobs live at <root>/blobs/<sha[:2]>/<sha>; writes go to a temp file and are
+      renamed into place, so readers never see a partial blob
+    - a blob is hashed on the way in and rejected if it doesn't match the expected digest;
+      on first use in a process it is re-hashed, and a corrupt file is dropped
+    - total size is capped at max_bytes, evicting least-recently-used blobs (mtime is
+      touched on every hit); the directory may be shared by several processes, so a blob
+      can vanish between lookup and open, which is treated as a miss
+    - refs map an external identity (e.g. a GridFS file id) to a digest, for sources
+      that don't record the sha256 themselves
+    """
+
+    def __init__(self, root=None, max_bytes=None):
+        if root is None:
+            root = os.getenv('ARTIFACT_CACHE_DIR') or os.path.join(
+                os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'artifact_cache'
+            )
+        if max_bytes is None:
+            max_bytes = int(float(os.getenv('ARTIFACT_CACHE_MAX_MB', '2048')) * 1024 * 1024)
+        self.root = root
+        self.max_bytes = int(max_bytes)
+        self._lock = threading.Lock()
+        self._verified = {}  # sha -> (size, mtime_ns) of the file as last re-hashed or touched by this process
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self.corrupt = 0
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def _blob_path(self, sha256):
+        return os.path.join(self.root, 'blobs', sha256[:2], sha256)
+
+    def _ref_path(self, ref):
+        return os.path.join(self.root, 'refs', hashlib.sha256(ref.encode('utf-8')).hexdigest())
+
+    @staticmethod
+    def _hash_file(path):
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(STREAM_CHUNK_BYTES), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _atomic_write(self, path, chunks):
+        """Write chunks to a temp file next to path; returns (tmp_path, sha256, size) for the caller to rename"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with open(tmp_path, 'wb') as f:
+                for chunk in chunks:
+                    digest.update(chunk)
+                    f.write(chunk)
+                    size += len(chunk)
+                f.flush()
+                os.fsync(f.fileno())
+            return tmp_path, digest.hexdigest(), size
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def path(self, sha256):
+        """Path of a verified cached blob, or None on a miss"""
+        if not self.enabled or not sha256:
+            return None
+        path = self._blob_path(sha256)
+        try:
+            st = os.stat(path)
+            if self._verified.get(sha256) != (st.st_size, st.st_mtime_ns):
+                if self._hash_file(path) != sha256:
+                    print(f"⚠️ Artifact cache: checksum mismatch for {sha256[:12]}, dropping it")
+                    self.corrupt += 1
+                    self.misses += 1
+                    self._remove(path)
+                    return None
+            # Touch for LRU, then remember the new mtime as verified
+            os.utime(path)
+            st = os.stat(path)
+        except FileNotFoundError:
+            # Evicted by another process sharing the directory
+            self._verified.pop(sha256, None)
+            self.misses += 1
+            return None
+        self._verified[sha256] = (st.st_size, st.st_mtime_ns)
+        self.hits += 1
+        return path
+
+    def open(self, sha256):
+        """
+        Copy-on-write memory map of a cached blob (usable wherever bytes are), or None on a miss.
+        Pages are shared between processes until written to; writes never reach the file.
+        """
+        path = self.path(sha256)
+        if path is None:
+            return None
+        try:
+            f = open(path, 'rb')
+        except FileNotFoundError:
+            # Evicted by another process since path() found it
+            self._verified.pop(sha256, None)
+            self.hits -= 1
+            self.misses += 1
+            return None
+        with f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return b''
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    def put(self, chunks, expected_sha256=None):
+        """
+        Store a blob from an iterable of byte chunks (or one bytes object).
+        Raises ValueError when the content does not match expected_sha256. Returns the sha256.
+        """
+        if isinstance(chunks, (bytes, bytearray, memoryview)):
+            chunks = [chunks]
+        staging = os.path.join(self.root, 'blobs', 'incoming')
+        tmp_path, sha256, size = self._atomic_write(os.path.join(staging, 'blob'), chunks)
+        if expected_sha256 and sha256 != expected_sha256:
+            os.remove(tmp_path)
+            raise ValueError(f"Artifact checksum mismatch: expected {expected_sha256}, got {sha256}")
+        final_path = self._blob_path(sha256)
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        os.replace(tmp_path, final_path)
+        st = os.stat(final_path)
+        self._verified[sha256] = (st.st_size, st.st_mtime_ns)
+        self.writes += 1
+        self._evict(keep=final_path)
+        return sha256
+
+    def resolve(self, ref):
+        """sha256 recorded for an external identity, or None"""
+        if not self.enabled:
+            return None
+        try:
+            with open(self._ref_path(ref), 'r') as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+
+    def set_ref(self, ref, sha256):
+        path = self._ref_path(ref)
+        tmp_path, _, _ = self._atomic_write(path, [sha256.encode('ascii')])
+        os.replace(tmp_path, path)
+
+    def discard(self, sha256):
+        """Remove a blob (e.g. one its owner no longer references)"""
+        self._verified.pop(sha256, None)
+        self._remove(self._blob_path(sha256))
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _blobs(self):
+        blobs_dir = os.path.join(self.root, 'blobs')
+        if not os.path.isdir(blobs_dir):
+            return []
+        entries = []
+        for prefix in os.listdir(blobs_dir):
+            if prefix == 'incoming':
+                continue
+            prefix_dir = os.path.join(blobs_dir, prefix)
+            for name in os.listdir(prefix_dir):
+                if name.endswith('.tmp'):
+                    continue
+                path = os.path.join(prefix_dir, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime_ns, st.st_size, path))
+        return entries
+
+    def _evict(self, keep=None):
+        """Drop least-recently-used blobs until the cache fits in max_bytes"""
+        with self._lock:
+            entries = sorted(self._blobs())
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                if path == keep:
+                    continue
+                self._remove(path)
+                total -= size
+                self.evictions += 1
+
+    def stats(self):
+        entries = self._blobs() if self.enabled else []
+        return {
+            'enabled': self.enabled,
+            'root': self.root,
+            'entries': len(entries),
+            'current_bytes': sum(size for _, size, _ in entries),
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'writes': self.writes,
+            'evictions': self.evictions,
+            'corrupt': self.corrupt
+        }
+
+
+def load_model_blob(cache, sha256, ref, fetch):
+    """
+    Serialized model state, served from the artifact cache when possible.
+
+    - sha256: digest recorded by the model store, if any
+    - ref: store-specific name of this exact blob, for blobs without a recorded digest
+    - fetch(): the blob from the store, as bytes or an iterable of byte chunks (streamed
+      into the cache rather than held in memory)
+
+    Returns (bytes or copy-on-write mmap, sha256 or None when uncached).
+    """
+    caching = cache is not None and cache.enabled
+    if caching:
+        known = sha256 or (cache.resolve(ref) if ref else None)
+        blob = cache.open(known) if known else None
+        if blob is not None:
+            return blob, known
+
+    data = fetch()
+    if not caching:
+        if not isinstance(data, (bytes, bytearray, memoryview)):
+            data = b''.join(data)
+        return data, None
+    stored = cache.put(data, expected_sha256=sha256)
+    if ref and not sha256:
+        cache.set_ref(ref, stored)
+    blob = cache.open(stored)
+    if blob is None:
+        # Evicted by another process right after the write; data may have been a consumed stream
+        data = fetch()
+        if not isinstance(data, (bytes, bytearray, memoryview)):
+            data = b''.join(data)
+        return data, None
+    return blob, stored
+
+
+def load_model_state(cache, sha256, ref, fetch):
+    """
+    State dict for a stored model blob (arguments as for load_model_blob).
+
+    Tensor-container blobs are mapped straight from the cache (see utils/tensor_format.py).
+    Legacy pickled blobs are unpickled once, then kept in the cache converted to the
+    container format (ref tensors:<legacy sha256>), so later loads skip unpickling.
+    """
+    caching = cache is not None and cache.enabled
+    if caching:
+        known = sha256 or (cache.resolve(ref) if ref else None)
+        converted = cache.resolve(f"tensors:{known}") if known else None
+        blob = cache.open(converted) if converted else None
+        if blob is not None:
+            return tensor_format.loads(blob)
+
+    blob, stored = load_model_blob(cache, sha256, ref, fetch)
+    if tensor_format.is_tensor_container(blob):
+        return tensor_format.loads(blob)
+    try:
+        state = tensor_format.load_state(blob)
+    finally:
+        if isinstance(blob, mmap.mmap):
+            blob.close()
+    if caching and stored:
+        try:
+            cache.set_ref(f"tensors:{stored}", cache.put(tensor_format.dumps(state)))
+        except Exception as e:
+            print(f"⚠️ Artifact cache: could not store converted model: {e}")
+    return state
@@ -0,0 +1,241 @@
+import os
+import sys
+import time
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import torch
+
+
+def _packed_nbytes(obj):
+    """Bytes held by quantized packed weights (torch.ScriptObject), which are neither parameters nor buffers"""
+    if isinstance(obj, torch.Tensor):
+        return obj.numel() * obj.element_size()
+    if isinstance(obj, (tuple, list)):
+        return sum(_packed_nbytes(v) for v in obj)
+    if isinstance(obj, torch.ScriptObject) and hasattr(obj, '__getstate__'):
+        return _packed_nbytes(obj.__getstate__())
+    return 0
+
+
+def estimate_nbytes(obj, _seen=None):
+    """Rough resident size of a cached value (tensors, arrays, modules, containers)"""
+    if _seen is None:
+        _seen = set()
+    if id(obj) in _seen:
+        return 0
+    _seen.add(id(obj))
+
+    if isinstance(obj, torch.nn.Module):
+        size = sum(t.numel() * t.element_size() for t in obj.parameters())
+        size += sum(t.numel() * t.element_size() for t in obj.buffers())
+        # Dynamically quantized layers keep their weights in packed state_dict entries
+        size += sum(_packed_nbytes(v) for v in obj.state_dict().values() if not isinstance(v, torch.Tensor))
+        if isinstance(obj, torch.jit.ScriptModule):
+            # Frozen TorchScript graphs hold their weights as graph constants
+            size += sum(_packed_nbytes(node.output().toIValue()) for node in obj.graph.findAllNodes('prim::Constant'))
+        return size
+    if isinstance(obj, torch.Tensor):
+        return obj.numel() * obj.element_size()
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if hasattr(obj, 'memory_usage') and hasattr(obj, 'columns'):
+        # pandas DataFrame
+        return int(obj.memory_usage(index=True, deep=True).sum())
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(
+            estimate_nbytes(k, _seen) + estimate_nbytes(v, _seen) for k, v in obj.items()
+        )
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return sys.getsizeof(obj) + sum(estimate_nbytes(v, _seen) for v in obj)
+    return sys.getsizeof(obj)
+
+
+def file_fingerprint(path):
+    """(path, size, mtime_ns) of a file, or None when it does not exist"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (path, st.st_size, st.st_mtime_ns)
+
+
+_MISSING = object()
+
+
+class _InFlight:
+    """A value being computed by one thread that others wait for"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+        # Bumped by invalidate(); the result of a compute that saw a bump is not stored
+        self.generation = 0
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache bounded by an approximate memory budget (bytes) and a TTL.
+
+    Entries are evicted least-recently-used first once the sum of their sizes
+    exceeds max_bytes (or the entry count exceeds max_entries, when set).
+    An entry larger than the whole budget is never stored.
+    """
+
+    def __init__(self, max_bytes, ttl_seconds=None, sizeof=estimate_nbytes, name='cache', max_entries=None):
+        self.max_bytes = int(max_bytes)
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.sizeof = sizeof
+        self.name = name
+        self._entries = OrderedDict()  # key -> (value, nbytes, stored_at)
+        self._inflight = {}  # key -> _InFlight
+        self._lock = threading.RLock()
+        self._current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.coalesced = 0
+        self.stale_discards = 0
+
+    def _expired(self, stored_at, now):
+        return self.ttl_seconds is not None and self.ttl_seconds > 0 and now - stored_at > self.ttl_seconds
+
+    def _remove(self, key):
+        _, nbytes, _ = self._entries.pop(key)
+        self._current_bytes -= nbytes
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, _, stored_at = entry
+            if self._expired(stored_at, time.monotonic()):
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, nbytes=None):
+        if nbytes is None:
+            nbytes = self.sizeof(value)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if nbytes > self.max_bytes:
+                return False
+            while self._entries and (
+                self._current_bytes + nbytes > self.max_bytes
+                or (self.max_entries is not None and len(self._entries) >= self.max_entries)
+            ):
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+            self._entries[key] = (value, nbytes, time.monotonic())
+            self._current_bytes += nbytes
+            return True
+
+    def get_or_compute(self, key, compute):
+        """
+        Return the cached value for key, or compute and store it.
+        Concurrent misses on the same key wait for a single compute() instead of
+        stampeding; an exception from compute() is raised in every waiter.
+        A key invalidated while its compute() runs gets the result returned to the
+        callers already waiting, but not stored, and later misses start a new compute().
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        with self._lock:
+            inflight = self._inflight.get(key)
+            owner = inflight is None
+            if owner:
+                inflight = self._inflight[key] = _InFlight()
+                generation = inflight.generation
+
+        if not owner:
+            inflight.event.wait()
+            with self._lock:
+                self.coalesced += 1
+            if inflight.error is not None:
+                raise inflight.error
+            return inflight.value
+
+        try:
+            value = compute()
+            with self._lock:
+                if inflight.generation == generation:
+                    self.put(key, value)
+                else:
+                    self.stale_discards += 1
+            inflight.value = value
+            return value
+        except Exception as e:
+            inflight.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._inflight.get(key) is inflight:
+                    del self._inflight[key]
+            inflight.event.set()
+
+    def invalidate(self, key=None, predicate=None):
+        """
+        Drop one key, every key matching predicate(key, value), or everything.
+        Computes in flight for a matching key are invalidated too; predicate sees them with value None.
+        """
+        with self._lock:
+            if key is not None:
+                keys = [key] if key in self._entries else []
+                pending = [key] if key in self._inflight else []
+            elif predicate is not None:
+                keys = [k for k, (v, _, _) in self._entries.items() if predicate(k, v)]
+                pending = [k for k in self._inflight if predicate(k, None)]
+            else:
+                keys = list(self._entries)
+                pending = list(self._inflight)
+            for k in keys:
+                self._remove(k)
+            for k in pending:
+                self._inflight.pop(k).generation += 1
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def __contains__(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and not self._expired(entry[2], time.monotonic())
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'name': self.name,
+                'entries': len(self._entries),
+                'current_bytes': self._current_bytes,
+                'max_bytes': self.max_bytes,
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+                'coalesced': self.coalesced,
+                'stale_discards': self.stale_discards
+            }
@@ -0,0 +1,165 @@
+import copy
+import time
+
+import numpy as np
+import torch
+
+from utils.graph_builder import self_loop_edge_index
+
+# eager: float32 as always; compile: torch.compile the LSTM and output layer;
+# bf16: CPU autocast to bfloat16; compile_bf16: both
+EXECUTION_MODES = ('eager', 'compile', 'bf16', 'compile_bf16')
+
+# Nodes used for the probe pass that checks a mode actually runs
+PROBE_NODES = 64
+
+
+def native_bf16_supported():
+    """Whether the CPU has bfloat16 instructions (AVX512-BF16 or AMX); True when torch can't tell"""
+    checks = [getattr(torch.cpu, name, None) for name in ('_is_avx512_bf16_supported', '_is_amx_tile_supported')]
+    checks = [check for check in checks if check is not None]
+    if not checks:
+        return True
+    return any(check() for check in checks)
+
+
+def _compiled_parts(model):
+    # GATConv stays eager: its message passing changes shape with every graph
+    return [model.lstm, model.lin]
+
+
+def _reset(model):
+    for module in _compiled_parts(model):
+        module._compiled_call_impl = None
+    model.autocast_dtype = None
+
+
+def _probe(model, train):
+    """One small forward (and backward when training) pass, to surface compile/autocast failures up front"""
+    x = torch.zeros(PROBE_NODES, model.max_timesteps, 1)
+    edge_index = self_loop_edge_index(PROBE_NODES)
+    if train:
+        out = model(x, edge_index)
+        out.float().sum().backward()
+        model.zero_grad(set_to_none=True)
+    else:
+        with torch.no_grad():
+            model(x, edge_index)
+
+
+def configure_execution(model, mode, train=False):
+    """
+    Switch a HybridGATLSTM to an execution mode, in place; returns the mode in effect.
+
+    Falls back to eager float32, with the reason printed, when the mode is unknown,
+    bfloat16 has no native CPU support, or a probe pass in the new mode fails.
+    Parameters and state_dict keys are unchanged in every mode.
+    """
+    mode = (mode or 'eager').lower()
+    _reset(model)
+    if mode == 'eager':
+        return 'eager'
+    if mode not in EXECUTION_MODES:
+        print(f"Unknown execution mode '{mode}', using eager")
+        return 'eager'
+    if 'bf16' in mode and not native_bf16_supported():
+        print("bfloat16 autocast skipped: no native bfloat16 support on this CPU")
+        mode = 'compile' if 'compile' in mode else 'eager'
+        if mode == 'eager':
+            return mode
+
+    was_training = model.training
+    try:
+        if 'compile' in mode:
+            # dynamic: the node count changes with every graph / mini-batch
+            for module in _compiled_parts(model):
+                module.compile(dynamic=True)
+        if 'bf16' in mode:
+            model.autocast_dtype = torch.bfloat16
+        model.train(train)
+        _probe(model, train)
+    except Exception as e:
+        print(f"Execution mode '{mode}' unavailable, using eager: {e}")
+        _reset(model)
+        mode = 'eager'
+    finally:
+        model.train(was_training)
+    return mode
+
+
+def _eager_copy(model):
+    """Independent eager float32 copy of a possibly compiled model"""
+    saved = [(module, module._compiled_call_impl) for module in _compiled_parts(model)]
+    saved_dtype = model.autocast_dtype
+    _reset(model)
+    try:
+        clone = copy.deepcopy(model)
+    finally:
+        for module, compiled in saved:
+            module._compiled_call_impl = compiled
+        model.autocast_dtype = saved_dtype
+    return clone
+
+
+def median_ms(fn, repeats):
+    fn()  # warm-up (compilation, allocator)
+    times = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - started) * 1000)
+    return float(np.median(times))
+
+
+def compare_execution_modes(model, x, edge_index, modes=EXECUTION_MODES, repeats=5):
+    """
+    Step time and output drift of each execution mode against eager float32, on the same inputs.
+
+    Per mode: the mode in effect (after any fallback), median inference and training-step
+    (forward + backward) time in ms, speedup over eager, and max / mean absolute
+    difference of the eval-mode outputs from eager.
+    """
+    repeats = max(1, int(repeats))
+    reference = None
+    eager_times = None
+    report = {}
+    # eager first: it is the reference for every other mode
+    for mode in ['eager'] + [m for m in modes if m != 'eager']:
+        candidate = _eager_copy(model)
+        effective = configure_execution(candidate, mode, train=True)
+
+        candidate.eval()
+        with torch.no_grad():
+            out = candidate(x, edge_index).float()
+            inference_ms = median_ms(lambda: candidate(x, edge_index), repeats)
+
+        candidate.train()
+
+        def train_step():
+            candidate(x, edge_index).float().sum().backward()
+            candidate.zero_grad(set_to_none=True)
+
+        train_ms = median_ms(train_step, repeats)
+
+        if reference is None:
+            reference, eager_times = out, (inference_ms, train_ms)
+        diff = (out - reference).abs()
+        report[mode] = {
+            'effective_mode': effective,
+            'inference_ms': round(inference_ms, 3),
+            'train_step_ms': round(train_ms, 3),
+            'inference_speedup': round(eager_times[0] / inference_ms, 3) if inference_ms else None,
+            'train_speedup': round(eager_times[1] / train_ms, 3) if train_ms else None,
+            'max_abs_diff': float(diff.max()) if diff.numel() else 0.0,
+            'mean_abs_diff': float(diff.mean()) if diff.numel() else 0.0,
+            'max_rel_diff': float(diff.max() / reference.abs().max().clamp_min(1e-12)) if diff.numel() else 0.0
+        }
+    return {
+        'reference': 'eager',
+        'num_nodes': int(x.size(0)),
+        'timesteps': int(x.size(1)),
+        'repeats': repeats,
+        'torch_threads': torch.get_num_threads(),
+        'native_bf16': native_bf16_supported(),
+        'modes': report
+    }
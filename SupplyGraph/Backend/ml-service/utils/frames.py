@@ -0,0 +1,32 @@
+import pandas as pd
+
+
+def find_date_column(columns):
+    """First column named 'date' or 'timestamp' (case-insensitive), or None"""
+    for col in columns:
+        if str(col).lower() in ('date', 'timestamp'):
+            return col
+    return None
+
+
+def sort_by_date(df, date_col=None):
+    """Copy of df with its date column parsed and rows sorted by it (unchanged if unparseable)"""
+    if date_col is None:
+        date_col = find_date_column(df.columns)
+    if date_col is None:
+        return df.copy()
+    try:
+        parsed = df.assign(**{date_col: pd.to_datetime(df[date_col], errors='coerce')})
+        return parsed.sort_values(date_col)
+    except Exception:
+        return df.copy()
+
+
+def numeric_frame(frame, columns):
+    """frame[columns] coerced to numbers, converting only the non-numeric columns"""
+    block = frame[columns]
+    non_numeric = block.select_dtypes(exclude='number').columns
+    if len(non_numeric):
+        block = block.copy()
+        block[non_numeric] = block[non_numeric].apply(pd.to_numeric, errors='coerce')
+    return block
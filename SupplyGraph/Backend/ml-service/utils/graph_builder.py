@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+import torch
+
+
+def normalize_node_names(values):
+    """Strip + upper-case node identifiers; missing values become ''"""
+    return pd.Series(values, dtype=object).fillna('').astype(str).str.strip().str.upper()
+
+
+def node_indexer(node_list):
+    """
+    Case-insensitive lookup from normalized node name to position in node_list.
+    When two nodes normalize to the same name the later one wins.
+    """
+    names = pd.Index(normalize_node_names(node_list))
+    positions = np.arange(len(names))
+    if not names.is_unique:
+        keep = ~names.duplicated(keep='last')
+        names = names[keep]
+        positions = positions[keep]
+    return names, positions
+
+
+def map_to_node_indices(values, names, positions):
+    """Vectorized lookup of raw node identifiers; unknown or empty names map to -1"""
+    normalized = normalize_node_names(values)
+    found = names.get_indexer(normalized)
+    codes = np.where(found >= 0, positions[np.maximum(found, 0)], -1)
+    codes[(normalized == '').to_numpy()] = -1
+    return codes
+
+
+def self_loop_edge_index(num_nodes):
+    """Self-loop edge_index for every node (fallback when no graph is available)"""
+    if num_nodes <= 0:
+        return torch.empty((2, 0), dtype=torch.long)
+    indices = torch.arange(num_nodes, dtype=torch.long)
+    return torch.stack([indices, indices], dim=0)
+
+
+def build_edge_index(edges_df, node_list, verbose=False):
+    """
+    Build edge_index from Edges (Plant).csv format (Plant, node1, node2).
+
+    - Creates directed edges Plant->node1, Plant->node2 and node1->node2 per row,
+      in row order, whenever both endpoints are known nodes
+    - Case-insensitive matching
+    - Adds self-loops for nodes left without any edge
+
+    Shared by training and prediction so both see the same graph.
+    """
+    num_nodes = len(node_list)
+    if edges_df is None or len(edges_df) == 0:
+        if verbose:
+            print("⚠️ No edges data, using self-loops")
+        return self_loop_edge_index(num_nodes)
+
+    names, positions = node_indexer(node_list)
+
+    def column_codes(col):
+        if col not in edges_df.columns:
+            return np.full(len(edges_df), -1, dtype=np.int64)
+        return map_to_node_indices(edges_df[col].to_numpy(), names, positions)
+
+    plant = column_codes('Plant')
+    node1 = column_codes('node1')
+    node2 = column_codes('node2')
+
+    # Row-major interleave keeps the (Plant-node1, Plant-node2, node1-node2) order of each row
+    src = np.stack([plant, plant, node1], axis=1).ravel()
+    dst = np.stack([node1, node2, node2], axis=1).ravel()
+    valid = (src >= 0) & (dst >= 0)
+    src = src[valid]
+    dst = dst[valid]
+
+    if verbose:
+        print(f"  Created {len(src)} directed edges from {len(edges_df)} edge records")
+
+    # Self-loops for isolated nodes
+    degree = np.bincount(np.concatenate([src, dst]), minlength=num_nodes)
+    isolated = np.flatnonzero(degree == 0)
+    if len(isolated):
+        src = np.concatenate([src, isolated])
+        dst = np.concatenate([dst, isolated])
+        if verbose:
+            print(f"  Added {len(isolated)} self-loops for isolated nodes")
+
+    if len(src) == 0:
+        if verbose:
+            print("  ⚠️ No valid edges created, using fallback")
+        return self_loop_edge_index(num_nodes)
+
+    return torch.from_numpy(np.stack([src, dst]).astype(np.int64, copy=False))
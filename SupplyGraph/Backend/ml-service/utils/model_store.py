@@ -0,0 +1,543 @@
+import os
+import sys
+import abc
+import json
+import time
+import uuid
+import base64
+import hashlib
+import sqlite3
+import datetime
+import threading
+import contextlib
+
+import numpy as np
+
+from bson import ObjectId, Decimal128
+from pymongo import ReturnDocument
+
+from utils import tensor_format
+from utils.artifact_cache import ArtifactCache, load_model_blob, load_model_state
+from utils.mongo import get_connection
+
+# kind -> (MongoDB collection, key field)
+KINDS = {
+    'base': ('models', '_id'),
+    'company': ('company_models', 'company_id')
+}
+
+BASE_MODEL_ID = 'base_gat_lstm_model'
+
+# Metadata reads never include the serialized weights; load_state() fetches those
+BLOB_FIELDS = {'model_storage.model_bytes': 0, 'model_data': 0, 'artifact_blobs': 0}
+
+
+def _blob_storage(blob, sha256):
+    return {
+        'size_mb': len(blob) / (1024 * 1024),
+        'sha256': sha256,
+        'format': 'tensors' if tensor_format.is_tensor_container(blob) else 'pickle'
+    }
+
+
+class ModelStore(abc.ABC):
+    """
+    Where model documents and their serialized weights live.
+
+    A model is addressed by kind ('base' or 'company') and key (model id / company id).
+    Its document holds the metadata (architecture, node list, scalers, metrics, ...) plus
+    'model_version' and 'model_storage' (sha256, size, format), both maintained by put().
+
+    - get(kind, key): metadata document without the weights, or None
+    - exists / version / list: cheap lookups that don't touch the weights
+    - put(kind, key, doc, blob, artifacts): store a new version, optionally with derived
+      artifacts (e.g. an exported inference graph); returns its model_version
+    - load_state(kind, doc, cache): state dict of a document returned by get()
+    - load_artifact(kind, doc, name, cache): an artifact of that document's version, or None
+
+    Each operation's latency is recorded separately (stats()), so storage time can be
+    told apart from model compute.
+    """
+
+    name = None
+
+    def __init__(self):
+        self._timings = {}
+        self._timings_lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def _timed(self, op):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            with self._timings_lock:
+                count, total_ms, max_ms = self._timings.get(op, (0, 0.0, 0.0))
+                self._timings[op] = (count + 1, total_ms + elapsed_ms, max(max_ms, elapsed_ms))
+
+    @property
+    def available(self):
+        return True
+
+    @abc.abstractmethod
+    def get(self, kind, key):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def exists(self, kind, key):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def version(self, kind, key):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def list(self, kind):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def put(self, kind, key, doc, blob, cache=None, artifacts=None):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def load_state(self, kind, doc, cache=None):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def load_artifact(self, kind, doc, name, cache=None):
+        raise NotImplementedError
+
+    @staticmethod
+    def _summary(kind, doc):
+        return {
+            'key': doc.get(KINDS[kind][1]),
+            'model_version': doc.get('model_version'),
+            'model_type': doc.get('model_type'),
+            'created_at': doc.get('created_at')
+        }
+
+    def stats(self):
+        with self._timings_lock:
+            timings = dict(self._timings)
+        return {
+            'backend': self.name,
+            'available': self.available,
+            'operations': {
+                op: {
+                    'count': count,
+                    'total_ms': round(total_ms, 3),
+                    'mean_ms': round(total_ms / count, 3) if count else 0.0,
+                    'max_ms': round(max_ms, 3)
+                }
+                for op, (count, total_ms, max_ms) in timings.items()
+            }
+        }
+
+
+class MongoModelStore(ModelStore):
+    """
+    Models in MongoDB: base models in 'models', company models in 'company_models'.
+    Weights are embedded in the document, or put in GridFS above GRIDFS_THRESHOLD_MB.
+    """
+
+    name = 'mongodb'
+    # MongoDB documents are capped at 16MB
+    GRIDFS_THRESHOLD_MB = 15
+
+    def __init__(self, connection=None, db=None):
+        super().__init__()
+        # db: a database object to use as is, instead of the shared connection's
+        self.connection = connection if connection is not None else get_connection()
+        self._db = db
+
+    @property
+    def db(self):
+        return self._db if self._db is not None else self.connection.db()
+
+    @property
+    def available(self):
+        # Configured rather than reachable: checking reachability would block on the server
+        return self._db is not None or self.connection.configured
+
+    def _collection(self, kind):
+        try:
+            db = self.db
+        except Exception as e:
+            raise Exception(f"MongoDB connection not available: {e}")
+        return getattr(db, KINDS[kind][0])
+
+    @staticmethod
+    def _filter(kind, key):
+        return {KINDS[kind][1]: key}
+
+    def get(self, kind, key):
+        with self._timed('get'):
+            return self._collection(kind).find_one(self._filter(kind, key), BLOB_FIELDS)
+
+    def exists(self, kind, key):
+        with self._timed('exists'):
+            return self._collection(kind).find_one(self._filter(kind, key), {'_id': 1}) is not None
+
+    def version(self, kind, key):
+        with self._timed('version'):
+            doc = self._collection(kind).find_one(self._filter(kind, key), {'model_version': 1})
+            return (doc or {}).get('model_version')
+
+    def list(self, kind):
+        with self._timed('list'):
+            projection = {KINDS[kind][1]: 1, 'model_version': 1, 'model_type': 1, 'created_at': 1}
+            return [self._summary(kind, doc) for doc in self._collection(kind).find({}, projection)]
+
+    def _gridfs_put(self, kind, key, filename, blob):
+        import gridfs
+        fs = gridfs.GridFS(self.db)
+
+        for old_file in list(fs.find({"filename": filename})):
+            fs.delete(old_file._id)
+
+        file_id = fs.put(
+            blob,
+            filename=filename,
+            upload_date=datetime.datetime.now(),
+            **({'company_id': key} if kind == 'company' else {'model_id': key})
+        )
+        return str(file_id)
+
+    def _gridfs_chunks(self, file_id):
+        import gridfs
+        from bson import ObjectId
+        # Streamed chunk-wise into the cache rather than read into memory
+        grid_out = gridfs.GridFS(self.db).get(ObjectId(file_id))
+        return iter(grid_out.readchunk, b'')
+
+    def _refetch(self, kind, doc, projection):
+        """Fields left out of a get() projection, from the same version of the document"""
+        doc_filter = {'_id': doc['_id']}
+        for field in ('model_version', 'created_at'):
+            if field in doc:
+                doc_filter[field] = doc[field]
+        full = self._collection(kind).find_one(doc_filter, projection)
+        if full is None:
+            raise Exception("Model document changed while loading; retry")
+        return full
+
+    def _next_version(self, kind, key):
+        """
+        model_version for the next put() of a model, issued atomically so concurrent writers
+        never get the same one. The counter lives in the 'model_versions' collection rather
+        than in the model document, so readers never see a version whose weights aren't
+        written yet; it is raised to the stored document's version first (models saved before
+        the counter existed).
+        """
+        counters = self.db.model_versions
+        counter_id = f"{kind}:{key}"
+        previous = self._collection(kind).find_one(self._filter(kind, key), {'model_version': 1})
+        stored = int((previous or {}).get('model_version') or 0)
+        if stored:
+            counters.update_one({'_id': counter_id}, {'$max': {'version': stored}}, upsert=True)
+        counter = counters.find_one_and_update(
+            {'_id': counter_id}, {'$inc': {'version': 1}}, upsert=True, return_document=ReturnDocument.AFTER
+        )
+        return counter['version']
+
+    def put(self, kind, key, doc, blob, cache=None, artifacts=None):
+        """
+        Store a new version of a model; cache (an ArtifactCache) gets a write-through copy of the blob.
+        artifacts: {name: (blob, metadata)} stored with this version (see load_artifact())
+        """
+        with self._timed('put'):
+            collection = self._collection(kind)
+            blob = bytes(blob)
+            storage = _blob_storage(blob, hashlib.sha256(blob).hexdigest())
+
+            # _id comes from the filter (base models) or is kept (company models)
+            doc = {k: v for k, v in doc.items() if k not in ('_id', 'model_version', 'model_storage')}
+            if KINDS[kind][1] != '_id':
+                doc[KINDS[kind][1]] = key
+            doc['model_version'] = self._next_version(kind, key)
+
+            # Use GridFS for large models
+            if storage['size_mb'] > self.GRIDFS_THRESHOLD_MB:
+                print("Using GridFS for large model...")
+                file_id = self._gridfs_put(kind, key, f"{kind}_{key}_model", blob)
+                doc['model_storage'] = dict(type='gridfs', file_id=file_id, **storage)
+            else:
+                doc['model_storage'] = dict(type='embedded', model_bytes=blob, **storage)
+
+            # Artifacts of the previous version are replaced as a whole
+            doc['artifacts'] = {}
+            doc['artifact_blobs'] = {}
+            for name, (artifact, metadata) in (artifacts or {}).items():
+                artifact = bytes(artifact)
+                entry = dict(metadata, size_mb=len(artifact) / (1024 * 1024),
+                             sha256=hashlib.sha256(artifact).hexdigest())
+                if entry['size_mb'] > self.GRIDFS_THRESHOLD_MB:
+                    entry.update(type='gridfs', file_id=self._gridfs_put(kind, key, f"{kind}_{key}_{name}", artifact))
+                else:
+                    entry['type'] = 'embedded'
+                    doc['artifact_blobs'][name] = artifact
+                doc['artifacts'][name] = entry
+
+            # Legacy per-node scaler dicts and top-level weights are superseded by this version
+            collection.update_one(
+                self._filter(kind, key),
+                {'$set': doc, '$unset': {'scalers': '', 'model_data': ''}},
+                upsert=True
+            )
+
+        # Write-through so a predictor sharing this cache directory skips the download
+        if cache is not None and cache.enabled:
+            try:
+                cache.put(blob, expected_sha256=storage['sha256'])
+                for name, (artifact, _) in (artifacts or {}).items():
+                    cache.put(artifact, expected_sha256=doc['artifacts'][name]['sha256'])
+            except Exception as cache_error:
+                print(f"Artifact cache write failed: {cache_error}")
+        return doc['model_version']
+
+    def load_state(self, kind, doc, cache=None):
+        """State dict for a document from get(), served from the artifact cache when possible"""
+        storage = doc.get('model_storage') or {}
+        version = doc.get('model_version') or doc.get('created_at')
+        if storage.get('type') == 'gridfs':
+            ref = f"gridfs:{storage['file_id']}"
+        else:
+            ref = f"{KINDS[kind][0]}:{doc.get('_id')}:{version}" if version is not None else None
+
+        def fetch():
+            if storage.get('type') == 'gridfs':
+                return self._gridfs_chunks(storage['file_id'])
+            data = storage.get('model_bytes')
+            if data is not None:
+                return data
+            if 'model_data' in doc:
+                return doc['model_data']
+            # Fetched without the embedded bytes: get just those
+            full = self._refetch(kind, doc, {'model_storage.model_bytes': 1, 'model_data': 1})
+            return (full.get('model_storage') or {}).get('model_bytes') or full.get('model_data', b'')
+
+        with self._timed('load'):
+            return load_model_state(cache, storage.get('sha256'), ref, fetch)
+
+    def load_artifact(self, kind, doc, name, cache=None):
+        """Bytes (or a copy-on-write mmap) of an artifact stored with a document's version, or None"""
+        entry = (doc.get('artifacts') or {}).get(name)
+        if not entry:
+            return None
+
+        def fetch():
+            if entry.get('type') == 'gridfs':
+                return self._gridfs_chunks(entry['file_id'])
+            full = self._refetch(kind, doc, {f'artifact_blobs.{name}': 1})
+            return (full.get('artifact_blobs') or {})[name]
+
+        with self._timed('load_artifact'):
+            return load_model_blob(cache, entry['sha256'], None, fetch)[0]
+
+
+def _encode_value(value):
+    """JSON form of a value json can't encode, tagged like MongoDB extended JSON"""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return {'$binary': base64.b64encode(bytes(value)).decode('ascii')}
+    if isinstance(value, datetime.datetime):
+        return {'$date': value.isoformat()}
+    if isinstance(value, ObjectId):
+        return {'$oid': str(value)}
+    if isinstance(value, Decimal128):
+        return {'$numberDecimal': str(value)}
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    # Anything else would come back as a different type than MongoModelStore returns
+    raise TypeError(f"Can't store {type(value).__name__} in a local model document")
+
+
+def _decode_value(obj):
+    if len(obj) == 1:
+        if '$binary' in obj:
+            return base64.b64decode(obj['$binary'])
+        if '$date' in obj:
+            return datetime.datetime.fromisoformat(obj['$date'])
+        if '$oid' in obj:
+            return ObjectId(obj['$oid'])
+        if '$numberDecimal' in obj:
+            return Decimal128(obj['$numberDecimal'])
+    return obj
+
+
+class LocalModelStore(ModelStore):
+    """
+    Models on local disk, for running without network access.
+
+    <root>/index.sqlite holds one row per (kind, key) with the current version and its
+    document as JSON (bytes and datetimes tagged like MongoDB extended JSON); weights
+    and artifacts are sha256-addressed blobs under <root>/blobs, loaded by memory-mapping
+    them, so no separate artifact cache is involved. A blob no other model refers to is
+    removed when its model gets a new version.
+    """
+
+    name = 'local'
+
+    def __init__(self, root=None):
+        super().__init__()
+        if root is None:
+            root = os.getenv('MODEL_STORE_DIR') or os.path.join(
+                os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'model_store'
+            )
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        # Never evicts: this is the only copy of the weights
+        self.blobs = ArtifactCache(root=root, max_bytes=sys.maxsize)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(root, 'index.sqlite'), timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            # WAL: training worker processes write while the service reads
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS models ("
+                "kind TEXT NOT NULL, key TEXT NOT NULL, version INTEGER NOT NULL, "
+                "sha256 TEXT NOT NULL, created_at TEXT, doc TEXT NOT NULL, "
+                "PRIMARY KEY (kind, key))"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS artifacts ("
+                "kind TEXT NOT NULL, key TEXT NOT NULL, name TEXT NOT NULL, sha256 TEXT NOT NULL, "
+                "PRIMARY KEY (kind, key, name))"
+            )
+
+    def _query(self, sql, params):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def get(self, kind, key):
+        with self._timed('get'):
+            rows = self._query("SELECT doc FROM models WHERE kind = ? AND key = ?", (kind, key))
+            return json.loads(rows[0][0], object_hook=_decode_value) if rows else None
+
+    def exists(self, kind, key):
+        with self._timed('exists'):
+            return bool(self._query("SELECT 1 FROM models WHERE kind = ? AND key = ?", (kind, key)))
+
+    def version(self, kind, key):
+        with self._timed('version'):
+            rows = self._query("SELECT version FROM models WHERE kind = ? AND key = ?", (kind, key))
+            return rows[0][0] if rows else None
+
+    def list(self, kind):
+        with self._timed('list'):
+            rows = self._query("SELECT doc FROM models WHERE kind = ? ORDER BY key", (kind,))
+            return [self._summary(kind, json.loads(doc, object_hook=_decode_value)) for doc, in rows]
+
+    def put(self, kind, key, doc, blob, cache=None, artifacts=None):
+        """Store a new version of a model (cache is not used: the blobs already are local)"""
+        with self._timed('put'):
+            sha256 = self.blobs.put(blob)
+            storage = _blob_storage(blob, sha256)
+
+            doc = {k: v for k, v in doc.items() if k not in ('model_version', 'model_storage')}
+            doc[KINDS[kind][1]] = key
+            doc['model_storage'] = dict(type='local', **storage)
+            doc['artifacts'] = {
+                name: dict(metadata, type='local', size_mb=len(artifact) / (1024 * 1024), sha256=self.blobs.put(artifact))
+                for name, (artifact, metadata) in (artifacts or {}).items()
+            }
+            with self._lock, self._conn:
+                # Write lock before reading the current version: training worker processes write too
+                self._conn.execute("BEGIN IMMEDIATE")
+                row = self._conn.execute(
+                    "SELECT version, doc FROM models WHERE kind = ? AND key = ?", (kind, key)
+                ).fetchone()
+                previous = json.loads(row[1], object_hook=_decode_value) if row else {}
+                # Same ids a MongoDB collection would give: the key for base models, else a generated one
+                doc['_id'] = previous.get('_id') or (key if kind == 'base' else uuid.uuid4().hex)
+                doc['model_version'] = (row[0] if row else 0) + 1
+                created_at = doc.get('created_at')
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO models (kind, key, version, sha256, created_at, doc) VALUES (?, ?, ?, ?, ?, ?)",
+                    (kind, key, doc['model_version'], sha256,
+                     created_at.isoformat() if isinstance(created_at, datetime.datetime) else created_at,
+                     json.dumps(doc, default=_encode_value))
+                )
+                self._conn.execute("DELETE FROM artifacts WHERE kind = ? AND key = ?", (kind, key))
+                self._conn.executemany(
+                    "INSERT INTO artifacts (kind, key, name, sha256) VALUES (?, ?, ?, ?)",
+                    [(kind, key, name, entry['sha256']) for name, entry in doc['artifacts'].items()]
+                )
+                # Blobs of the previous version that nothing refers to any more
+                previous_blobs = {(previous.get('model_storage') or {}).get('sha256')}
+                previous_blobs.update(entry.get('sha256') for entry in (previous.get('artifacts') or {}).values())
+                orphaned = [
+                    old for old in previous_blobs
+                    if old and self._conn.execute(
+                        "SELECT 1 FROM models WHERE sha256 = ? UNION SELECT 1 FROM artifacts WHERE sha256 = ?", (old, old)
+                    ).fetchone() is None
+                ]
+            for old in orphaned:
+                self.blobs.discard(old)
+            return doc['model_version']
+
+    def _missing(self, sha256):
+        def fetch():
+            raise Exception(f"Model blob {sha256} missing from local store {self.root}")
+        return fetch
+
+    def load_state(self, kind, doc, cache=None):
+        """State dict for a document from get(), mapped from the blob directory"""
+        sha256 = (doc.get('model_storage') or {}).get('sha256')
+        with self._timed('load'):
+            return load_model_state(self.blobs, sha256, None, self._missing(sha256))
+
+    def load_artifact(self, kind, doc, name, cache=None):
+        """Copy-on-write mmap of an artifact stored with a document's version, or None"""
+        entry = (doc.get('artifacts') or {}).get(name)
+        if not entry:
+            return None
+        with self._timed('load_artifact'):
+            return load_model_blob(self.blobs, entry['sha256'], None, self._missing(entry['sha256']))[0]
+
+    def stats(self):
+        stats = super().stats()
+        stats['root'] = self.root
+        stats['models'] = self._query("SELECT COUNT(*) FROM models", ())[0][0]
+        return stats
+
+
+def create_model_store():
+    """The store selected by MODEL_STORE: 'mongodb' (default, on the shared connection) or 'local' (see LocalModelStore)"""
+    backend = os.getenv('MODEL_STORE', 'mongodb').lower()
+    if backend == 'local':
+        return LocalModelStore()
+    if backend != 'mongodb':
+        print(f"Unknown MODEL_STORE '{backend}', using mongodb")
+    return MongoModelStore()
+
+
+def copy_model(source, target, kind, key):
+    """Copy the current version of a model between stores; returns its version in target, or None if source has none"""
+    doc = source.get(kind, key)
+    if doc is None:
+        return None
+    blob = tensor_format.dumps(source.load_state(kind, doc))
+    artifacts = {
+        name: (bytes(source.load_artifact(kind, doc, name)),
+               {k: v for k, v in entry.items() if k not in ('type', 'file_id', 'size_mb', 'sha256')})
+        for name, entry in (doc.get('artifacts') or {}).items()
+    }
+    meta = {k: v for k, v in doc.items() if k not in ('_id', 'artifacts')}
+    return target.put(kind, key, meta, blob, artifacts=artifacts)
+
+
+if __name__ == '__main__':
+    # python -m utils.model_store [company_id ...]
+    # Seeds the local store (MODEL_STORE_DIR) with the base model, and the given
+    # company models, from MongoDB (MONGO_URI)
+    source = MongoModelStore()
+    if not source.available:
+        print("MONGO_URI environment variable not set")
+        sys.exit(1)
+    target = LocalModelStore()
+    for kind, key in [('base', BASE_MODEL_ID)] + [('company', company_id) for company_id in sys.argv[1:]]:
+        version = copy_model(source, target, kind, key)
+        print(f"{kind} {key}: " + (f"copied as version {version}" if version is not None else "not found"))
@@ -0,0 +1,219 @@
+import os
+import time
+import threading
+
+from pymongo import MongoClient, monitoring
+
+
+class _PoolMetrics(monitoring.ConnectionPoolListener):
+    """Connection setup time, time spent waiting to check a connection out of the pool, and pool churn"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._timings = {}  # name -> (count, total_ms, max_ms)
+        self.created = 0
+        self.closed = 0
+        self.in_use = 0
+        self.checkout_failures = 0
+        self.pool_clears = 0
+
+    def _record(self, name, event):
+        # Connection events carry duration from pymongo 4.7; older versions record nothing
+        seconds = getattr(event, 'duration', None)
+        if seconds is None:
+            return
+        elapsed_ms = seconds * 1000
+        with self._lock:
+            count, total_ms, max_ms = self._timings.get(name, (0, 0.0, 0.0))
+            self._timings[name] = (count + 1, total_ms + elapsed_ms, max(max_ms, elapsed_ms))
+
+    def _count(self, attr, delta=1):
+        with self._lock:
+            setattr(self, attr, getattr(self, attr) + delta)
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._count('pool_clears')
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._count('created')
+
+    def connection_ready(self, event):
+        # duration: from creation to ready, i.e. TCP/TLS setup plus handshake and auth
+        self._record('connect', event)
+
+    def connection_closed(self, event):
+        self._count('closed')
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self._record('pool_wait', event)
+        self._count('checkout_failures')
+
+    def connection_checked_out(self, event):
+        self._record('pool_wait', event)
+        self._count('in_use')
+
+    def connection_checked_in(self, event):
+        self._count('in_use', -1)
+
+    def stats(self):
+        with self._lock:
+            timings = dict(self._timings)
+            stats = {
+                'connections_created': self.created,
+                'connections_closed': self.closed,
+                'connections_in_use': self.in_use,
+                'checkout_failures': self.checkout_failures,
+                'pool_clears': self.pool_clears
+            }
+        for name, (count, total_ms, max_ms) in timings.items():
+            stats[name] = {
+                'count': count,
+                'mean_ms': round(total_ms / count, 3) if count else 0.0,
+                'max_ms': round(max_ms, 3)
+            }
+        return stats
+
+
+class MongoConnection:
+    """
+    One MongoClient per process, shared by everything that talks to MongoDB.
+
+    - lazy: the client is created on the first db() call rather than at startup, with
+      connect=False, so startup never waits on DNS or server selection; the first query does
+    - fork-safe: a client inherited from a parent process is never used; the child
+      creates its own on first use (pid check, plus a reset registered with os.register_at_fork)
+    - pool: maxPoolSize MONGO_MAX_POOL_SIZE, server selection timeout
+      MONGO_SERVER_SELECTION_TIMEOUT_MS; connect and pool-wait times are in stats()
+
+    The URI (MONGO_URI) and database name (MONGO_DB) are read when the client is
+    created, so a .env loaded after import still applies.
+    """
+
+    def __init__(self, uri=None, db_name=None, max_pool_size=None, server_selection_timeout_ms=None):
+        self._uri = uri
+        self._db_name = db_name
+        self.max_pool_size = int(max_pool_size if max_pool_size is not None else os.getenv('MONGO_MAX_POOL_SIZE', '20'))
+        self.server_selection_timeout_ms = int(
+            server_selection_timeout_ms if server_selection_timeout_ms is not None
+            else os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', '30000')
+        )
+        self._lock = threading.Lock()
+        self._client = None
+        self._pid = None
+        self.metrics = _PoolMetrics()
+        self.clients_created = 0
+        self.client_init_ms = None
+        self.last_error = None
+
+    @property
+    def uri(self):
+        return self._uri or os.getenv('MONGO_URI')
+
+    @property
+    def db_name(self):
+        return self._db_name or os.getenv('MONGO_DB', 'supplychain')
+
+    @property
+    def configured(self):
+        return bool(self.uri)
+
+    def client(self):
+        pid = os.getpid()
+        client = self._client
+        if client is not None and self._pid == pid:
+            return client
+        with self._lock:
+            if self._client is not None and self._pid == pid:
+                return self._client
+            if not self.uri:
+                raise ValueError("MONGO_URI environment variable not set")
+            if self._client is not None:
+                # Inherited across a fork: its sockets and monitor threads belong to the parent
+                self._client = None
+                self.metrics = _PoolMetrics()
+
+            started = time.perf_counter()
+            try:
+                client = MongoClient(self.uri,
+                                     tls=os.getenv('MONGO_TLS', '1') == '1',
+                                     tlsAllowInvalidCertificates=True,
+                                     serverSelectionTimeoutMS=self.server_selection_timeout_ms,
+                                     maxPoolSize=self.max_pool_size,
+                                     connect=False,
+                                     event_listeners=[self.metrics])
+            except Exception as e:
+                self.last_error = str(e)
+                raise
+            self.client_init_ms = round((time.perf_counter() - started) * 1000, 3)
+            self._client, self._pid = client, pid
+            self.clients_created += 1
+            self.last_error = None
+            print(f"MongoDB client created (maxPoolSize={self.max_pool_size}); connects on first query")
+            return client
+
+    def db(self):
+        return self.client()[self.db_name]
+
+    def close(self):
+        with self._lock:
+            if self._client is not None and self._pid == os.getpid():
+                self._client.close()
+            self._client = None
+            self._pid = None
+
+    def _after_fork(self):
+        # The lock may have been held by another thread at fork time
+        self._lock = threading.Lock()
+        self._client = None
+        self._pid = None
+        self.metrics = _PoolMetrics()
+
+    def stats(self):
+        return {
+            'configured': self.configured,
+            'client_created': self._client is not None and self._pid == os.getpid(),
+            'db': self.db_name,
+            'max_pool_size': self.max_pool_size,
+            'server_selection_timeout_ms': self.server_selection_timeout_ms,
+            'clients_created': self.clients_created,
+            'client_init_ms': self.client_init_ms,
+            'last_error': self.last_error,
+            **self.metrics.stats()
+        }
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def get_connection():
+    """The process-wide MongoConnection (created on first call; nothing connects until it is used)"""
+    global _shared
+    if _shared is None:
+        with _shared_lock:
+            if _shared is None:
+                _shared = MongoConnection()
+    return _shared
+
+
+def _reset_after_fork():
+    global _shared_lock
+    _shared_lock = threading.Lock()
+    if _shared is not None:
+        _shared._after_fork()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,87 @@
+import os
+import copy
+import warnings
+
+import torch
+
+from utils.cache import estimate_nbytes
+
+# Layers given int8 weights; GATConv attention stays float32 (its cost is per edge, not per weight)
+QUANTIZED_PARTS = ('lstm', 'lin')
+
+
+def quantization_enabled():
+    return os.getenv('INFERENCE_QUANTIZATION', '0').lower() in ('1', 'true', 'yes')
+
+
+def max_drift():
+    """Largest accepted max_rel_diff of int8 outputs vs float32 (QUANTIZATION_MAX_DRIFT)"""
+    return float(os.getenv('QUANTIZATION_MAX_DRIFT', '0.05'))
+
+
+def quantize_model(model):
+    """
+    Inference-only copy of a HybridGATLSTM with dynamic int8 quantization of the LSTM and
+    output layer: weights are stored as int8, activations are quantized on the fly per batch.
+    The copy can't be trained or saved as a state dict for the float model.
+    """
+    qconfig = torch.ao.quantization.default_dynamic_qconfig
+    quantized = copy.deepcopy(model).eval()
+    quantized.autocast_dtype = None
+    with warnings.catch_warnings():
+        # torch.ao eager-mode quantization warns that it is deprecated in favour of torchao
+        warnings.simplefilter('ignore')
+        return torch.ao.quantization.quantize_dynamic(
+            quantized, {name: qconfig for name in QUANTIZED_PARTS}, dtype=torch.qint8, inplace=True
+        )
+
+
+def quantization_drift(model, quantized, x, edge_index):
+    """Max / mean absolute and max relative difference of the int8 outputs from the float model's, in eval mode"""
+    was_training = model.training
+    model.eval()
+    try:
+        with torch.no_grad():
+            reference = model(x, edge_index).float()
+            out = quantized(x, edge_index).float()
+    finally:
+        model.train(was_training)
+    diff = (out - reference).abs()
+    if not diff.numel():
+        return {'max_abs_diff': 0.0, 'mean_abs_diff': 0.0, 'max_rel_diff': 0.0}
+    return {
+        'max_abs_diff': float(diff.max()),
+        'mean_abs_diff': float(diff.mean()),
+        'max_rel_diff': float(diff.max() / reference.abs().max().clamp_min(1e-12))
+    }
+
+
+def quantize_checked(model, x, edge_index, threshold=None):
+    """
+    (model to serve, report): the int8 variant when its outputs on (x, edge_index) stay
+    within threshold (max_rel_diff) of the float model's, else the float model itself.
+
+    The report records the drift, the threshold, whether the int8 variant was accepted
+    and the resident size of both variants.
+    """
+    threshold = max_drift() if threshold is None else float(threshold)
+    report = {
+        'dtype': 'qint8',
+        'layers': list(QUANTIZED_PARTS),
+        'threshold': threshold,
+        'float_nbytes': estimate_nbytes(model),
+        'engine': torch.backends.quantized.engine
+    }
+    try:
+        quantized = quantize_model(model)
+        report.update(quantization_drift(model, quantized, x, edge_index))
+    except Exception as e:
+        report.update({'accepted': False, 'reason': f"quantization failed: {e}"})
+        return model, report
+
+    report['quantized_nbytes'] = estimate_nbytes(quantized)
+    if report['max_rel_diff'] > threshold:
+        report.update({'accepted': False, 'reason': f"drift {report['max_rel_diff']:.4f} above {threshold}"})
+        return model, report
+    report['accepted'] = True
+    return quantized, report
@@ -0,0 +1,120 @@
+import numpy as np
+
+
+class NodeScalers:
+    """
+    Per-node standardization parameters held as two contiguous float32 vectors
+    (mean, scale) aligned with node indices, instead of one scaler object per node.
+
+    Stored on model documents as 'scaler_params'; documents written before that
+    carry a legacy 'scalers' dict ({node: {'mean_': [m], 'scale_': [s]}}), which
+    from_legacy() converts.
+    """
+
+    DTYPE = '<f4'
+
+    def __init__(self, mean, scale, present=None):
+        self.mean = np.ascontiguousarray(mean, dtype=np.float32)
+        self.scale = np.ascontiguousarray(scale, dtype=np.float32)
+        # Nodes that actually have fitted parameters (legacy dicts may cover only some)
+        self.present = np.ones(len(self.mean), dtype=bool) if present is None else np.asarray(present, dtype=bool)
+
+    def __len__(self):
+        return len(self.mean)
+
+    @classmethod
+    def fit(cls, series):
+        """
+        Fit every node at once from a (nodes x timesteps) array, matching
+        StandardScaler: population std, and scale 1 for constant series.
+        """
+        series = np.asarray(series, dtype=np.float64)
+        mean = series.mean(axis=1)
+        var = series.var(axis=1)
+        # Same tolerance StandardScaler uses to call a feature constant
+        n_samples = series.shape[1]
+        eps = np.finfo(np.float64).eps
+        constant = var <= n_samples * eps * var + (n_samples * mean * eps) ** 2
+        scale = np.where(constant, 1.0, np.sqrt(var))
+        return cls(mean, scale)
+
+    def take(self, indices):
+        """Parameters reordered/subset to the given node indices"""
+        indices = np.asarray(indices, dtype=np.int64)
+        return NodeScalers(self.mean[indices], self.scale[indices], self.present[indices])
+
+    def reindex(self, positions):
+        """Parameters for a new node order: positions[i] is node i's current index, or -1 (no parameters)"""
+        # -1 picks the appended "no parameters" entry
+        positions = np.asarray(positions, dtype=np.int64)
+        return NodeScalers(
+            np.append(self.mean, 0.0)[positions],
+            np.append(self.scale, 1.0)[positions],
+            np.append(self.present, False)[positions]
+        )
+
+    def update(self, series, nodes):
+        """Refit the given nodes (and any without parameters) from their rows of series; returns (scalers, nodes refit)"""
+        refit = np.zeros(len(self.mean), dtype=bool)
+        refit[np.asarray(nodes, dtype=np.int64)] = True
+        refit |= ~self.present
+        fitted = NodeScalers.fit(np.asarray(series)[refit])
+        mean, scale = self.mean.copy(), self.scale.copy()
+        mean[refit] = fitted.mean
+        scale[refit] = fitted.scale
+        return NodeScalers(mean, scale), int(refit.sum())
+
+    def has(self, idx):
+        return 0 <= idx < len(self.mean) and bool(self.present[idx])
+
+    def inverse(self, idx, value):
+        """x_original = x_scaled * scale + mean for one node"""
+        return value * float(self.scale[idx]) + float(self.mean[idx])
+
+    def normalization_vectors(self):
+        """(mean, denominator) for (x - mean) / denominator; nodes without parameters are left unscaled"""
+        mean = np.where(self.present, self.mean, 0.0).astype(np.float32)
+        denom = np.where(self.present, self.scale.astype(np.float64) + 1e-8, 1.0).astype(np.float32)
+        return mean, denom
+
+    def to_doc(self):
+        return {
+            'dtype': self.DTYPE,
+            'count': len(self.mean),
+            'mean': self.mean.astype(self.DTYPE).tobytes(),
+            'scale': self.scale.astype(self.DTYPE).tobytes()
+        }
+
+    @classmethod
+    def from_doc(cls, params):
+        dtype = params.get('dtype', cls.DTYPE)
+        mean = np.frombuffer(params['mean'], dtype=dtype)
+        scale = np.frombuffer(params['scale'], dtype=dtype)
+        return cls(mean, scale)
+
+    @classmethod
+    def from_legacy(cls, scalers, node_list):
+        """Build from a legacy {node: {'mean_': [...], 'scale_': [...]}} dict, aligned with node_list"""
+        mean = np.zeros(len(node_list), dtype=np.float32)
+        scale = np.ones(len(node_list), dtype=np.float32)
+        present = np.zeros(len(node_list), dtype=bool)
+        for i, node_id in enumerate(node_list):
+            scaler_data = scalers.get(node_id)
+            if not scaler_data or not scaler_data.get('mean_') or not scaler_data.get('scale_'):
+                continue
+            mean[i] = scaler_data['mean_'][0]
+            scale[i] = scaler_data['scale_'][0]
+            present[i] = True
+        return cls(mean, scale, present)
+
+    @classmethod
+    def from_model_doc(cls, model_doc, node_list):
+        """Compact parameters when the document has them, else the legacy dict, else None"""
+        params = model_doc.get('scaler_params')
+        if params:
+            scalers = cls.from_doc(params)
+            if len(scalers) == len(node_list):
+                return scalers
+        if model_doc.get('scalers'):
+            return cls.from_legacy(model_doc['scalers'], node_list)
+        return None
@@ -0,0 +1,152 @@
+import io
+import os
+import json
+import struct
+import pickle
+import collections
+
+import torch
+import torch._utils
+
+# Layout: MAGIC | u64 little-endian header length | JSON header | tensor bytes.
+# The header maps each name to dtype, shape and [begin, end) byte offsets relative to
+# the data section; the data section and every tensor in it start on ALIGNMENT bytes.
+MAGIC = b'SGTENSR1'
+ALIGNMENT = 64
+_PREFIX = struct.Struct('<8sQ')
+
+_DTYPES = {
+    'F64': torch.float64, 'F32': torch.float32, 'F16': torch.float16, 'BF16': torch.bfloat16,
+    'I64': torch.int64, 'I32': torch.int32, 'I16': torch.int16, 'I8': torch.int8,
+    'U8': torch.uint8, 'BOOL': torch.bool
+}
+_DTYPE_NAMES = {dtype: name for name, dtype in _DTYPES.items()}
+
+
+def _padding(size):
+    return -size % ALIGNMENT
+
+
+def is_tensor_container(blob):
+    return bytes(memoryview(blob)[:len(MAGIC)]) == MAGIC
+
+
+def dumps(state_dict, metadata=None):
+    """Serialize a {name: tensor} dict (e.g. a state_dict) to the container format"""
+    entries = {}
+    chunks = []
+    offset = 0
+    for name, tensor in state_dict.items():
+        tensor = tensor.detach().cpu().contiguous()
+        if tensor.dtype not in _DTYPE_NAMES:
+            raise TypeError(f"Unsupported tensor dtype for {name}: {tensor.dtype}")
+        raw = tensor.reshape(-1).view(torch.uint8).numpy() if tensor.numel() else b''
+        entries[name] = {
+            'dtype': _DTYPE_NAMES[tensor.dtype],
+            'shape': list(tensor.shape),
+            'offsets': [offset, offset + len(raw)]
+        }
+        chunks.append(raw)
+        chunks.append(b'\0' * _padding(len(raw)))
+        offset += len(raw) + _padding(len(raw))
+    if metadata:
+        entries['__metadata__'] = {str(k): str(v) for k, v in metadata.items()}
+
+    header = json.dumps(entries, separators=(',', ':')).encode('utf-8')
+    header += b' ' * _padding(_PREFIX.size + len(header))
+    return b''.join([_PREFIX.pack(MAGIC, len(header)), header] + [bytes(chunk) for chunk in chunks])
+
+
+def read_header(blob):
+    """(header, data start offset) of a container; ValueError when it is not one or is truncated"""
+    size = len(memoryview(blob))
+    if size < _PREFIX.size:
+        raise ValueError("Not a tensor container")
+    magic, header_len = _PREFIX.unpack_from(blob, 0)
+    if magic != MAGIC:
+        raise ValueError("Not a tensor container")
+    if _PREFIX.size + header_len > size:
+        raise ValueError("Corrupt tensor container: truncated header")
+    try:
+        header = json.loads(bytes(memoryview(blob)[_PREFIX.size:_PREFIX.size + header_len]))
+    except ValueError as e:
+        raise ValueError(f"Corrupt tensor container: unreadable header ({e})")
+    if not isinstance(header, dict):
+        raise ValueError("Corrupt tensor container: header is not a mapping")
+    return header, _PREFIX.size + header_len
+
+
+def _entry_layout(name, entry, data_size):
+    """(dtype, shape, begin, count) of a header entry, checked against the data section"""
+    try:
+        dtype = _DTYPES[entry['dtype']]
+        shape = [int(dim) for dim in entry['shape']]
+        begin, end = (int(offset) for offset in entry['offsets'])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError(f"Corrupt tensor container: bad header entry for {name}")
+    itemsize = torch.empty((), dtype=dtype).element_size()
+    count = 1
+    for dim in shape:
+        if dim < 0:
+            raise ValueError(f"Corrupt tensor container: bad shape for {name}")
+        count *= dim
+    if not 0 <= begin <= end <= data_size or end - begin != count * itemsize:
+        raise ValueError(f"Corrupt tensor container: offsets of {name} don't match its shape or the data")
+    return dtype, shape, begin, count
+
+
+def loads(blob):
+    """
+    Tensors of a container as an OrderedDict.
+
+    Over a writable buffer (e.g. a copy-on-write mmap of a cached file) the tensors are
+    views built with torch.frombuffer, without copying; they keep the buffer alive. A
+    read-only buffer (bytes from MongoDB) is copied once so the tensors stay writable.
+    A truncated or inconsistent container raises ValueError.
+    """
+    if memoryview(blob).readonly:
+        blob = bytearray(blob)
+    header, data_start = read_header(blob)
+    data_size = len(memoryview(blob)) - data_start
+    state = collections.OrderedDict()
+    for name, entry in header.items():
+        if name == '__metadata__':
+            continue
+        dtype, shape, begin, count = _entry_layout(name, entry, data_size)
+        if count == 0:
+            state[name] = torch.empty(shape, dtype=dtype)
+            continue
+        tensor = torch.frombuffer(blob, dtype=dtype, count=count, offset=data_start + begin)
+        state[name] = tensor.view(shape)
+    return state
+
+
+def _load_storage_bytes(data):
+    # Tensor storages inside legacy pickles are torch.save payloads; never execute code from them
+    return torch.load(io.BytesIO(data), weights_only=True)
+
+
+_LEGACY_GLOBALS = {
+    ('collections', 'OrderedDict'): collections.OrderedDict,
+    ('torch._utils', '_rebuild_tensor_v2'): torch._utils._rebuild_tensor_v2,
+    ('torch._utils', '_rebuild_parameter'): torch._utils._rebuild_parameter,
+    ('torch.storage', '_load_from_bytes'): _load_storage_bytes
+}
+
+
+class _StateDictUnpickler(pickle.Unpickler):
+    """Unpickler for legacy pickled state dicts that refuses anything but tensors and dicts"""
+
+    def find_class(self, module, name):
+        if (module, name) not in _LEGACY_GLOBALS:
+            raise pickle.UnpicklingError(f"Refusing to load {module}.{name} from a model blob")
+        return _LEGACY_GLOBALS[(module, name)]
+
+
+def load_state(blob):
+    """State dict from either format: container blobs load zero-copy, legacy pickles through a restricted unpickler"""
+    if is_tensor_container(blob):
+        return loads(blob)
+    if os.getenv('MODEL_PICKLE_SAFE_LOAD', '1') == '0':
+        return pickle.loads(blob)
+    return _StateDictUnpickler(io.BytesIO(blob)).load()
@@ -0,0 +1,99 @@
+import io
+import os
+import copy
+import warnings
+
+import torch
+
+# Name of the artifact stored next to a model version's state dict (see utils/model_store.py)
+ARTIFACT_NAME = 'torchscript'
+# Bumped when the exported graph changes incompatibly; older exports are then ignored
+EXPORT_VERSION = 1
+
+
+def export_enabled():
+    return os.getenv('MODEL_EXPORT_TORCHSCRIPT', '0').lower() in ('1', 'true', 'yes')
+
+
+def tolerance():
+    """Largest accepted max_rel_diff of the exported graph's outputs vs eager (TORCHSCRIPT_TOLERANCE)"""
+    return float(os.getenv('TORCHSCRIPT_TOLERANCE', '1e-4'))
+
+
+def export_inference_graph(model, x, edge_index):
+    """
+    Frozen, inference-optimized TorchScript graph of a HybridGATLSTM, as (module, bytes).
+
+    Traced in eval mode, so the dropout and input-noise branches are fixed to their
+    inference behaviour and autocast is off. Tracing rather than scripting: from PyG 2.5
+    GATConv.jittable() is a no-op and GATConv.forward doesn't script. Node and edge
+    counts stay dynamic in the trace; check_equivalence() verifies that on another graph.
+    """
+    traced_model = copy.deepcopy(model).eval()
+    traced_model.autocast_dtype = None
+    with warnings.catch_warnings(), torch.no_grad():
+        warnings.simplefilter('ignore')
+        traced = torch.jit.trace(traced_model, (x, edge_index), check_trace=False)
+        graph = torch.jit.optimize_for_inference(torch.jit.freeze(traced))
+        buffer = io.BytesIO()
+        torch.jit.save(graph, buffer)
+    return graph, buffer.getvalue()
+
+
+def load_inference_graph(blob):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        return torch.jit.load(io.BytesIO(bytes(blob)), map_location='cpu')
+
+
+def _probe_inputs(x, edge_index):
+    """Random inputs of a different size than the traced ones (2n + 1 nodes, 4 edges per node)"""
+    generator = torch.Generator().manual_seed(0)
+    num_nodes = x.size(0) * 2 + 1
+    probe_x = torch.randn((num_nodes,) + tuple(x.shape[1:]), generator=generator, dtype=x.dtype)
+    probe_edges = torch.randint(0, num_nodes, (2, num_nodes * 4), generator=generator, dtype=edge_index.dtype)
+    return probe_x, probe_edges
+
+
+def check_equivalence(model, graph, x, edge_index, tolerance_value=None):
+    """Output difference of an exported graph from the eager model, on (x, edge_index) and on a differently sized probe graph"""
+    tolerance_value = tolerance() if tolerance_value is None else float(tolerance_value)
+    report = {'tolerance': tolerance_value}
+    was_training = model.training
+    model.eval()
+    try:
+        with torch.no_grad():
+            for name, inputs in (('example', (x, edge_index)), ('probe', _probe_inputs(x, edge_index))):
+                reference = model(*inputs).float()
+                diff = (graph(*inputs).float() - reference).abs()
+                report[f'{name}_nodes'] = int(inputs[0].size(0))
+                report[f'{name}_max_abs_diff'] = float(diff.max()) if diff.numel() else 0.0
+                report[f'{name}_max_rel_diff'] = (
+                    float(diff.max() / reference.abs().max().clamp_min(1e-12)) if diff.numel() else 0.0
+                )
+    finally:
+        model.train(was_training)
+    report['equivalent'] = max(report['example_max_rel_diff'], report['probe_max_rel_diff']) <= tolerance_value
+    return report
+
+
+def export_checked(model, x, edge_index):
+    """
+    (artifact bytes, metadata) of the exported inference graph, or (None, metadata)
+    when export fails or the graph's outputs differ from eager beyond the tolerance.
+    """
+    metadata = {
+        'format': 'torchscript',
+        'export_version': EXPORT_VERSION,
+        'torch_version': torch.__version__,
+        'timesteps': int(x.size(1))
+    }
+    try:
+        graph, blob = export_inference_graph(model, x, edge_index)
+        metadata['equivalence'] = check_equivalence(model, graph, x, edge_index)
+    except Exception as e:
+        metadata['error'] = str(e)
+        return None, metadata
+    if not metadata['equivalence']['equivalent']:
+        return None, metadata
+    return blob, metadata
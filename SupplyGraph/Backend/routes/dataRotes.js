@@ -2,9 +2,11 @@ const express = require("express");
 const multer = require("multer");
 const path = require("path");
 const fs = require("fs");
+const axios = require("axios");
 const { processRawCSV } = require("../utils/dataProcessor");
 
 const router = express.Router();
+const ML_SERVICE_URL = process.env.ML_SERVICE_URL || "http://localhost:5001";
 
 // Simplified multer configuration
 const storage = multer.diskStorage({
@@ -81,6 +83,11 @@ router.post("/convert/:companyId", upload.single("file"), async (req, res) => {
       throw new Error("File processing failed - unable to generate required output files");
     }
 
+    // Drop the ML service's cached model inputs for this company (best effort)
+    axios.post(`${ML_SERVICE_URL}/cache/invalidate/${companyId}`).catch((err) => {
+      console.warn("Could not invalidate ML input cache:", err.message);
+    });
+
     res.json({
       message: "✅ Files processed successfully",
       files: result,
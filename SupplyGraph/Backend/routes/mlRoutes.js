@@ -57,7 +57,7 @@ router.post("/create-sample/:companyId", async (req, res) => {
 router.post("/fine-tune/:companyId", async (req, res) => {
   try {
     const { companyId } = req.params;
-    const { nodes, edges, demand, force_retrain } = req.body;
+    const { nodes, edges, demand, force_retrain, incremental } = req.body;
 
     // Validate inputs
     if (!companyId || companyId.trim() === '') {
@@ -100,13 +100,16 @@ router.post("/fine-tune/:companyId", async (req, res) => {
       nodes: nodes,
       edges: edges,
       demand: demand,
-      force_retrain: !!force_retrain
+      force_retrain: !!force_retrain,
+      incremental: !!incremental
     });
 
-    if (mlResponse.status === 200) {
+    // The ML service queues the job and answers 202 Accepted
+    if (mlResponse.status >= 200 && mlResponse.status < 300) {
       res.json({
         message: "Fine-tuning started successfully",
         company_id: companyId,
+        job_id: mlResponse.data.job_id,
         ml_response: mlResponse.data,
         status: "training_started"
       });
@@ -162,6 +165,23 @@ router.get("/training-status/:companyId", async (req, res) => {
   }
 });
 
+// Get training job status
+router.get("/jobs/:jobId", async (req, res) => {
+  try {
+    const { jobId } = req.params;
+
+    const mlResponse = await axios.get(`${ML_SERVICE_URL}/jobs/${jobId}`);
+
+    res.json(mlResponse.data);
+  } catch (error) {
+    if (error.response && error.response.status === 404) {
+      return res.status(404).json({ error: "Job not found" });
+    }
+    console.error("Error getting training job status:", error);
+    res.status(500).json({ error: "Failed to get training job status" });
+  }
+});
+
 // Make prediction
 router.post("/predict/:companyId", async (req, res) => {
   try {
@@ -185,6 +205,25 @@ router.post("/predict/:companyId", async (req, res) => {
   }
 });
 
+// Make predictions for many products in one pass
+router.post("/predict-batch/:companyId", async (req, res) => {
+  try {
+    const { companyId } = req.params;
+    const { products, forecast_days } = req.body;
+
+    const mlResponse = await axios.post(`${ML_SERVICE_URL}/predict-batch`, {
+      company_id: companyId,
+      products: products || "all",
+      forecast_days: forecast_days || 1,
+    });
+
+    res.json(mlResponse.data);
+  } catch (error) {
+    console.error("Error generating batch prediction:", error);
+    res.status(500).json({ error: "Failed to generate batch prediction" });
+  }
+});
+
 // Get model info
 router.get("/model-info/:companyId", async (req, res) => {
   try {
@@ -201,6 +240,23 @@ router.get("/model-info/:companyId", async (req, res) => {
   }
 });
 
+// Compare execution modes (eager, torch.compile, bfloat16) on the company model
+router.get("/execution-report/:companyId", async (req, res) => {
+  try {
+    const { companyId } = req.params;
+
+    const mlResponse = await axios.get(
+      `${ML_SERVICE_URL}/execution-report/${companyId}`,
+      { params: { repeats: req.query.repeats } }
+    );
+
+    res.json(mlResponse.data);
+  } catch (error) {
+    console.error("Error getting execution report:", error);
+    res.status(500).json({ error: "Failed to get execution report" });
+  }
+});
+
 // Validate company data
 router.get("/validate-data/:companyId", async (req, res) => {
   try {